@@ -0,0 +1,104 @@
+"""
+Benchmark: chuẩn hoá brand/model theo bảng alias (service/aliases.json) trên cột lớn.
+- từng dòng: normalize_brand/normalize_model (clean_data.py) gọi cho mỗi dòng
+- categorical: AliasTable.normalize_brands/normalize_models - factorize, chuẩn hoá mỗi giá trị khác nhau 1 lần
+  rồi remap codes (cách clean_data.py đang dùng)
+- strip: .str.strip() không có alias (cách cũ, để tham khảo)
+Dữ liệu: make/model của synthetic_listings, thêm biến thể bẩn (chữ thường, slug URL, khoảng trắng, alias).
+
+Chạy: python benchmarks/bench_alias_normalization.py --rows 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+
+from clean_data import normalize_brand, normalize_model
+from service.aliases import load_alias_table
+from synthetic_listings import make_listings
+
+
+def _dirty(values: pd.Series, aliases: dict, rng, rate: float) -> pd.Series:
+    """Thay ngẫu nhiên `rate` số dòng bằng biến thể: chữ thường, slug, khoảng trắng thừa hoặc alias"""
+    values = values.astype(object).to_numpy(copy=True)
+    picked = np.flatnonzero(rng.random(len(values)) < rate)
+    kinds = rng.integers(0, 4, len(picked))
+    for i, kind in zip(picked, kinds):
+        v = values[i]
+        if kind == 0:
+            values[i] = v.lower()
+        elif kind == 1:
+            values[i] = v.lower().replace(' ', '-')
+        elif kind == 2:
+            values[i] = f"  {v} "
+        elif v in aliases:
+            values[i] = aliases[v][rng.integers(0, len(aliases[v]))]
+    return pd.Series(values)
+
+
+def _timed(func, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--dirty-rate', type=float, default=0.2, help="Tỉ lệ dòng bị thay bằng biến thể bẩn")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    table = load_alias_table()
+    rng = np.random.default_rng(0)
+    df = make_listings(args.rows, n_brands=10)
+    brand_aliases = {}
+    for alias, canonical in table.brand_aliases():
+        brand_aliases.setdefault(canonical, []).append(alias)
+    model_aliases = {}
+    for brand in table.model_names:
+        for alias, canonical in table.model_aliases(brand):
+            model_aliases.setdefault(canonical, []).append(alias)
+    brands = _dirty(df['make'], brand_aliases, rng, args.dirty_rate)
+    models = _dirty(df['model'], model_aliases, rng, args.dirty_rate)
+    print(f"📊 Chuẩn hoá brand/model - {args.rows:,} dòng, {brands.nunique()} brand / "
+          f"{models.nunique()} model khác nhau, {args.dirty_rate:.0%} dòng bẩn")
+
+    def per_row():
+        b = brands.map(normalize_brand)
+        return b, pd.Series([normalize_model(m, brand) for brand, m in zip(b, models)])
+
+    def categorical():
+        b = table.normalize_brands(brands)
+        return b, table.normalize_models(b, models)
+
+    def strip_only():
+        return brands.str.strip(), models.str.strip()
+
+    print(f"{'Cách':<14} {'Thời gian (s)':>14} {'RAM kết quả (MB)':>17} {'Brand khác nhau':>16} {'Model khác nhau':>16}")
+    results = {}
+    for name, func in (('từng dòng', per_row), ('categorical', categorical), ('strip (cũ)', strip_only)):
+        elapsed, (b, m) = _timed(func, args.repeat)
+        results[name] = (b, m)
+        mem = (b.memory_usage(deep=True) + m.memory_usage(deep=True)) / 1e6
+        print(f"{name:<14} {elapsed:>14.3f} {mem:>17.1f} {b.nunique():>16} {m.nunique():>16}")
+
+    (b1, m1), (b2, m2) = results['từng dòng'], results['categorical']
+    same = all(np.array_equal(x.to_numpy(dtype=object), y.to_numpy(dtype=object)) for x, y in ((b1, b2), (m1, m2)))
+    assert same, "Kết quả categorical khác từng dòng"
+    print("✅ Kết quả categorical giống hệt chuẩn hoá từng dòng")
+
+
+if __name__ == '__main__':
+    main()
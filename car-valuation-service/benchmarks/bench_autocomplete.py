@@ -0,0 +1,82 @@
+"""
+Benchmark: autocomplete hãng/dòng/version bằng index đã compile (service/autocomplete.py) vs duyệt metadata.json.
+
+Dữ liệu: metadata.json thật, và metadata giả lập --brands hãng (vocabulary Toyota nhân bản, mỗi hãng đổi tên dòng
+xe) dựng bằng extract_metadata.build_metadata -> vocabulary cỡ thị trường nhiều hãng.
+- duyệt metadata: cách client đang làm, mỗi lần gõ đi hết make -> model -> year -> version, so khớp chuỗi
+  đã lower() + bỏ dấu ngay lúc so khớp
+- index: fold sẵn + bisect trên mảng key đã sắp xếp (AutocompleteIndex.search)
+In thời gian trung bình 1 truy vấn (µs) cho vài chuỗi gõ điển hình.
+
+Chạy: python benchmarks/bench_autocomplete.py --brands 40
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from extract_metadata import build_metadata
+from service.autocomplete import AutocompleteIndex, fold_key
+from service.metadata_index import iter_combinations, load_metadata
+
+QUERIES = ['c', 'cam', 'camry 2.5', 'land cr', '2.5q', 'amry', 'xyz']
+
+
+def _synthetic_metadata(n_brands: int) -> dict:
+    combos = Counter()
+    for brand in range(n_brands):
+        for make, model, year, version, color in iter_combinations(load_metadata()):
+            make = make if brand == 0 else f"Brand{brand:02d}"
+            model = model if brand == 0 else f"{model} B{brand:02d}"
+            combos[(make, model, year, version, color)] += 1
+    return build_metadata(combos)
+
+
+def _walk_metadata(metadata: dict, text: str, limit: int = 10) -> list:
+    """Duyệt cây metadata như client: dòng xe có từ/version chứa chuỗi gõ"""
+    query = fold_key(text)
+    results = []
+    for make, models in metadata['year_versions'].items():
+        for model, years in models.items():
+            label = fold_key(f"{make} {model}")
+            versions = sorted({v for year_list in years.values() for v in year_list
+                               if query in f"{label} {fold_key(v)}"})
+            if query in label or versions:
+                results.append((make, model, versions))
+    return results[:limit]
+
+
+def _per_query_us(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--brands', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    for name, metadata in (('metadata.json', load_metadata()),
+                           (f'giả lập {args.brands} hãng', _synthetic_metadata(args.brands))):
+        start = time.perf_counter()
+        index = AutocompleteIndex.from_metadata(metadata)
+        build = time.perf_counter() - start
+        print(f"\n📊 {name}: {len(index)} hãng/dòng, {len(index.keys):,} key (compile {build * 1000:.0f} ms)")
+        print(f"{'Query':<12} {'Gợi ý':>6} {'Duyệt (µs)':>12} {'Index (µs)':>12}")
+        for query in QUERIES:
+            walk_repeat = max(args.repeat // 20, 3)
+            t_walk = _per_query_us(lambda: _walk_metadata(metadata, query), walk_repeat)
+            t_index = _per_query_us(lambda: index.search(query), args.repeat)
+            print(f"{query:<12} {len(index.search(query)):>6} {t_walk:>12,.0f} {t_index:>12,.1f}")
+
+
+if __name__ == '__main__':
+    main()
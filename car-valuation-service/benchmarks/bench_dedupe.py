@@ -0,0 +1,130 @@
+"""
+Benchmark: tìm tin trùng giữa các nguồn bằng MinHash/LSH (dedupe_listings.py) vs so từng cặp trong block.
+
+Dữ liệu: tin giả lập (synthetic_listings) có title + description, rồi đăng lại --dup-rate số xe ở nguồn khác với
+title viết kiểu khác, giá lệch <= 2%, số km làm tròn, description bị sửa 10% số từ -> biết trước các cặp trùng thật.
+Chỉ đăng lại xe đã chạy (> 0 km): cặp 2 tin 0 km không bao giờ bị gộp (xe mới của đại lý).
+- LSH: thời gian, số cặp ứng viên phải xác nhận, precision/recall theo cặp trùng thật.
+- Từng cặp: mọi cặp trong cùng block make/model/year, Jaccard chính xác trên cùng tập token (chỉ chạy khi
+  số cặp <= --max-pairwise; luôn in số cặp phải so).
+
+Chạy: python benchmarks/bench_dedupe.py --rows 200000 --dup-rate 0.1
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+
+import dedupe_listings as dd
+from synthetic_listings import make_listings
+
+WORDS = ("xe gia dinh su dung ky giu gin noi that dep may moi zin khong dam dung ngap nuoc bao duong hang dinh ky "
+         "chinh chu ban gap lop moi dan ao phim cach nhiet camera lui cam bien ho tro tra gop bao test hang "
+         "dong co em ai hop so muot dieu hoa mat lanh giay to day du sang ten nhanh gon").split()
+
+
+def _listings(n_rows: int, dup_rate: float, seed: int = 0) -> (pd.DataFrame, np.ndarray):
+    """Tin gốc + bản đăng lại ở nguồn khác; trả về (df, id xe gốc của từng dòng)"""
+    rng = np.random.default_rng(seed)
+    base = make_listings(n_rows, n_brands=10, seed=seed)
+    base['source'] = np.asarray(dd.SOURCE_PRIORITY, dtype=object)[rng.integers(0, 3, n_rows)]
+    words = np.asarray(WORDS, dtype=object)
+    desc_words = words[rng.integers(0, len(words), (n_rows, 30))]
+    base['description'] = [' '.join(w) for w in desc_words]
+    base['title'] = (base['make'] + ' ' + base['model'] + ' ' + base['version'] + ' ' + base['year'].astype(str)
+                     + ' - ' + base['mileage'].astype(str) + ' km')
+
+    picked = np.flatnonzero((rng.random(n_rows) < dup_rate) & (base['mileage'].to_numpy() > 0))
+    dup = base.iloc[picked].copy()
+    dup['source'] = [dd.SOURCE_PRIORITY[(dd.SOURCE_PRIORITY.index(s) + 1) % 3] for s in dup['source']]
+    dup['mileage'] = (dup['mileage'] // 1000 * 1000).astype(np.int64)
+    dup['title'] = ('Bán ' + dup['make'] + ' ' + dup['model'] + ' ' + dup['year'].astype(str) + ' '
+                    + dup['version'] + ' ' + dup['color'])
+    dup['price_vnd'] = np.round(dup['price_vnd'] * rng.uniform(0.98, 1.02, len(dup)), 0)
+    edited = desc_words[picked].copy()
+    mask = rng.random(edited.shape) < 0.1
+    edited[mask] = words[rng.integers(0, len(words), mask.sum())]
+    dup['description'] = [' '.join(w) for w in edited]
+
+    df = pd.concat([base, dup], ignore_index=True)
+    df['mileage'] = df['mileage'].astype(str) + ' km'
+    origin = np.concatenate([np.arange(n_rows), picked])
+    return df.astype({'year': str, 'price_vnd': str}), origin
+
+
+def _pairwise(keys: pd.DataFrame, rows: np.ndarray, tokens: np.ndarray, block: np.ndarray, threshold: float,
+              price_tol: float, mileage_tol: float) -> set:
+    """Jaccard chính xác cho mọi cặp trong cùng block"""
+    token_sets = [set() for _ in range(len(keys))]
+    for r, t in zip(rows.tolist(), tokens.tolist()):
+        token_sets[r].add(t)
+    price, mileage = keys['price'].to_numpy(), keys['mileage'].to_numpy()
+    found = set()
+    for members in pd.Series(np.arange(len(block))).groupby(block).groups.values():
+        members = np.asarray(members)
+        for a_pos, i in enumerate(members):
+            for j in members[a_pos + 1:]:
+                si, sj = token_sets[i], token_sets[j]
+                if len(si & sj) / max(len(si | sj), 1) < threshold:
+                    continue
+                if dd._relative_gap(price[i:i + 1], price[j:j + 1])[0] > price_tol:
+                    continue
+                if dd._relative_gap(mileage[i:i + 1], mileage[j:j + 1], slack=1000)[0] > mileage_tol:
+                    continue
+                if mileage[i] == 0 and mileage[j] == 0:
+                    continue
+                found.add((min(i, j), max(i, j)))
+    return found
+
+
+def _score(found: set, origin: np.ndarray) -> (float, float):
+    true_pairs = {(i, j) for i, j in found if origin[i] == origin[j]}
+    n_true = len(origin) - len(np.unique(origin))
+    precision = len(true_pairs) / len(found) if found else 1.0
+    return precision, len(true_pairs) / n_true if n_true else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--dup-rate', type=float, default=0.1)
+    parser.add_argument('--max-pairwise', type=int, default=5_000_000,
+                        help="Chỉ chạy so từng cặp khi số cặp trong block <= giá trị này")
+    args = parser.parse_args()
+
+    df, origin = _listings(args.rows, args.dup_rate)
+    print(f"📊 {len(df):,} tin ({len(df) - args.rows:,} tin đăng lại ở nguồn khác)")
+    print(f"{'Cách':<12} {'Thời gian (s)':>14} {'Cặp phải so':>14} {'Precision':>10} {'Recall':>8}")
+
+    start = time.perf_counter()
+    labels, pairs, n_candidates = dd.find_duplicates(df)
+    elapsed = time.perf_counter() - start
+    precision, recall = _score(set(zip(pairs['i'].tolist(), pairs['j'].tolist())), origin)
+    print(f"{'MinHash/LSH':<12} {elapsed:>14.2f} {n_candidates:>14,} {precision:>10.3f} {recall:>8.3f}")
+    kept = dd.choose_survivors(df, labels)
+    print(f"   -> giữ {len(kept):,} tin ({args.rows:,} xe thật)")
+
+    keys = dd.prepare(df)
+    block = keys.groupby(dd.BLOCK_COLUMNS, observed=True, sort=False).ngroup().to_numpy()
+    sizes = np.bincount(block)
+    n_pairs = int((sizes * (sizes - 1) // 2).sum())
+    if n_pairs > args.max_pairwise:
+        print(f"{'Từng cặp':<12} {'(bỏ qua)':>14} {n_pairs:>14,}")
+        return
+    start = time.perf_counter()
+    rows, tokens = dd.token_hashes(keys)
+    found = _pairwise(keys, rows, tokens, block, 0.5, 0.03, 0.02)
+    elapsed = time.perf_counter() - start
+    precision, recall = _score(found, origin)
+    print(f"{'Từng cặp':<12} {elapsed:>14.2f} {n_pairs:>14,} {precision:>10.3f} {recall:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: nạp nhiều file output scraper (ingest_listings.py).
+
+Dữ liệu: tin giả lập (synthetic_listings) chia thành --files file CSV theo định dạng từng scraper:
+- bonbanh (toyota_cars_*.csv): không có cột version, mileage "30.961 km"
+- oto (toyota_oto_*.csv): giá VND đầy đủ, mileage chỉ có số
+- chotot (toyota_chotot_*.csv): giá text "1 tỷ 200 triệu", mileage "5 vạn km" xen "30961 km"
+So sánh:
+- parse theo dòng: apply hàm của title_parser cho từng dòng (cách của các script cũ)
+- parse vector hoá (ingest_listings.to_clean_schema), 1 process
+- parse vector hoá, --workers process song song (ProcessPoolExecutor)
+Lưu ý: tăng tốc của nhiều process phụ thuộc số core của máy (in ra os.cpu_count()).
+
+Chạy: python benchmarks/bench_ingest.py --rows 600000 --files 12 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+
+import ingest_listings as ingest
+from service.title_parser import extract_price_vnd, extract_version_from_title, parse_mileage_km
+from synthetic_listings import make_listings
+
+FORMATS = ['toyota_cars_{}.csv', 'toyota_oto_{}.csv', 'toyota_chotot_{}.csv']
+
+
+def _price_text(million: float) -> str:
+    billions, millions = divmod(int(round(million)), 1000)
+    if not billions:
+        return f"{millions} triệu"
+    return f"{billions} tỷ {millions} triệu" if millions else f"{billions} tỷ"
+
+
+def _write_files(out_dir: Path, n_rows: int, n_files: int, seed: int = 0) -> list:
+    df = make_listings(n_rows, n_brands=10, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    df['ad_id'] = np.arange(n_rows).astype(str)
+    df['title'] = df['make'] + ' ' + df['model'] + ' ' + df['version'] + ' ' + df['year'].astype(str)
+    paths = []
+    bounds = np.linspace(0, n_rows, n_files + 1).astype(int)
+    for i in range(n_files):
+        part = df.iloc[bounds[i]:bounds[i + 1]].copy()
+        fmt = FORMATS[i % len(FORMATS)]
+        if fmt.startswith('toyota_cars'):
+            part['mileage'] = part['mileage'].map('{:,}'.format).str.replace(',', '.') + ' km'
+            part = part.drop(columns='version')
+        elif fmt.startswith('toyota_oto'):
+            part['price_vnd'] = (part['price_vnd'] * 1_000_000).astype('int64')
+        else:
+            part['price_vnd'] = part['price_vnd'].map(_price_text)
+            van = rng.random(len(part)) < 0.5
+            part['mileage'] = np.where(van, (part['mileage'] // 10_000).astype(str) + ' vạn km',
+                                       part['mileage'].astype(str) + ' km')
+        path = out_dir / fmt.format(f"20260101_{i:06d}")
+        part.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def _ingest_row_by_row(path: Path) -> pd.DataFrame:
+    """Cách cũ: mỗi dòng gọi hàm parse (không gom giá trị trùng)"""
+    raw = pd.read_csv(path, dtype='str', keep_default_na=False, na_values=[''])
+    out = pd.DataFrame({
+        'price_vnd': raw['price_vnd'].apply(lambda v: float(v) / 1e6 if v.isdigit() and len(v) > 6
+                                            else extract_price_vnd(v)),
+        'mileage': raw['mileage'].apply(parse_mileage_km),
+    })
+    if 'version' not in raw.columns:
+        out['version'] = raw.apply(lambda r: extract_version_from_title(r['title'], r['make'], r['model']), axis=1)
+    return out
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=600_000)
+    parser.add_argument('--files', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _write_files(Path(tmp), args.rows, args.files)
+        print(f"📊 {args.rows:,} tin trong {len(paths)} file ({len(FORMATS)} định dạng scraper), "
+              f"máy có {os.cpu_count()} core")
+
+        t_rows, _ = _timed(lambda: [_ingest_row_by_row(path) for path in paths])
+        t_serial, serial = _timed(lambda: ingest.run_ingest(paths, workers=1))
+        t_pool, pooled = _timed(lambda: ingest.run_ingest(paths, workers=args.workers))
+        assert all(a['frame'].equals(b['frame']) for a, b in zip(serial, pooled)), "Kết quả song song khác tuần tự"
+        t_merge, merged = _timed(lambda: ingest.merge_new_rows([r['frame'] for r in serial], Path(tmp) / "none.csv"))
+
+        print(f"{'Cách':<34} {'Thời gian (s)':>14}")
+        print(f"{'parse theo dòng (1 process)':<34} {t_rows:>14.2f}")
+        print(f"{'vector hoá (1 process)':<34} {t_serial:>14.2f}")
+        print(f"{f'vector hoá ({args.workers} process)':<34} {t_pool:>14.2f}")
+        print(f"{'gộp + bỏ trùng':<34} {t_merge:>14.2f}")
+        print(f"✅ {len(merged):,} dòng hợp lệ")
+
+
+if __name__ == '__main__':
+    main()
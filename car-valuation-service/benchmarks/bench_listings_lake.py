@@ -0,0 +1,100 @@
+"""
+Benchmark: đọc 1 phần dữ liệu từ lake Parquet phân vùng (listings_lake.py) vs đọc cả file rồi lọc.
+
+Dữ liệu: tin giả lập (synthetic_listings) 10 hãng x 3 nguồn x --days ngày scrape, ghi vào
+- 1 file CSV (cách cũ: data/*.csv) và 1 file Parquet (cách dataset_cache đang cache CSV)
+- lake trong thư mục tạm, mỗi ngày scrape là 1 lần append_listings (như scraper ghi mỗi ngày)
+Truy vấn:
+- train 1 hãng: make=Toyota, 6 cột dùng để train (retrain_model.py --lake --makes Toyota)
+- 1 hãng/1 nguồn/7 ngày gần nhất
+- metadata: 5 cột COMBO_COLUMNS, toàn bộ (extract_metadata.py --lake)
+CSV/Parquet phải đọc hết rồi lọc trong pandas; lake chỉ mở file của phân vùng khớp và chỉ đọc cột cần.
+
+Chạy: python benchmarks/bench_listings_lake.py --rows 1000000 --days 30
+"""
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+
+import listings_lake as lake
+from synthetic_listings import make_listings
+
+TRAIN_COLUMNS = ['make', 'model', 'version', 'color', 'year', 'mileage', 'price_vnd']
+COMBO_COLUMNS = ['make', 'model', 'year', 'version', 'color']
+SOURCES = ['bonbanh', 'oto', 'chotot']
+
+
+def _listings(n_rows: int, days: int, seed: int = 0) -> pd.DataFrame:
+    df = make_listings(n_rows, n_brands=10, seed=seed)
+    # Seed khác make_listings -> nguồn/ngày không tương quan với hãng
+    rng = np.random.default_rng(seed + 1)
+    df['source'] = np.asarray(SOURCES, dtype=object)[rng.integers(0, len(SOURCES), n_rows)]
+    first = date(2025, 12, 1)
+    df['scrape_date'] = np.asarray([first + timedelta(days=d) for d in range(days)], dtype=object)[
+        rng.integers(0, days, n_rows)]
+    df['ad_id'] = np.arange(n_rows).astype(str)
+    df['title'] = (df['make'] + ' ' + df['model'] + ' ' + df['version'] + ' ' + df['year'].astype(str)
+                   + ' - ' + df['mileage'].astype(str) + ' km')
+    return df
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    df = _listings(args.rows, args.days)
+    last_day = df['scrape_date'].max()
+    week_start = last_day - timedelta(days=6)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        csv_path, parquet_path = tmp / "listings.csv", tmp / "listings.parquet"
+        lake.LAKE_DIR = tmp / "lake"
+
+        write_csv, _ = _timed(lambda: df.to_csv(csv_path, index=False))
+        write_parquet, _ = _timed(lambda: df.to_parquet(parquet_path, index=False))
+        write_lake, _ = _timed(lambda: [lake.append_listings(day_df.drop(columns='scrape_date'), table='cleaned',
+                                                             scrape_date=day)
+                                        for day, day_df in df.groupby('scrape_date')])
+        n_files = len(lake.lake_files('cleaned'))
+        print(f"📊 {args.rows:,} tin, 10 hãng x {len(SOURCES)} nguồn x {args.days} ngày -> {n_files} file Parquet")
+        print(f"   Ghi: CSV {write_csv:.1f}s | Parquet {write_parquet:.1f}s | lake ({args.days} lần append) {write_lake:.1f}s")
+
+        queries = {
+            'train Toyota': (TRAIN_COLUMNS, {'makes': ['Toyota']},
+                             lambda d: d[d['make'] == 'Toyota']),
+            'Toyota/oto/7 ngày': (TRAIN_COLUMNS, {'makes': ['Toyota'], 'sources': ['oto'], 'since': week_start},
+                                  lambda d: d[(d['make'] == 'Toyota') & (d['source'] == 'oto')
+                                              & (pd.to_datetime(d['scrape_date']) >= pd.Timestamp(week_start))]),
+            'metadata (toàn bộ)': (COMBO_COLUMNS, {}, lambda d: d),
+        }
+        print(f"\n{'Truy vấn':<20} {'Dòng':>10} {'CSV (s)':>9} {'Parquet (s)':>12} {'Lake (s)':>9} {'File mở':>8}")
+        for name, (columns, filters, pandas_filter) in queries.items():
+            t_csv, from_csv = _timed(lambda: pandas_filter(pd.read_csv(csv_path))[columns])
+            t_parquet, from_parquet = _timed(lambda: pandas_filter(pd.read_parquet(parquet_path))[columns])
+            t_lake, from_lake = _timed(lambda: lake.read_listings('cleaned', columns=columns, **filters))
+            assert len(from_csv) == len(from_parquet) == len(from_lake), "Số dòng khác nhau giữa các cách đọc"
+            opened = len(lake.lake_files('cleaned', **filters))
+            print(f"{name:<20} {len(from_lake):>10,} {t_csv:>9.2f} {t_parquet:>12.2f} {t_lake:>9.2f} {opened:>8}")
+
+
+if __name__ == '__main__':
+    main()
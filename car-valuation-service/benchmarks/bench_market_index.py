@@ -0,0 +1,106 @@
+"""
+Benchmark: chỉ số giá thị trường (build_market_index.py + service/market_index.py).
+
+Dữ liệu: tin giả lập (synthetic_listings, 10 hãng) rải đều --days ngày scrape, ghi vào lake tạm (bảng 'cleaned'),
+mỗi ngày 1 lần append_listings như scraper/ingest_listings.py --lake.
+- build toàn bộ lịch sử (lần chạy đầu / --rebuild)
+- thêm 1 ngày scrape mới rồi cập nhật tăng dần: chỉ đọc + tính phân vùng của ngày mới
+  (kiểm tra index tăng dần giống hệt index build lại từ đầu)
+- truy vấn chuỗi thời gian 1 segment: MarketIndex.series() vs groupby quantile trên toàn bộ tin (không có index)
+
+Chạy: python benchmarks/bench_market_index.py --rows 2000000 --days 60
+"""
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+
+import build_market_index as market
+import listings_lake as lake
+from service.market_index import MarketIndex, load_index_frame
+from synthetic_listings import make_listings
+
+FIRST_DAY = date(2025, 12, 1)
+
+
+def _listings(n_rows: int, days: int, seed: int = 0) -> pd.DataFrame:
+    df = make_listings(n_rows, n_brands=10, seed=seed)
+    # Seed khác make_listings -> nguồn/ngày không tương quan với hãng
+    rng = np.random.default_rng(seed + 1)
+    df['source'] = np.asarray(['bonbanh', 'oto', 'chotot'], dtype=object)[rng.integers(0, 3, n_rows)]
+    df['scrape_date'] = np.asarray([FIRST_DAY + timedelta(days=d) for d in range(days)], dtype=object)[
+        rng.integers(0, days, n_rows)]
+    df['ad_id'] = np.arange(n_rows).astype(str)
+    return df
+
+
+def _append_days(df: pd.DataFrame) -> None:
+    for day, day_df in df.groupby('scrape_date'):
+        lake.append_listings(day_df.drop(columns='scrape_date'), table='cleaned', scrape_date=day)
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    df = _listings(args.rows, args.days + 1)
+    last_day = FIRST_DAY + timedelta(days=args.days)
+    history, new_day = df[df['scrape_date'] < last_day], df[df['scrape_date'] == last_day]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        lake.LAKE_DIR = tmp / "lake"
+        market.CACHE_DIR = tmp / "cache"
+        output, rebuilt = tmp / "market_price_index.parquet", tmp / "rebuilt.parquet"
+
+        _append_days(history)
+        t_full, full = _timed(lambda: market.update_market_index(output))
+        print(f"📊 {len(history):,} tin, {args.days} ngày scrape -> {full['rows']:,} dòng index "
+              f"({output.stat().st_size / 1024:.0f} KB)")
+        print(f"   Build toàn bộ:           {t_full:>7.2f}s ({len(full['changed'])} ngày)")
+
+        _append_days(new_day)
+        t_incremental, incremental = _timed(lambda: market.update_market_index(output))
+        t_rebuild, _ = _timed(lambda: market.update_market_index(rebuilt, rebuild=True))
+        assert load_index_frame(output).equals(load_index_frame(rebuilt)), "Index tăng dần khác index build lại"
+        print(f"   +1 ngày, tăng dần:       {t_incremental:>7.2f}s ({len(incremental['changed'])} ngày tính lại)")
+        print(f"   +1 ngày, build lại hết:  {t_rebuild:>7.2f}s")
+
+        index = MarketIndex.load(output)
+        segments = list(index.segments)
+        rng = np.random.default_rng(7)
+        picks = [segments[i] for i in rng.integers(0, len(segments), args.queries)]
+        t_index, _ = _timed(lambda: [index.series(*segment) for segment in picks])
+
+        listings = df[['make', 'model', 'year', 'price_vnd', 'scrape_date']]
+        make, model, year = picks[0]
+        t_scan, points = _timed(lambda: listings[(listings['make'] == make) & (listings['model'] == model)
+                                                 & (listings['year'] == year)]
+                                .groupby('scrape_date')['price_vnd'].quantile([0.25, 0.5, 0.75]).unstack())
+        assert np.allclose(points[0.5].to_numpy(), [p['median'] for p in index.series(make, model, year)],
+                           rtol=1e-6), "Median khác khi tính trực tiếp từ tin đăng"
+        print(f"\n🔎 Chuỗi thời gian 1 segment ({len(index):,} segment):")
+        print(f"   MarketIndex.series():        {t_index / args.queries * 1e6:>9.1f} µs/truy vấn")
+        print(f"   lọc + groupby trên {len(listings):,} tin: {t_scan * 1e6:>9,.0f} µs/truy vấn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark + kiểm tra trên PostgreSQL local: nạp car_valuation_metadata bằng seed SQL cũ
+(TRUNCATE + INSERT ... VALUES, autocommit như khi chạy bằng psql) vs COPY vào staging + merge/swap (metadata_db.py).
+
+Trong lúc nạp, 1 connection khác liên tục đếm số dòng của bảng -> ghi lại số dòng nhỏ nhất người đọc thấy
+(seed cũ: 0 sau TRUNCATE; COPY + merge/swap: không bao giờ rỗng). Cuối cùng so nội dung bảng với metadata.
+
+Chạy: python benchmarks/bench_metadata_load.py --dsn postgresql://postgres@localhost:5432/postgres --scale 50
+CẢNH BÁO: xoá và tạo lại bảng car_valuation_metadata trong database được chỉ định.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import psycopg
+
+from metadata_db import CREATE_TABLE_SQL, TABLE, export_copy, load_copy, load_metadata_rows
+
+
+def _seed_sql(rows) -> str:
+    """Giống seed_valuation_metadata.sql: TRUNCATE rồi 1 câu INSERT nhiều dòng"""
+    def text(v):
+        return "'" + v.replace("'", "''") + "'"
+    values = ",\n".join(f"(gen_random_uuid(), {text(a)}, {text(b)}, {c}, {text(d)}, {text(e)}, NOW(), NOW())"
+                        for a, b, c, d, e in rows)
+    return (f"TRUNCATE TABLE {TABLE} CASCADE;\n"
+            f'INSERT INTO {TABLE} (id, make, model, year, version, color, "createdAt", "updatedAt") VALUES\n'
+            f"{values};")
+
+
+class _CountWatcher(threading.Thread):
+    """Đếm số dòng liên tục từ 1 connection riêng, ghi lại giá trị nhỏ nhất"""
+
+    def __init__(self, dsn):
+        super().__init__(daemon=True)
+        self.dsn, self.min_count, self.samples = dsn, None, 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        with psycopg.connect(self.dsn, autocommit=True) as conn:
+            while not self._stop_event.is_set():
+                try:
+                    count = conn.execute(f"SELECT count(*) FROM {TABLE}").fetchone()[0]
+                except psycopg.errors.UndefinedTable:
+                    count = 0
+                self.min_count = count if self.min_count is None else min(self.min_count, count)
+                self.samples += 1
+                time.sleep(0.005)     # không tranh CPU với lần nạp đang đo
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _timed(dsn, label, func):
+    watcher = _CountWatcher(dsn)
+    watcher.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    watcher.stop()
+    print(f"{label:<34} {elapsed:>8.2f} {watcher.min_count:>16,} {watcher.samples:>9,}", flush=True)
+
+
+def _table_rows(dsn):
+    with psycopg.connect(dsn) as conn:
+        return sorted(conn.execute(f"SELECT make, model, year, version, color FROM {TABLE}").fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), required='DATABASE_URL' not in os.environ)
+    parser.add_argument('--scale', type=int, default=1,
+                        help="Nhân số tổ hợp (version thêm hậu tố) để thử với bảng lớn hơn")
+    args = parser.parse_args()
+
+    base = load_metadata_rows()
+    rows = [(a, b, c, d if i == 0 else f"{d} #{i}", e) for i in range(args.scale) for a, b, c, d, e in base]
+    # Lần nạp lại: bỏ 1% tổ hợp cũ, thêm 1% tổ hợp mới
+    step = 100
+    changed = [r for i, r in enumerate(rows) if i % step] + [(a, b, c, f"{d} (mới)", e) for a, b, c, d, e in rows[::step]]
+
+    tmp_dir = ROOT_DIR / "models"
+    paths = {}
+    for name, data in (('initial', rows), ('changed', changed)):
+        for fmt in ('binary', 'csv'):
+            paths[name, fmt] = tmp_dir / f"bench_metadata_{name}.{fmt}.tmp"
+            export_copy(data, paths[name, fmt], fmt)
+
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {TABLE}, {TABLE}_old, {TABLE}_new CASCADE")
+        conn.execute(CREATE_TABLE_SQL)
+        seed = _seed_sql(rows)
+        print(f"📊 Nạp {TABLE}: {len(rows):,} tổ hợp (seed SQL {len(seed) / 1e6:.1f} MB, "
+              f"COPY binary {paths['initial', 'binary'].stat().st_size / 1e6:.1f} MB)")
+        print(f"{'Cách nạp':<34} {'Thời gian (s)':>8} {'Ít nhất thấy (dòng)':>16} {'Lần đọc':>9}")
+        # psql chạy từng câu autocommit -> người đọc thấy bảng rỗng sau TRUNCATE
+        _timed(args.dsn, "seed SQL (TRUNCATE + INSERT)",
+               lambda: [conn.execute(stmt) for stmt in seed.split(";\n") if stmt.strip()])
+
+    try:
+        for fmt in ('csv', 'binary'):
+            _timed(args.dsn, f"COPY {fmt} + merge (không đổi)",
+                   lambda: load_copy(args.dsn, paths['initial', fmt], fmt, 'merge'))
+        _timed(args.dsn, "COPY binary + merge (1% thay đổi)",
+               lambda: load_copy(args.dsn, paths['changed', 'binary'], 'binary', 'merge'))
+        assert _table_rows(args.dsn) == sorted(changed), "merge: nội dung bảng khác metadata"
+        _timed(args.dsn, "COPY binary + swap",
+               lambda: load_copy(args.dsn, paths['initial', 'binary'], 'binary', 'swap'))
+        assert _table_rows(args.dsn) == sorted(rows), "swap: nội dung bảng khác metadata"
+        print("✅ Nội dung bảng khớp metadata sau merge và swap")
+    finally:
+        for path in paths.values():
+            path.unlink(missing_ok=True)
+
+
+if __name__ == '__main__':
+    main()
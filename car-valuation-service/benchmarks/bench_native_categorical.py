@@ -0,0 +1,86 @@
+"""
+Benchmark: XGBoost one-hot (sparse) vs XGBoost categorical native (CategoryCodeEncoder + enable_categorical).
+So sánh thời gian train, kích thước model (pickle), độ trễ dự đoán 1 dòng và MAE trên tập test.
+
+Chạy: python benchmarks/bench_native_categorical.py --rows 200000
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import xgboost as xgb
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from retrain_model import build_preprocessor, CAT_FEATURES, NUM_FEATURES, TARGET_COL
+from service.encoders import CategoryCodeEncoder
+from synthetic_listings import make_listings
+
+
+def _single_row_latency_ms(pipeline, X, n_calls=200):
+    timings = []
+    for i in range(n_calls):
+        row = X.iloc[[i % len(X)]]
+        start = time.perf_counter()
+        pipeline.predict(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--n-estimators', type=int, default=500)
+    parser.add_argument('--max-depth', type=int, default=8)
+    args = parser.parse_args()
+
+    df = make_listings(args.rows)
+    X = df[CAT_FEATURES + NUM_FEATURES]
+    y = df[TARGET_COL]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    params = dict(n_estimators=args.n_estimators, max_depth=args.max_depth, learning_rate=0.1,
+                  tree_method='hist', n_jobs=1, random_state=42)
+    candidates = {
+        'One-hot (sparse)': Pipeline(steps=[
+            ('preprocessor', build_preprocessor(sparse=True)),
+            ('regressor', xgb.XGBRegressor(**params))]),
+        'Native categorical': Pipeline(steps=[
+            ('preprocessor', CategoryCodeEncoder(CAT_FEATURES, NUM_FEATURES)),
+            ('regressor', xgb.XGBRegressor(enable_categorical=True, max_cat_to_onehot=1, **params))]),
+    }
+
+    print(f"📊 XGBoost one-hot vs native categorical - {args.rows:,} dòng, "
+          f"{args.n_estimators} cây, depth {args.max_depth}")
+    print(f"{'Cấu hình':<20} {'Fit (s)':>8} {'Model (KB)':>11} {'1 dòng (ms)':>12} {'Batch 10k (ms)':>15} {'MAE':>8}")
+    for name, pipeline in candidates.items():
+        start = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        buffer = io.BytesIO()
+        joblib.dump(pipeline, buffer)
+        size_kb = buffer.tell() / 1024
+
+        latency = _single_row_latency_ms(pipeline, X_test)
+        batch = X_test.iloc[:10_000]
+        start = time.perf_counter()
+        pipeline.predict(batch)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        mae = mean_absolute_error(y_test, pipeline.predict(X_test))
+        print(f"{name:<20} {fit_time:>8.1f} {size_kb:>11,.0f} {latency:>12.2f} {batch_ms:>15.1f} {mae:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: XGBoost out-of-core (out_of_core.py, DMatrix external memory) vs in-memory
+(pd.read_csv cả file + one-hot sparse) theo số dòng. Mỗi cấu hình chạy trong 1 process riêng để đo peak RSS.
+
+Chạy: python benchmarks/bench_out_of_core.py --rows 100000 1000000 10000000 --in-memory-max 1000000
+CSV giả lập được ghi vào --data-dir (mặc định thư mục tạm) và dùng lại nếu đã có.
+"""
+import argparse
+import multiprocessing as mp
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+XGB_PARAMS = {'learning_rate': 0.1, 'max_depth': 8, 'subsample': 0.8}
+
+
+def _peak_rss_mb():
+    # Linux: ru_maxrss tính theo KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_out_of_core(csv_path, n_rounds, chunk_rows, queue):
+    from out_of_core import train_out_of_core
+
+    start = time.perf_counter()
+    _, metrics = train_out_of_core(Path(csv_path), params=XGB_PARAMS, num_boost_round=n_rounds,
+                                   chunk_rows=chunk_rows, cache_dir=Path(csv_path).parent, verbose=False)
+    queue.put({'total_s': time.perf_counter() - start, 'mae': metrics['Test MAE'], 'peak_rss_mb': _peak_rss_mb()})
+
+
+def _run_in_memory(csv_path, n_rounds, queue):
+    import xgboost as xgb
+    from sklearn.metrics import mean_absolute_error
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from retrain_model import build_preprocessor, load_training_data
+
+    start = time.perf_counter()
+    X, y = load_training_data(csv_path)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    pipeline = Pipeline(steps=[('preprocessor', build_preprocessor(sparse=True)),
+                               ('regressor', xgb.XGBRegressor(n_estimators=n_rounds, tree_method='hist',
+                                                              n_jobs=1, random_state=42, **XGB_PARAMS))])
+    pipeline.fit(X_train, y_train)
+    mae = mean_absolute_error(y_test, pipeline.predict(X_test))
+    queue.put({'total_s': time.perf_counter() - start, 'mae': mae, 'peak_rss_mb': _peak_rss_mb()})
+
+
+def main():
+    from synthetic_listings import write_listings_csv
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--in-memory-max', type=int, default=1_000_000,
+                        help="Chỉ chạy in-memory tới số dòng này (lớn hơn dễ hết RAM)")
+    parser.add_argument('--brands', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=100)
+    parser.add_argument('--chunk-rows', type=int, default=200_000)
+    parser.add_argument('--data-dir', type=Path, default=Path(tempfile.gettempdir()) / "car_valuation_bench")
+    args = parser.parse_args()
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    ctx = mp.get_context('spawn')
+
+    print(f"📊 XGBoost out-of-core vs in-memory - {args.brands} hãng, {args.rounds} cây")
+    print(f"{'Rows':>11} {'Mode':<12} {'Total (s)':>10} {'MAE':>8} {'Peak RSS (MB)':>14}")
+    for n_rows in args.rows:
+        csv_path = args.data_dir / f"listings_{n_rows}_{args.brands}.csv"
+        if not csv_path.exists():
+            write_listings_csv(csv_path, n_rows, n_brands=args.brands)
+
+        modes = [('out-of-core', _run_out_of_core, (str(csv_path), args.rounds, args.chunk_rows))]
+        if n_rows <= args.in_memory_max:
+            modes.append(('in-memory', _run_in_memory, (str(csv_path), args.rounds)))
+
+        for mode, target, target_args in modes:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=target, args=(*target_args, queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                print(f"{n_rows:>11,} {mode:<12} ❌ process lỗi/hết RAM (exit {proc.exitcode})")
+                continue
+            r = queue.get()
+            print(f"{n_rows:>11,} {mode:<12} {r['total_s']:>10.1f} {r['mae']:>8.2f} {r['peak_rss_mb']:>14,.0f}",
+                  flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: lọc outlier theo segment brand/model/year (clean_data.filter_outliers) vs chỉ ngưỡng chung.
+
+Dữ liệu: tin giả lập (synthetic_listings, 10 hãng) theo schema raw của clean_data.py (giá VND), rồi gõ nhầm
+--typo-rate số tin: giá x10 hoặc /10 (Vios 4 tỷ, Land Cruiser 300 triệu) hoặc mileage x10 -> biết trước dòng lỗi.
+- ngưỡng chung: 5 triệu - 5 tỷ, mileage <= 500k (cách cũ)
+- MAD / IQR: thêm cận riêng từng segment, 1 lần groupby trên mã segment
+In thời gian, số dòng bị loại, precision/recall trên các dòng gõ nhầm.
+
+Chạy: python benchmarks/bench_segment_outliers.py --rows 2000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+
+from clean_data import clean_dataframe, filter_outliers
+from synthetic_listings import make_listings
+
+
+def _raw_listings(n_rows: int, typo_rate: float, seed: int = 0) -> (pd.DataFrame, np.ndarray):
+    df = make_listings(n_rows, n_brands=10, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    raw = pd.DataFrame({
+        'brand': df['make'], 'model': df['model'], 'year': df['year'], 'mileage_km': df['mileage'].astype(float),
+        'transmission': 'AT', 'fuel': 'Xăng', 'location': 'HN', 'price_vnd': df['price_vnd'] * 1_000_000,
+    })
+    typo = rng.random(n_rows) < typo_rate
+    kind = rng.integers(0, 3, n_rows)
+    raw.loc[typo & (kind == 0), 'price_vnd'] *= 10
+    raw.loc[typo & (kind == 1), 'price_vnd'] /= 10
+    # mileage x10 chỉ là lỗi khi xe đã đi đủ nhiều (xe mới 0 km x10 vẫn là 0)
+    mileage_typo = typo & (kind == 2) & (raw['mileage_km'] >= 20_000)
+    raw.loc[mileage_typo, 'mileage_km'] *= 10
+    typo = typo & ((kind != 2) | mileage_typo)
+    return raw, typo
+
+
+def _score(rejected_index: pd.Index, typo: np.ndarray) -> (float, float):
+    flagged = np.zeros(len(typo), dtype=bool)
+    flagged[rejected_index.to_numpy()] = True
+    tp = int((flagged & typo).sum())
+    return tp / max(int(flagged.sum()), 1), tp / max(int(typo.sum()), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--typo-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    raw, typo = _raw_listings(args.rows, args.typo_rate)
+    start = time.perf_counter()
+    cleaned = clean_dataframe(raw)
+    print(f"📊 {args.rows:,} tin, {int(typo.sum()):,} tin gõ nhầm; clean_dataframe {time.perf_counter() - start:.2f}s")
+    print(f"{'Cách':<14} {'Thời gian (s)':>14} {'Bị loại':>10} {'Precision':>10} {'Recall':>8}")
+    for name, method in (('ngưỡng chung', 'none'), ('MAD', 'mad'), ('IQR', 'iqr')):
+        start = time.perf_counter()
+        kept, quarantine = filter_outliers(cleaned, method=method)
+        elapsed = time.perf_counter() - start
+        precision, recall = _score(quarantine.index, typo)
+        print(f"{name:<14} {elapsed:>14.2f} {len(quarantine):>10,} {precision:>10.3f} {recall:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: model tổng (1 model cho mọi hãng) vs model theo hãng (train_shards.py + ShardRouter).
+So sánh MAE trên cùng tập test, thời gian train, latency 1 request, dung lượng file và RAM khi serving.
+
+Chạy: python benchmarks/bench_shards.py --rows 500000 --brands 10
+"""
+import argparse
+import multiprocessing as mp
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+
+def _rss_mb():
+    # RSS hiện tại (Linux, /proc) - không dùng ru_maxrss vì đỉnh lúc import đã lớn hơn phần model
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def _serving_memory(mode, model_dir, sample_path, max_loaded, queue):
+    """Load model như service rồi predict từng dòng mẫu (mọi hãng) -> RSS sau cùng"""
+    from service.shard_router import ShardRouter
+
+    sample = pd.read_pickle(sample_path)
+    # Model (MB) gồm cả thư viện mà unpickle kéo theo (xgboost...), như nhau ở cả 2 chế độ
+    baseline = _rss_mb()
+    if mode == 'monolithic':
+        pipeline = joblib.load(Path(model_dir) / "monolithic.pkl")
+        for i in range(len(sample)):
+            pipeline.predict(sample.iloc[[i]])
+    else:
+        router = ShardRouter.load(Path(model_dir) / "shards", max_loaded=max_loaded)
+        for i in range(len(sample)):
+            router.predict(sample.iloc[[i]], fallback=None)
+    queue.put({'rss_mb': _rss_mb(), 'model_mb': _rss_mb() - baseline})
+
+
+def _latency_ms(predict, rows: pd.DataFrame, repeats: int) -> float:
+    predict(rows.iloc[[0]])  # warm-up (load shard, cache)
+    times = []
+    for _ in range(repeats):
+        for i in range(len(rows)):
+            start = time.perf_counter()
+            predict(rows.iloc[[i]])
+            times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+def main():
+    from retrain_model import TEST_SIZE, SPLIT_SEED
+    from synthetic_listings import make_listings
+    from service.shard_router import ShardRouter
+    from train_shards import build_shard_pipeline, train_all_shards
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--brands', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-loaded', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    df = make_listings(args.rows, n_brands=args.brands)
+    X, y = df.drop(columns=['price_vnd']), df['price_vnd']
+
+    # Tập test của model tổng = hợp các tập test từng shard (cùng cách chia trong train_shard)
+    train_idx, test_idx = [], []
+    for make in X['make'].unique():
+        rows = np.flatnonzero((X['make'] == make).to_numpy())
+        tr, te = train_test_split(rows, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+        train_idx.append(tr)
+        test_idx.append(te)
+    train_idx, test_idx = np.concatenate(train_idx), np.concatenate(test_idx)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = Path(tmp)
+        print(f"📊 Model tổng vs model theo hãng - {args.rows:,} dòng, {args.brands} hãng")
+
+        start = time.perf_counter()
+        mono = build_shard_pipeline().fit(X.iloc[train_idx], y.iloc[train_idx])
+        mono_fit = time.perf_counter() - start
+        mono_mae = mean_absolute_error(y.iloc[test_idx], mono.predict(X.iloc[test_idx]))
+        joblib.dump(mono, model_dir / "monolithic.pkl")
+
+        start = time.perf_counter()
+        index = train_all_shards(X, y, shard_dir=model_dir / "shards", workers=args.workers, verbose=False)
+        shard_fit = time.perf_counter() - start
+
+        router = ShardRouter.load(model_dir / "shards", max_loaded=args.brands)
+        sample = X.iloc[test_idx].groupby('make').head(5)
+        sample_path = model_dir / "sample.pkl"
+        sample.to_pickle(sample_path)
+
+        mono_latency = _latency_ms(mono.predict, sample, args.repeats)
+        shard_latency = {make: _latency_ms(lambda rows: router.predict(rows, fallback=None),
+                                           sample[sample['make'] == make], args.repeats)
+                         for make in sample['make'].unique()}
+
+        ctx = mp.get_context('spawn')
+        memory = {}
+        for label, mode, max_loaded in [('monolithic', 'monolithic', 0),
+                                        ('shards (all)', 'shards', args.brands),
+                                        (f'shards (LRU {args.max_loaded})', 'shards', args.max_loaded)]:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_serving_memory, args=(mode, str(model_dir), str(sample_path), max_loaded, queue))
+            proc.start()
+            proc.join()
+            memory[label] = queue.get()
+
+        mono_mb = (model_dir / "monolithic.pkl").stat().st_size / 1e6
+        shard_mb = sum(s['size_mb'] for s in index['shards'].values())
+
+    print(f"\n{'':<22} {'MAE':>8} {'Train (s)':>10} {'File (MB)':>10} {'Latency p50 (ms)':>17}")
+    print(f"{'Model tổng':<22} {mono_mae:>8.2f} {mono_fit:>10.1f} {mono_mb:>10.1f} {mono_latency:>17.2f}")
+    print(f"{'Theo hãng':<22} {index['weighted_test_mae']:>8.2f} {shard_fit:>10.1f} {shard_mb:>10.1f} "
+          f"{np.median(list(shard_latency.values())):>17.2f}")
+
+    print(f"\n{'Hãng':<15} {'Dòng':>9} {'MAE':>8} {'Latency p50 (ms)':>17}")
+    for make, shard in index['shards'].items():
+        print(f"{make:<15} {shard['n_rows']:>9,} {shard['test_mae']:>8.2f} {shard_latency.get(make, np.nan):>17.2f}")
+
+    print(f"\n{'Serving':<22} {'RSS (MB)':>9} {'Model (MB)':>11}")
+    for label, r in memory.items():
+        print(f"{label:<22} {r['rss_mb']:>9,.0f} {r['model_mb']:>11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: one-hot dense (cách cũ) vs sparse CSR (retrain_model.build_preprocessor) trên dữ liệu giả lập.
+Mỗi cấu hình chạy trong 1 process riêng để đo peak RSS độc lập.
+
+Chạy: python benchmarks/bench_sparse_onehot.py --rows 1000000
+"""
+import argparse
+import multiprocessing as mp
+import resource
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+
+def _peak_rss_mb():
+    # Linux: ru_maxrss tính theo KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_config(n_rows, sparse, model_name, queue):
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import Pipeline
+    from retrain_model import build_preprocessor, CAT_FEATURES, NUM_FEATURES, TARGET_COL
+    from synthetic_listings import make_listings
+
+    df = make_listings(n_rows)
+    X = df[CAT_FEATURES + NUM_FEATURES]
+    y = df[TARGET_COL]
+    rss_after_data = _peak_rss_mb()
+
+    if model_name == 'Ridge':
+        model = Ridge(alpha=1.0)
+    else:
+        import xgboost as xgb
+        model = xgb.XGBRegressor(n_estimators=100, max_depth=7, learning_rate=0.1,
+                                 tree_method='hist', n_jobs=1, random_state=42)
+
+    pipeline = Pipeline(steps=[('preprocessor', build_preprocessor(sparse=sparse)),
+                               ('regressor', model)])
+    start = time.perf_counter()
+    pipeline.fit(X, y)
+    fit_time = time.perf_counter() - start
+
+    n_features = len(pipeline.named_steps['preprocessor'].get_feature_names_out())
+    queue.put({
+        'model': model_name,
+        'encoding': 'sparse' if sparse else 'dense',
+        'features': n_features,
+        'fit_s': fit_time,
+        'peak_rss_mb': _peak_rss_mb(),
+        'fit_extra_mb': _peak_rss_mb() - rss_after_data,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--models', nargs='+', default=['Ridge', 'XGBoost'])
+    args = parser.parse_args()
+
+    ctx = mp.get_context('spawn')
+    print(f"📊 One-hot dense vs sparse - {args.rows:,} dòng")
+    print(f"{'Model':<10} {'Encoding':<8} {'Features':>8} {'Fit (s)':>9} {'Peak RSS (MB)':>14} {'Fit thêm (MB)':>14}")
+    for model_name in args.models:
+        for sparse in (False, True):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run_config, args=(args.rows, sparse, model_name, queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                print(f"{model_name:<10} {'sparse' if sparse else 'dense':<8} ❌ process lỗi/hết RAM (exit {proc.exitcode})")
+                continue
+            r = queue.get()
+            print(f"{r['model']:<10} {r['encoding']:<8} {r['features']:>8} {r['fit_s']:>9.1f} "
+                  f"{r['peak_rss_mb']:>14,.0f} {r['fit_extra_mb']:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: mã hoá cột version bằng one-hot vs target encoding (out-of-fold) vs tần suất
+(retrain_model.build_preprocessor(version_encoding=...)). So sánh số cột, thời gian fit, MAE,
+latency predict 1 dòng (như 1 request /predict) và dung lượng pipeline sau khi pickle.
+
+Chạy: python benchmarks/bench_version_encoding.py --rows 200000 --brands 10
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import joblib
+import numpy as np
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from retrain_model import build_preprocessor, CAT_FEATURES, NUM_FEATURES, TARGET_COL
+from synthetic_listings import make_listings
+
+
+def _make_model(name):
+    if name == 'Ridge':
+        return Ridge(alpha=1.0)
+    import xgboost as xgb
+    return xgb.XGBRegressor(n_estimators=300, max_depth=8, learning_rate=0.1,
+                            tree_method='hist', n_jobs=1, random_state=42)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--brands', type=int, default=10)
+    parser.add_argument('--models', nargs='+', default=['Ridge', 'XGBoost'])
+    parser.add_argument('--latency-samples', type=int, default=200)
+    args = parser.parse_args()
+
+    df = make_listings(args.rows, n_brands=args.brands)
+    X, y = df[CAT_FEATURES + NUM_FEATURES], df[TARGET_COL]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    print(f"📊 Mã hoá version - {args.rows:,} dòng, {X['version'].nunique()} version khác nhau")
+    print(f"{'Model':<9} {'Encoding':<10} {'Cột':>6} {'Fit (s)':>8} {'MAE':>8} {'1 dòng p50 (ms)':>16} {'Pickle (MB)':>12}")
+
+    for model_name in args.models:
+        for encoding in ('onehot', 'target', 'frequency'):
+            pipeline = Pipeline(steps=[('preprocessor', build_preprocessor(sparse=True, version_encoding=encoding)),
+                                       ('regressor', _make_model(model_name))])
+            start = time.perf_counter()
+            pipeline.fit(X_train, y_train)
+            fit_s = time.perf_counter() - start
+            mae = mean_absolute_error(y_test, pipeline.predict(X_test))
+            width = len(pipeline.named_steps['preprocessor'].get_feature_names_out())
+
+            latencies = []
+            for i in range(args.latency_samples):
+                row = X_test.iloc[[i]]
+                start = time.perf_counter()
+                pipeline.predict(row)
+                latencies.append(time.perf_counter() - start)
+
+            buffer = io.BytesIO()
+            joblib.dump(pipeline, buffer)
+            print(f"{model_name:<9} {encoding:<10} {width:>6} {fit_s:>8.1f} {mae:>8.2f} "
+                  f"{np.median(latencies) * 1000:>16.2f} {buffer.tell() / 1e6:>12.2f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Sinh dữ liệu tin đăng giả lập (cùng schema với data/toyota_cleaned.csv) cho các benchmark.
+Vocabulary lấy từ metadata.json để số lượng model/version/color sát với thực tế.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from service.metadata_index import load_metadata, iter_combinations
+
+# Giống TARGET_BRANDS trong clean_data.py
+BRANDS = ["Toyota", "VinFast", "Honda", "Hyundai", "Kia", "Mazda", "Suzuki", "BMW", "Ford", "Mercedes-Benz"]
+
+
+def make_listings(n_rows: int, n_brands: int = 1, seed: int = 42) -> pd.DataFrame:
+    """
+    DataFrame n_rows dòng với cột make/model/version/color/year/mileage/price_vnd.
+    n_brands > 1: nhân bản vocabulary Toyota sang các hãng khác (giả lập dữ liệu 10 hãng).
+    mileage là số nguyên (km), price_vnd theo triệu VND.
+    """
+    rng = np.random.default_rng(seed)
+    combos = pd.DataFrame(list(iter_combinations(load_metadata())),
+                          columns=['make', 'model', 'year', 'version', 'color'])
+
+    # Mã model/version tính trên vocabulary (không phụ thuộc mẫu) -> cùng 1 xe có cùng giá gốc
+    # giữa các chunk sinh với seed khác nhau (write_listings_csv)
+    model_code = pd.factorize(combos['model'], sort=True)[0]
+    version_code = pd.factorize(combos['version'], sort=True)[0]
+
+    idx = rng.integers(0, len(combos), n_rows)
+    df = combos.iloc[idx].reset_index(drop=True)
+    brand_code = np.zeros(n_rows, dtype=np.int64)
+    if n_brands > 1:
+        brand_code = rng.integers(0, n_brands, n_rows)
+        df['make'] = np.asarray(BRANDS[:n_brands], dtype=object)[brand_code]
+
+    age = np.maximum(2025 - df['year'].to_numpy(), 0)
+    df['mileage'] = np.clip(age * rng.normal(15_000, 5_000, n_rows), 0, 490_000).astype(np.int64)
+
+    # Giá gốc theo model/version + khấu hao theo tuổi và km + nhiễu log-normal
+    model_base = 300 + (model_code[idx] % 9) * 120
+    version_bonus = (version_code[idx] % 13) * 15
+    brand_factor = 1 + (brand_code % 5) * 0.1
+    price = (model_base + version_bonus) * brand_factor * 0.9 ** age * (1 - df['mileage'] / 1e6)
+    df['price_vnd'] = np.round(price * rng.lognormal(0, 0.08, n_rows), 0)
+
+    return df[['make', 'model', 'version', 'color', 'year', 'mileage', 'price_vnd']]
+
+
+def write_listings_csv(path: Path, n_rows: int, n_brands: int = 1, chunk_rows: int = 500_000,
+                       seed: int = 42) -> Path:
+    """Ghi CSV theo từng chunk để sinh được file rất lớn (10M dòng) mà không cần giữ hết trong RAM"""
+    path = Path(path)
+    written = 0
+    chunk_id = 0
+    while written < n_rows:
+        rows = min(chunk_rows, n_rows - written)
+        chunk = make_listings(rows, n_brands=n_brands, seed=seed + chunk_id)
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=(written == 0), index=False)
+        written += rows
+        chunk_id += 1
+    return path
@@ -0,0 +1,34 @@
+"""
+Script build index autocomplete hãng/dòng/version từ metadata.json (service/autocomplete.py).
+- Key đã fold sẵn (bỏ dấu, chữ thường) cho mọi điểm bắt đầu từ, sắp xếp để tra tiền tố bằng bisect.
+- Lưu models/autocomplete_index.json (kèm hash metadata.json); service load file này thay vì duyệt metadata.
+Cần chạy lại mỗi khi cập nhật metadata.json (service tự compile lại nếu file thiếu hoặc cũ).
+"""
+import time
+
+from service.autocomplete import INDEX_PATH, AutocompleteIndex, compile_index, metadata_fingerprint, save_index
+from service.metadata_index import METADATA_PATH, load_metadata
+
+
+def main():
+    print("="*60)
+    print("BUILD INDEX AUTOCOMPLETE")
+    print("="*60)
+
+    print(f"\n📁 Đang đọc metadata: {METADATA_PATH.name} ({METADATA_PATH.stat().st_size / 1024:.0f} KB)")
+    start = time.perf_counter()
+    index = compile_index(load_metadata())
+    elapsed = time.perf_counter() - start
+    print(f"   ✅ {len(index['entries'])} hãng/dòng, {sum(map(len, index['versions']))} version, "
+          f"{len(index['keys']):,} key ({elapsed * 1000:.0f} ms)")
+
+    save_index(index, metadata_fingerprint(METADATA_PATH))
+    print(f"\n💾 Đã lưu index: {INDEX_PATH} ({INDEX_PATH.stat().st_size / 1024:.0f} KB)")
+
+    sample = AutocompleteIndex.load()
+    for query in ("cam", "land cr"):
+        print(f"   🔎 '{query}' -> {[s['label'] for s in sample.search(query, limit=3)]}")
+
+
+if __name__ == '__main__':
+    main()
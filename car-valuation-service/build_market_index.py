@@ -0,0 +1,167 @@
+"""
+Job dựng chỉ số giá thị trường theo thời gian từ bảng 'cleaned' của lake (listings_lake.py).
+
+- Mỗi (ngày scrape, make, model, year) là 1 dòng: số tin, p25 / median / p75 giá rao (triệu VND),
+  gộp mọi nguồn. Lưu models/market_price_index.parquet, sắp theo make/model/year/ngày -> service mở
+  bằng service/market_index.py và trả chuỗi thời gian của 1 segment bằng 1 lần cắt mảng.
+- Cập nhật tăng dần theo phân vùng scrape_date: state (data/cache/<tên output>-state.json) lưu chữ ký
+  (đường dẫn, kích thước file) của từng ngày scrape. Lần chạy sau chỉ tính lại những ngày có file mới/đổi
+  (scrape mới, ingest_listings.py --lake, compact), bỏ ngày không còn trong lake; lịch sử khác giữ nguyên.
+  Median/percentile không cộng dồn được -> ngày bị đổi được tính lại từ đầu, nhưng chỉ đọc phân vùng của ngày đó.
+- --rebuild: bỏ qua state, tính lại toàn bộ.
+
+Chạy: python build_market_index.py [--rebuild]
+"""
+import argparse
+import hashlib
+import json
+import time
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import listings_lake as lake
+from dataset_cache import CACHE_DIR
+from service.market_index import INDEX_PATH, SEGMENT_COLUMNS, load_index_frame
+
+QUANTILES = {'p25': 0.25, 'median': 0.5, 'p75': 0.75}
+STATE_VERSION = 1
+
+
+def partition_signatures(table: str = 'cleaned') -> Dict[str, str]:
+    """{ngày scrape 'YYYY-MM-DD': hash (đường dẫn, kích thước) mọi file của ngày đó, qua mọi nguồn/hãng}"""
+    root = lake.table_dir(table)
+    files_by_date = defaultdict(list)
+    for path in lake.lake_files(table):
+        scrape_date = path.parent.name.split('=', 1)[1]
+        files_by_date[scrape_date].append(f"{path.relative_to(root)}:{path.stat().st_size}")
+    return {d: hashlib.sha256('\n'.join(sorted(files)).encode('utf-8')).hexdigest()
+            for d, files in sorted(files_by_date.items())}
+
+
+def aggregate_date(scrape_date: str, table: str = 'cleaned') -> pd.DataFrame:
+    """Thống kê giá của 1 ngày scrape: chỉ đọc các phân vùng scrape_date=ngày đó, 4 cột"""
+    where = ds.field('scrape_date') == pa.scalar(date.fromisoformat(scrape_date), pa.date32())
+    df = lake.read_listings(table, columns=[*SEGMENT_COLUMNS, 'price_vnd'], where=where)
+    df = df.dropna(subset=[*SEGMENT_COLUMNS, 'price_vnd'])
+    if df.empty:
+        return pd.DataFrame(columns=['scrape_date', *SEGMENT_COLUMNS, 'count', *QUANTILES])
+
+    grouped = df.groupby(SEGMENT_COLUMNS, observed=True, sort=True)['price_vnd']
+    stats = grouped.quantile(list(QUANTILES.values())).unstack()
+    stats.columns = list(QUANTILES)
+    stats.insert(0, 'count', grouped.size())
+    stats = stats.reset_index()
+    stats.insert(0, 'scrape_date', pd.Timestamp(scrape_date))
+    return stats
+
+
+def to_index_frame(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Gộp + ép kiểu gọn (category, int32, float32) + sắp theo segment rồi ngày"""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=['scrape_date', *SEGMENT_COLUMNS, 'count', *QUANTILES])
+    df = pd.concat(frames, ignore_index=True)
+    df = df.astype({'make': 'category', 'model': 'category', 'year': 'int32', 'count': 'int32',
+                    **{q: 'float32' for q in QUANTILES}})
+    df['scrape_date'] = pd.to_datetime(df['scrape_date']).astype('datetime64[s]')
+    sort_keys = [*SEGMENT_COLUMNS, 'scrape_date']
+    # Category sắp theo tên (không theo thứ tự xuất hiện) để thứ tự file không phụ thuộc lần chạy
+    order = df[sort_keys].astype({'make': str, 'model': str}).sort_values(sort_keys, kind='stable').index
+    return df.loc[order, ['scrape_date', *SEGMENT_COLUMNS, 'count', *QUANTILES]].reset_index(drop=True)
+
+
+def save_index_frame(df: pd.DataFrame, path: Path = INDEX_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.parquet.tmp')
+    df.to_parquet(tmp_path, index=False)
+    tmp_path.replace(path)
+
+
+def state_path_for(output: Path) -> Path:
+    """Mỗi file index có state riêng (vd. --output khác khi thử nghiệm không làm hỏng state của index chính)"""
+    return CACHE_DIR / f"{output.stem}-state.json"
+
+
+def load_state(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    return state if state.get('version') == STATE_VERSION else {}
+
+
+def save_state(state: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, **state}, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+
+def update_market_index(output: Path = INDEX_PATH, rebuild: bool = False) -> dict:
+    """
+    Cập nhật chỉ số giá: tính lại ngày scrape có file mới/đổi, bỏ ngày đã mất khỏi lake, giữ nguyên các ngày khác.
+    Trả về {'changed': [...], 'removed': [...], 'rows': số dòng index}.
+    """
+    signatures = partition_signatures()
+    state_path = state_path_for(output)
+    state = {} if rebuild or not output.exists() else load_state(state_path)
+    previous = state.get('partitions', {})
+
+    changed = [d for d, signature in signatures.items() if previous.get(d) != signature]
+    removed = sorted(set(previous) - set(signatures))
+    if not changed and not removed:
+        return {'changed': [], 'removed': [], 'rows': len(load_index_frame(output))}
+
+    frames = []
+    if previous:
+        kept = load_index_frame(output)
+        stale = pd.to_datetime(changed + removed).astype('datetime64[s]')
+        frames.append(kept[~kept['scrape_date'].isin(stale)])
+    for scrape_date in changed:
+        frames.append(aggregate_date(scrape_date))
+
+    index = to_index_frame(frames)
+    save_index_frame(index, output)
+    save_state({'partitions': signatures}, state_path)
+    return {'changed': changed, 'removed': removed, 'rows': len(index)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Dựng chỉ số giá thị trường theo ngày scrape từ lake")
+    parser.add_argument('--output', type=Path, default=INDEX_PATH)
+    parser.add_argument('--rebuild', action='store_true', help="Bỏ qua state, tính lại toàn bộ lịch sử")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("="*60)
+    print("BUILD CHỈ SỐ GIÁ THỊ TRƯỜNG")
+    print("="*60)
+
+    if not lake.lake_exists('cleaned'):
+        raise FileNotFoundError(f"❌ Lake chưa có bảng 'cleaned' ({lake.table_dir('cleaned')}). "
+                                "Chạy ingest_listings.py --lake hoặc listings_lake.py import ... --table cleaned")
+
+    start = time.perf_counter()
+    result = update_market_index(args.output, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - start
+    if not result['changed'] and not result['removed']:
+        print(f"✅ Không có phân vùng mới, index giữ nguyên ({result['rows']:,} dòng)")
+        return
+
+    print(f"🔄 Tính lại {len(result['changed'])} ngày scrape, bỏ {len(result['removed'])} ngày ({elapsed:.2f}s)")
+    if result['changed']:
+        print(f"   📅 {result['changed'][0]} -> {result['changed'][-1]}")
+    print(f"\n💾 Đã lưu: {args.output} ({result['rows']:,} dòng, {args.output.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Script build bảng giá tính sẵn cho toàn bộ tổ hợp xe trong metadata.json.
+- Chấm điểm mọi tổ hợp (make, model, year, version, color) x lưới km trong 1 lần predict.
+- Lưu ma trận float32 (models/price_table.npy) + index key (models/price_table_index.json).
+- Service sẽ tra bảng + nội suy theo km cho tổ hợp đã biết, chỉ gọi model với input lạ.
+Cần chạy lại mỗi khi retrain model hoặc cập nhật metadata.json.
+"""
+import time
+from pathlib import Path
+
+import joblib
+
+from service.metadata_index import load_metadata, iter_combinations, METADATA_PATH
+from service.price_table import (
+    MILEAGE_GRID, TABLE_PATH, INDEX_PATH,
+    build_price_table, save_price_table, make_key, model_fingerprint,
+)
+
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_PATH = BASE_DIR / "models" / "best_car_price_pipeline.pkl"
+
+
+def main():
+    print("="*60)
+    print("BUILD BẢNG GIÁ TÍNH SẴN")
+    print("="*60)
+
+    if not MODEL_PATH.exists():
+        raise FileNotFoundError(f"❌ Không tìm thấy file model tại: {MODEL_PATH}")
+
+    print(f"\n📁 Đang load model: {MODEL_PATH.name}")
+    pipeline = joblib.load(MODEL_PATH)
+
+    print(f"📁 Đang đọc metadata: {METADATA_PATH.name}")
+    combos = list(iter_combinations(load_metadata()))
+    print(f"   ✅ {len(combos)} tổ hợp x {len(MILEAGE_GRID)} mốc km = {len(combos) * len(MILEAGE_GRID):,} dòng")
+
+    start = time.perf_counter()
+    table = build_price_table(pipeline, combos, MILEAGE_GRID)
+    elapsed = time.perf_counter() - start
+    print(f"   ✅ Predict batch xong trong {elapsed:.2f}s")
+
+    keys = [make_key(*combo) for combo in combos]
+    save_price_table(table, keys, MILEAGE_GRID, model_fingerprint(MODEL_PATH))
+
+    print(f"\n💾 Đã lưu bảng giá:")
+    print(f"   - {TABLE_PATH} ({TABLE_PATH.stat().st_size / 1024:.0f} KB)")
+    print(f"   - {INDEX_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,38 @@
+"""
+Làm sạch dữ liệu scrape thô (data/raw_bonbanh.csv) -> data/car_listings_clean.csv + metadata dropdown.
+
+- Mặc định: đọc cả file vào RAM như trước.
+- --stream: đọc theo chunk cố định (--chunk-rows), lọc/chuyển kiểu vector hoá trên từng chunk rồi ghi nối tiếp,
+  RAM không tăng theo số dòng. Metadata brand/model/year được cộng dồn theo chunk.
+Cả 2 chế độ cho ra cùng nội dung.
+brand/model chuẩn hoá theo bảng alias dùng chung với scrapers + service (service/aliases.json).
+
+File kết quả chỉ ghi 1 lần: car_listings.csv (file chính để train) và car_listings_raw.csv (bản raw)
+là link tới file thật (symlink, không được thì hardlink); data/car_listings.manifest.json ghi lại các alias
+và số dòng.
+
+Outlier lọc theo segment (brand, model, year) thay vì chỉ dùng ngưỡng chung cho mọi xe: ngưỡng chung
+(giá 5 triệu - 5 tỷ, mileage <= 500k km) vẫn giữ để bắt giá trị vô lý, sau đó mỗi segment có cận riêng
+tính từ median/MAD (mặc định) hoặc IQR của log(giá) và mileage -> Land Cruiser 300 triệu hay Vios 4 tỷ
+(gõ nhầm số) bị loại dù nằm trong ngưỡng chung. Segment có ít hơn --min-segment-rows dòng chỉ dùng ngưỡng chung.
+Dòng bị loại ghi vào data/car_listings_quarantine.csv kèm lý do + cận của segment để kiểm tra lại.
+Cận tính bằng 1 lần groupby trên mã segment (số nguyên) rồi broadcast về từng dòng theo mã, không lặp theo segment;
+--stream: lần 1 chỉ giữ mã segment + giá + mileage (24 byte/dòng) để tính cận, lần 2 đọc lại file tạm để lọc.
+
+Chạy: python clean_data.py [--stream --chunk-rows 200000] [--outlier-method mad|iqr|none]
+"""
+import argparse
+import json
+import os
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
+from service.aliases import load_alias_table
+
 
 TARGET_BRANDS = [
     "Toyota",
@@ -17,21 +47,54 @@ TARGET_BRANDS = [
     "Mercedes-Benz",
 ]
 
+KEEP_COLS: List[str] = [
+    "brand",
+    "model",
+    "year",
+    "mileage_km",
+    "transmission",
+    "fuel",
+    "location",
+    "price_vnd",
+]
+
+# Cột số nguyên: ép về Int64 (cho phép thiếu) để mọi chunk ghi ra cùng định dạng (2018, không phải 2018.0)
+INTEGER_COLS = ["year", "mileage_km", "price_vnd"]
+
+# Ngưỡng chung cho mọi xe (giá trị vô lý)
+PRICE_RANGE = (5_000_000, 5_000_000_000)
+MAX_MILEAGE_KM = 500_000
+
+# Outlier theo segment: cận = tâm ± k * độ phân tán, tính riêng cho từng (brand, model, year)
+SEGMENT_COLS = ["brand", "model", "year"]
+OUTLIER_K = {"mad": 5.0, "iqr": 3.0}
+MIN_SEGMENT_ROWS = 8
+# Độ phân tán tối thiểu: segment mọi xe gần cùng giá/km không loại nhầm xe lệch vài %
+MIN_LOG_PRICE_SPREAD = 0.05
+MIN_MILEAGE_SPREAD = 10_000
+QUARANTINE_COLS = ["reason", "segment_rows", "price_low", "price_high", "mileage_high"]
+
+ALIASES = load_alias_table()
+
 
 def normalize_brand(brand: str) -> str:
-    if not isinstance(brand, str):
-        return ""
-    b = brand.strip()
-    # TODO: có thể bổ sung mapping alias, ví dụ "Mec", "Mercedes" -> "Mercedes-Benz"
-    return b
+    # Alias ("Mec", "Mercedes" -> "Mercedes-Benz") lấy từ service/aliases.json
+    return ALIASES.brand(brand)
+
 
+def normalize_model(model: str, brand: str = "") -> str:
+    # Alias model theo hãng (Lux SA2.0 -> Lux SA 2.0, ...); brand là tên hãng đã chuẩn hoá
+    return ALIASES.model(brand, model)
 
-def normalize_model(model: str) -> str:
-    if not isinstance(model, str):
-        return ""
-    m = model.strip()
-    # TODO: thêm mapping alias model nếu cần (Lux SA2.0 -> Lux SA 2.0, ...)
-    return m
+
+def _normalize_brand_model(df: pd.DataFrame) -> None:
+    """
+    Bản vector hoá của normalize_brand/normalize_model: mỗi giá trị khác nhau chỉ chuẩn hoá 1 lần
+    (factorize + remap codes), brand/model thành cột category
+    """
+    missing = pd.Series(None, index=df.index, dtype=object)
+    df["brand"] = ALIASES.normalize_brands(df["brand"] if "brand" in df.columns else missing)
+    df["model"] = ALIASES.normalize_models(df["brand"], df["model"] if "model" in df.columns else missing)
 
 
 def load_raw_dataframe(base_dir: Path) -> pd.DataFrame:
@@ -41,92 +104,341 @@ def load_raw_dataframe(base_dir: Path) -> pd.DataFrame:
 
 
 def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    # Chuẩn hoá brand/model
-    df["brand"] = df.get("brand", "").apply(normalize_brand)
-    df["model"] = df.get("model", "").apply(normalize_model)
+    """Lọc/chuyển kiểu từng dòng độc lập (không phụ thuộc dòng khác) -> dùng được cho cả file lẫn từng chunk"""
+    df = df.copy()
+
+    # Chuẩn hoá brand/model theo bảng alias
+    _normalize_brand_model(df)
 
     # Lọc 10 hãng mục tiêu
     df = df[df["brand"].isin(TARGET_BRANDS)]
 
-    # Bỏ bản ghi thiếu giá hoặc thiếu năm
-    df = df.dropna(subset=["price_vnd", "year"])
-
     # Chuyển kiểu dữ liệu phù hợp
     df["price_vnd"] = pd.to_numeric(df["price_vnd"], errors="coerce")
     df["year"] = pd.to_numeric(df["year"], errors="coerce")
-    df["mileage_km"] = pd.to_numeric(df.get("mileage_km"), errors="coerce")
 
-    # Loại bỏ outlier giá quá bất thường
-    df = df[(df["price_vnd"] >= 5_000_000) & (df["price_vnd"] <= 5_000_000_000)]
+    # Bỏ bản ghi thiếu giá hoặc thiếu năm, kể cả giá trị không phải số (NA sau khi ép kiểu)
+    df = df.dropna(subset=["price_vnd", "year"])
+    df["mileage_km"] = pd.to_numeric(df["mileage_km"], errors="coerce") if "mileage_km" in df.columns else float("nan")
 
-    # Loại bỏ mileage quá bất thường (nếu có)
-    if "mileage_km" in df.columns:
-        df = df[(df["mileage_km"].isna()) | (df["mileage_km"] <= 500_000)]
+    # Outlier (ngưỡng chung + theo segment) lọc sau ở filter_outliers để ghi được lý do vào quarantine
+    for col in INTEGER_COLS:
+        df[col] = df[col].round().astype("Int64")
 
     # Chọn các cột cần thiết
-    keep_cols: List[str] = [
-        "brand",
-        "model",
-        "year",
-        "mileage_km",
-        "transmission",
-        "fuel",
-        "location",
-        "price_vnd",
-    ]
-    df = df[[c for c in keep_cols if c in df.columns]]
+    df = df[[c for c in KEEP_COLS if c in df.columns]]
 
     return df
 
 
-def export_metadata(df_clean: pd.DataFrame, base_dir: Path) -> None:
+def global_outlier_reason(df: pd.DataFrame) -> pd.Series:
+    """Lý do loại theo ngưỡng chung (None = qua): giá ngoài PRICE_RANGE, mileage > MAX_MILEAGE_KM"""
+    price = df["price_vnd"].astype("float64").to_numpy()
+    mileage = df["mileage_km"].astype("float64").to_numpy()
+    reason = np.select(
+        # Giá thiếu/không phải số cũng bị loại (so sánh với NaN luôn False)
+        [~((price >= PRICE_RANGE[0]) & (price <= PRICE_RANGE[1])), mileage > MAX_MILEAGE_KM],
+        ["price_out_of_range", "mileage_out_of_range"],
+        default=None,
+    )
+    return pd.Series(reason, index=df.index, dtype=object)
+
+
+def segment_ids(df: pd.DataFrame, registry: Dict[tuple, int]) -> np.ndarray:
+    """
+    Mã segment (brand, model, year) của từng dòng. registry: {(brand, model, year): mã}, dùng chung giữa các chunk
+    để cùng segment có cùng mã. Ghép code category brand/model + year thành 1 số nguyên rồi factorize
+    -> chỉ tra registry cho mỗi segment khác nhau, không cho từng dòng.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.int64)
+    # Model thiếu: lần 1 là "" (_normalize_brand_model), đọc lại từ file tạm là NaN -> cùng 1 segment ""
+    brand = df["brand"].fillna("").astype("category").cat
+    model = df["model"].fillna("").astype("category").cat
+    if (brand.codes < 0).any() or (model.codes < 0).any():
+        raise ValueError("❌ brand/model có giá trị không mã hoá được thành segment")
+    year = df["year"].to_numpy(dtype=np.int64)
+    year0 = int(year.min())
+    span = int(year.max()) - year0 + 1
+    n_models = len(model.categories)
+    pair = brand.codes.to_numpy(dtype=np.int64) * n_models + model.codes.to_numpy(dtype=np.int64)
+    key = pair * span + (year - year0)
+    local, uniques = pd.factorize(key)
+    brand_code, rest = np.divmod(uniques, n_models * span)
+    model_code, year_offset = np.divmod(rest, span)
+    keys = zip(brand.categories[brand_code], model.categories[model_code], (year_offset + year0).tolist())
+    mapping = np.fromiter((registry.setdefault(k, len(registry)) for k in keys), dtype=np.int64, count=len(uniques))
+    return mapping[local]
+
+
+def _robust_range(values: pd.Series, codes: np.ndarray, method: str, k: float, min_spread: float):
+    """Cận dưới/trên theo từng mã segment: median ± k*MAD (chuẩn hoá 1.4826) hoặc [Q1 - k*IQR, Q3 + k*IQR]"""
+    grouped = values.groupby(codes)
+    if method == "mad":
+        center = grouped.median()
+        deviation = (values - center.to_numpy()[codes]).abs()
+        spread = (deviation.groupby(codes).median() * 1.4826).clip(lower=min_spread)
+        return center - k * spread, center + k * spread
+    quartiles = grouped.quantile([0.25, 0.75]).unstack()
+    iqr = (quartiles[0.75] - quartiles[0.25]).clip(lower=min_spread)
+    return quartiles[0.25] - k * iqr, quartiles[0.75] + k * iqr
+
+
+def segment_bounds(codes: np.ndarray, price: np.ndarray, mileage: np.ndarray, method: str = "mad",
+                   k: float = None, min_rows: int = MIN_SEGMENT_ROWS) -> pd.DataFrame:
+    """
+    Cận outlier của từng segment, index = mã segment (0..n-1): segment_rows, price_low, price_high, mileage_high.
+    Giá xét trên log (lệch theo tỉ lệ), mileage xét trên km. Segment ít hơn min_rows dòng -> cận vô hạn.
+    """
+    k = OUTLIER_K[method] if k is None else k
+    codes = np.asarray(codes)
+    n_segments = int(codes.max()) + 1 if len(codes) else 0
+    rows = np.bincount(codes, minlength=n_segments)
+    price_low, price_high = _robust_range(pd.Series(np.log(price)), codes, method, k, MIN_LOG_PRICE_SPREAD)
+    _, mileage_high = _robust_range(pd.Series(mileage), codes, method, k, MIN_MILEAGE_SPREAD)
+    bounds = pd.DataFrame({
+        "segment_rows": rows,
+        "price_low": np.exp(price_low.reindex(range(n_segments))),
+        "price_high": np.exp(price_high.reindex(range(n_segments))),
+        "mileage_high": mileage_high.reindex(range(n_segments)),
+    })
+    small = bounds["segment_rows"].to_numpy() < min_rows
+    bounds.loc[small, ["price_low", "price_high", "mileage_high"]] = [0.0, np.inf, np.inf]
+    # Segment không có mileage nào -> không lọc mileage
+    bounds["mileage_high"] = bounds["mileage_high"].fillna(np.inf)
+    return bounds
+
+
+def split_segment_outliers(df: pd.DataFrame, codes: np.ndarray,
+                           bounds: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(dòng giữ lại, dòng bị loại + QUARANTINE_COLS) theo cận của segment từng dòng"""
+    row_bounds = bounds.iloc[codes].set_axis(df.index)
+    price = df["price_vnd"].astype("float64").to_numpy()
+    mileage = df["mileage_km"].astype("float64").to_numpy()
+    reason = np.select(
+        [price < row_bounds["price_low"].to_numpy(), price > row_bounds["price_high"].to_numpy(),
+         mileage > row_bounds["mileage_high"].to_numpy()],
+        ["price_below_segment", "price_above_segment", "mileage_above_segment"],
+        default=None,
+    )
+    rejected = pd.notna(reason)
+    quarantine = df[rejected].assign(reason=reason[rejected], **row_bounds[rejected])
+    return df[~rejected], quarantine
+
+
+def _global_quarantine(df: pd.DataFrame, reason: pd.Series) -> pd.DataFrame:
+    rejected = df[reason.notna()]
+    return rejected.assign(reason=reason[reason.notna()], segment_rows=pd.NA,
+                           price_low=float(PRICE_RANGE[0]), price_high=float(PRICE_RANGE[1]),
+                           mileage_high=float(MAX_MILEAGE_KM))
+
+
+def filter_outliers(df: pd.DataFrame, method: str = "mad", k: float = None,
+                    min_rows: int = MIN_SEGMENT_ROWS) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Lọc outlier trên cả DataFrame đã clean -> (dòng giữ lại, quarantine có cột reason).
+    Ngưỡng chung trước; cận segment tính trên các dòng qua ngưỡng chung. method='none': chỉ ngưỡng chung.
+    """
+    reason = global_outlier_reason(df)
+    quarantine = _global_quarantine(df, reason)
+    df = df[reason.isna()]
+    if method != "none" and not df.empty:
+        codes = segment_ids(df, {})
+        bounds = segment_bounds(codes, df["price_vnd"].astype("float64").to_numpy(),
+                                df["mileage_km"].astype("float64").to_numpy(), method, k, min_rows)
+        df, segment_quarantine = split_segment_outliers(df, codes, bounds)
+        quarantine = pd.concat([quarantine, segment_quarantine])
+    return df, quarantine
+
+
+def metadata_counts(df_clean: pd.DataFrame) -> dict:
+    """Số bản ghi theo brand-model và brand-model-year (cộng được giữa các chunk)"""
+    # observed=True: brand/model là category, chỉ đếm tổ hợp có thật
+    counts = {"brand_model": df_clean.groupby(["brand", "model"], observed=True)["price_vnd"].count()}
+    if "year" in df_clean.columns:
+        counts["brand_model_year"] = df_clean.groupby(["brand", "model", "year"], observed=True)["price_vnd"].count()
+    return counts
+
+
+def _merge_counts(total: dict, counts: dict) -> dict:
+    for name, series in counts.items():
+        total[name] = series if name not in total else total[name].add(series, fill_value=0).astype(series.dtype)
+    return total
+
+
+def export_metadata(df_clean: pd.DataFrame, base_dir: Path, counts: dict = None) -> None:
     """
     Sinh ra các file metadata phục vụ dropdown:
     - brand_model.csv
     - brand_model_year.csv
+    counts: kết quả metadata_counts đã cộng dồn (chế độ stream), khi đó không cần df_clean.
     """
     metadata_dir = base_dir / "metadata"
     metadata_dir.mkdir(exist_ok=True)
+    counts = counts if counts is not None else metadata_counts(df_clean)
 
-    # Danh sách brand-model phổ biến với số lượng bản ghi
-    brand_model = (
-        df_clean.groupby(["brand", "model"])["price_vnd"]
-        .count()
-        .reset_index(name="listing_count")
-    )
-    brand_model_out = metadata_dir / "brand_model.csv"
-    brand_model.to_csv(brand_model_out, index=False)
+    # Danh sách brand-model (và brand-model-year) với số lượng bản ghi
+    for name, series in counts.items():
+        series.sort_index().reset_index(name="listing_count").to_csv(metadata_dir / f"{name}.csv", index=False)
 
-    # Danh sách brand-model-year với số lượng bản ghi
-    if "year" in df_clean.columns:
-        brand_model_year = (
-            df_clean.groupby(["brand", "model", "year"])["price_vnd"]
-            .count()
-            .reset_index(name="listing_count")
-        )
-        brand_model_year_out = metadata_dir / "brand_model_year.csv"
-        brand_model_year.to_csv(brand_model_year_out, index=False)
 
+def _link_alias(target: Path, alias: Path) -> str:
+    """alias -> target bằng symlink (tương đối), không được thì hardlink; trả về kiểu link hoặc 'manifest'"""
+    alias.unlink(missing_ok=True)
+    try:
+        alias.symlink_to(os.path.relpath(target, alias.parent))
+        return "symlink"
+    except OSError:
+        pass
+    try:
+        os.link(target, alias)
+        return "hardlink"
+    except OSError:
+        # Không tạo được link (vd. khác ổ đĩa) -> chỉ ghi trong manifest
+        return "manifest"
 
-def main() -> None:
-    base_dir = Path(__file__).resolve().parent
 
-    df_raw = load_raw_dataframe(base_dir)
-    raw_out = base_dir / "data" / "car_listings_raw.csv"
-    df_raw.to_csv(raw_out, index=False)
+def write_outputs(raw_path: Path, clean_path: Path, data_dir: Path, stats: dict) -> None:
+    """car_listings.csv / car_listings_raw.csv thành alias + manifest thay vì ghi thêm 2 bản copy"""
+    aliases = {
+        "car_listings.csv": clean_path,
+        "car_listings_raw.csv": raw_path,
+    }
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "source": raw_path.name,
+        **stats,
+        "files": {clean_path.name: {"rows": stats["rows_out"]}},
+        "aliases": {},
+    }
+    for alias_name, target in aliases.items():
+        kind = _link_alias(target, data_dir / alias_name)
+        manifest["aliases"][alias_name] = {"target": os.path.relpath(target, data_dir), "link": kind}
+        if kind == "manifest":
+            print(f"⚠️  Không tạo được link {alias_name} -> {target.name}, hãy đọc {target.name}")
+    with open(data_dir / "car_listings.manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def _append_csv(f, df: pd.DataFrame, header: bool) -> bool:
+    """Ghi nối df vào file đang mở; trả về True nếu đã ghi header (header chỉ ghi 1 lần)"""
+    if header or not df.empty:
+        df.to_csv(f, index=False, header=header)
+        return False
+    return header
+
+
+def clean_streaming(raw_path: Path, clean_path: Path, quarantine_path: Path, chunk_rows: int = 200_000,
+                    method: str = "mad", k: float = None, min_rows: int = MIN_SEGMENT_ROWS):
+    """
+    Làm sạch theo chunk -> (số dòng vào, số dòng ra, metadata counts, số dòng theo lý do quarantine).
+    Lần 1: clean + ngưỡng chung từng chunk, ghi file tạm, chỉ giữ mã segment + giá + mileage để tính cận segment.
+    Lần 2: đọc lại file tạm theo chunk, lọc theo cận segment, ghi file sạch + quarantine rồi rename.
+    """
+    stage_path = clean_path.with_suffix(".stage.csv.tmp")
+    tmp_path = clean_path.with_suffix(".csv.tmp")
+    quarantine_tmp = quarantine_path.with_suffix(".csv.tmp")
+    rows_in = rows_out = 0
+    counts, reasons = {}, {}
+    registry, codes, prices, mileages = {}, [], [], []
+
+    def _quarantine(f, rejected, header):
+        for reason, n in rejected["reason"].value_counts().items():
+            reasons[reason] = reasons.get(reason, 0) + int(n)
+        return _append_csv(f, rejected[[c for c in KEEP_COLS if c in rejected.columns] + QUARANTINE_COLS], header)
 
-    df_clean = clean_dataframe(df_raw)
-    clean_out = base_dir / "data" / "car_listings_clean.csv"
-    df_clean.to_csv(clean_out, index=False)
+    # brand/model đọc dạng chuỗi: chunk chỉ có model kiểu "86" không bị suy ra thành số
+    reader = pd.read_csv(raw_path, chunksize=chunk_rows, dtype={"brand": "str", "model": "str"})
+    with open(stage_path, "w", encoding="utf-8", newline="") as stage, \
+            open(quarantine_tmp, "w", encoding="utf-8", newline="") as quarantine:
+        stage_header = quarantine_header = True
+        for chunk in reader:
+            rows_in += len(chunk)
+            cleaned = clean_dataframe(chunk)
+            reason = global_outlier_reason(cleaned)
+            quarantine_header = _quarantine(quarantine, _global_quarantine(cleaned, reason), quarantine_header)
+            cleaned = cleaned[reason.isna()]
+            stage_header = _append_csv(stage, cleaned, stage_header)
+            if method != "none":
+                codes.append(segment_ids(cleaned, registry))
+                prices.append(cleaned["price_vnd"].astype("float64").to_numpy())
+                mileages.append(cleaned["mileage_km"].astype("float64").to_numpy())
+        if stage_header:
+            # File raw rỗng: vẫn ghi header để người đọc không lỗi
+            pd.DataFrame(columns=KEEP_COLS).to_csv(stage, index=False)
 
-    # Alias file chính để train
-    final_out = base_dir / "data" / "car_listings.csv"
-    df_clean.to_csv(final_out, index=False)
+        bounds = None
+        if method != "none" and registry:
+            bounds = segment_bounds(np.concatenate(codes), np.concatenate(prices), np.concatenate(mileages),
+                                    method, k, min_rows)
+        del codes, prices, mileages
 
-    # Sinh metadata cho dropdown (brand/model/year)
-    export_metadata(df_clean, base_dir)
+        stage.flush()
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            header = True
+            for chunk in pd.read_csv(stage_path, chunksize=chunk_rows, dtype={"brand": "str", "model": "str"}):
+                if bounds is not None:
+                    chunk, rejected = split_segment_outliers(chunk, segment_ids(chunk, registry), bounds)
+                    quarantine_header = _quarantine(quarantine, rejected, quarantine_header)
+                rows_out += len(chunk)
+                header = _append_csv(f, chunk, header)
+                _merge_counts(counts, metadata_counts(chunk))
+            if header:
+                pd.DataFrame(columns=KEEP_COLS).to_csv(f, index=False)
+        if quarantine_header:
+            pd.DataFrame(columns=KEEP_COLS + QUARANTINE_COLS).to_csv(quarantine, index=False)
+    stage_path.unlink()
+    tmp_path.replace(clean_path)
+    quarantine_tmp.replace(quarantine_path)
+    return rows_in, rows_out, counts, reasons
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Làm sạch dữ liệu scrape thô")
+    parser.add_argument("--raw", type=Path, default=None, help="File raw (mặc định data/raw_bonbanh.csv)")
+    parser.add_argument("--stream", action="store_true", help="Xử lý theo chunk, RAM không tăng theo số dòng")
+    parser.add_argument("--chunk-rows", type=int, default=200_000, help="Số dòng mỗi chunk khi --stream")
+    parser.add_argument("--outlier-method", choices=["mad", "iqr", "none"], default="mad",
+                        help="Cận outlier theo segment brand/model/year: median/MAD, IQR, hoặc none (chỉ ngưỡng chung)")
+    parser.add_argument("--outlier-k", type=float, default=None,
+                        help="Hệ số k của cận (mặc định 5 cho MAD, 3 cho IQR)")
+    parser.add_argument("--min-segment-rows", type=int, default=MIN_SEGMENT_ROWS,
+                        help="Segment ít dòng hơn -> chỉ dùng ngưỡng chung")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    base_dir = Path(__file__).resolve().parent
+    data_dir = base_dir / "data"
+    raw_path = args.raw or data_dir / "raw_bonbanh.csv"
+    clean_out = data_dir / "car_listings_clean.csv"
+    quarantine_out = data_dir / "car_listings_quarantine.csv"
+    outlier_args = dict(method=args.outlier_method, k=args.outlier_k, min_rows=args.min_segment_rows)
+
+    if args.stream:
+        rows_in, rows_out, counts, reasons = clean_streaming(raw_path, clean_out, quarantine_out, args.chunk_rows,
+                                                             **outlier_args)
+        export_metadata(None, base_dir, counts=counts)
+    else:
+        df_raw = pd.read_csv(raw_path)
+        df_clean, quarantine = filter_outliers(clean_dataframe(df_raw), **outlier_args)
+        rows_in, rows_out = len(df_raw), len(df_clean)
+        df_clean.to_csv(clean_out, index=False)
+        quarantine_cols = [c for c in KEEP_COLS if c in quarantine.columns] + QUARANTINE_COLS
+        quarantine[quarantine_cols].to_csv(quarantine_out, index=False)
+        reasons = {reason: int(n) for reason, n in quarantine["reason"].value_counts().items()}
+        # Sinh metadata cho dropdown (brand/model/year)
+        export_metadata(df_clean, base_dir)
+
+    # Alias file chính để train + bản raw: link, không copy
+    quarantined = {"file": quarantine_out.name, "rows": sum(reasons.values()), "reasons": dict(sorted(reasons.items()))}
+    write_outputs(raw_path, clean_out, data_dir, {"rows_in": rows_in, "rows_out": rows_out, "quarantine": quarantined})
+    print(f"✅ {rows_in:,} dòng raw -> {rows_out:,} dòng sạch: {clean_out}")
+    if quarantined["rows"]:
+        detail = ", ".join(f"{reason}: {n:,}" for reason, n in quarantined["reasons"].items())
+        print(f"🚧 {quarantined['rows']:,} dòng outlier -> {quarantine_out.name} ({detail})")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,94 @@
+"""
+Cache dạng Parquet (Arrow) cho file dữ liệu đã clean (data/toyota_cleaned.csv).
+
+- Lần đầu: đọc CSV, chuẩn hoá mileage (bỏ ký tự không phải số -> số nguyên), ép kiểu
+  make/model/version/color sang category, year sang số nguyên, rồi ghi
+  data/cache/<tên>-<hash đường dẫn>-v<phiên bản>-<hash nội dung>.parquet.
+- Các lần sau: file nguồn không đổi (cùng hash nội dung) -> đọc thẳng Parquet, không parse CSV/regex lại.
+- Không cài pyarrow -> đọc CSV + chuẩn hoá như cũ mỗi lần (chậm hơn nhưng kết quả giống hệt).
+
+Mọi script (retrain_model.py, extract_metadata.py, incremental_train.py, ...) đọc dữ liệu qua load_dataset().
+"""
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+
+from search_cache import file_content_hash
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_PATH = BASE_DIR / "data" / "toyota_cleaned.csv"
+CACHE_DIR = BASE_DIR / "data" / "cache"
+
+# Tăng khi đổi cách chuẩn hoá -> cache cũ tự bị bỏ qua
+CACHE_VERSION = 1
+
+CATEGORY_COLUMNS = ['make', 'model', 'version', 'color']
+INTEGER_COLUMNS = ['year', 'mileage']
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def normalize_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """Chuẩn hoá kiểu cột: mileage/year -> Int64 (cho phép thiếu), cột text -> category"""
+    df = df.copy()
+    if 'mileage' in df.columns and not pd.api.types.is_numeric_dtype(df['mileage']):
+        df['mileage'] = df['mileage'].astype(str).str.replace(r'\D', '', regex=True)
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype('Int64')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _source_prefix(source: Path) -> str:
+    """Tiền tố cache riêng của 1 file nguồn: 2 file cùng tên ở 2 thư mục khác nhau không dùng chung/xoá cache nhau"""
+    path_hash = hashlib.sha256(str(Path(source).resolve()).encode('utf-8')).hexdigest()[:8]
+    return f"{Path(source).stem}-{path_hash}"
+
+
+def cache_path_for(source: Path, source_hash: str) -> Path:
+    return CACHE_DIR / f"{_source_prefix(source)}-v{CACHE_VERSION}-{source_hash[:16]}.parquet"
+
+
+def load_dataset(source: Path = DATA_PATH, use_cache: bool = True, verbose: bool = True) -> pd.DataFrame:
+    """
+    Đọc dữ liệu đã clean với kiểu cột cố định. Dùng Parquet cache nếu có, tự build nếu chưa có.
+    Các cột khác (price_vnd, url, ...) giữ nguyên kiểu pandas tự suy ra.
+    Đọc từ Parquet là zero-copy nên cột có thể read-only: cần sửa tại chỗ thì .copy() trước.
+    """
+    source = Path(source)
+    if not use_cache or not _parquet_available():
+        return normalize_dataset(pd.read_csv(source, encoding='utf-8'))
+
+    cache_path = cache_path_for(source, file_content_hash(source))
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+
+    df = normalize_dataset(pd.read_csv(source, encoding='utf-8'))
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Ghi file tạm rồi rename -> process khác không bao giờ đọc phải file ghi dở
+    tmp_path = cache_path.with_suffix('.parquet.tmp')
+    df.to_parquet(tmp_path, index=False)
+    tmp_path.replace(cache_path)
+    _remove_stale(source, keep=cache_path)
+    if verbose:
+        print(f"🗃️  Đã tạo cache Parquet: {cache_path.name}")
+    return df
+
+
+def _remove_stale(source: Path, keep: Path) -> None:
+    """Xoá cache của phiên bản cũ của cùng file nguồn (cùng đường dẫn)"""
+    # <tên>-v*: cache đặt tên kiểu cũ (chưa có hash đường dẫn), không còn được tạo nữa
+    for pattern in (f"{_source_prefix(source)}-v*.parquet", f"{Path(source).stem}-v*.parquet"):
+        for path in CACHE_DIR.glob(pattern):
+            if path != keep:
+                path.unlink(missing_ok=True)
@@ -0,0 +1,343 @@
+"""
+Loại tin đăng trùng giữa các nguồn (bonbanh, oto.com.vn, chotot) sau khi scrape.
+
+Mỗi scraper chỉ chống trùng URL của chính nó (scraped_urls) -> cùng 1 xe đăng trên nhiều trang vẫn vào dữ liệu train
+nhiều lần. Thay vì so từng cặp tin (n^2):
+- Blocking: chỉ so các tin cùng make/model/year (make/model chuẩn hoá theo service/aliases.json).
+- MinHash: mỗi tin -> tập token (từ trong title, 2 từ liên tiếp trong description, bucket giá, bucket số km)
+  -> chữ ký NUM_PERM số; tỉ lệ vị trí trùng nhau giữa 2 chữ ký ~ độ tương đồng Jaccard của 2 tập token.
+- LSH: chia chữ ký thành BANDS band; 2 tin cùng block và trùng trọn 1 band -> ứng viên. Trong mỗi bucket chỉ so với
+  --window tin kế tiếp (sắp theo giá) -> số cặp phải so gần tuyến tính theo số tin.
+- Xác nhận cặp: Jaccard ước lượng >= --threshold, giá lệch <= --price-tol, số km lệch <= --mileage-tol,
+  version/màu giống nhau nếu cả 2 tin đều có. Cặp 2 tin đều 0 km (xe mới của đại lý: cùng title/màu/số km
+  nhưng là nhiều xe khác nhau) không bao giờ là trùng.
+- Gom cụm hình sao (không bắc cầu): duyệt tin theo thứ tự ưu tiên giữ (nhiều thông tin nhất, rồi theo thứ tự
+  SOURCE_PRIORITY), tin chưa thuộc cụm nào làm tâm và chỉ kéo các tin trùng trực tiếp với nó -> mọi tin bị bỏ
+  đều lệch giá/km trong ngưỡng so với tin được giữ (A~B, B~C không kéo C vào cụm của A).
+
+Chạy: python dedupe_listings.py data/toyota_cars_*.csv data/toyota_oto_*.csv data/toyota_chotot_*.csv
+Kết quả: data/listings_deduped.csv (thêm cột source, dup_group, dup_count) và data/listings_duplicates.csv (các cặp trùng).
+Cột source lấy từ file nếu có, không thì theo tên file (SOURCE_FILES).
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+
+from service.aliases import load_alias_table
+from service.title_parser import parse_mileage_km
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+OUTPUT_FILE = DATA_DIR / "listings_deduped.csv"
+PAIRS_FILE = DATA_DIR / "listings_duplicates.csv"
+
+# Tin trùng giữ bản của nguồn đứng trước (khi số cột có dữ liệu bằng nhau)
+SOURCE_PRIORITY = ['bonbanh', 'oto', 'chotot']
+# File output của từng scraper -> nguồn (dùng khi file không có cột source)
+SOURCE_FILES = {
+    'toyota_cars_*.csv': 'bonbanh',
+    'cars_data_*.csv': 'bonbanh',
+    'toyota_oto_*.csv': 'oto',
+    'toyota_chotot_*.csv': 'chotot',
+}
+BLOCK_COLUMNS = ['make', 'model', 'year']
+# Cùng 1 xe thì phải cùng version/màu (khi cả 2 tin đều ghi)
+EXACT_COLUMNS = ['version', 'color']
+
+NUM_PERM = 64
+BANDS = 16                       # 16 band x 4 hàng: xác suất thành ứng viên ~50% tại Jaccard 0.5, ~97% tại 0.7
+ROWS_PER_BAND = NUM_PERM // BANDS
+PRICE_STEP = 0.05                # bucket giá theo log: 2 giá lệch < 5% luôn chung ít nhất 1 token giá
+MILEAGE_STEP = 0.10
+MINHASH_CHUNK_ROWS = 50_000
+_SPLIT_RE = r'[\s!-/:-@\[-`{-~]+'          # khoảng trắng + dấu câu ASCII
+_SALTS = np.random.default_rng(0).integers(0, 1 << 63, 4, dtype=np.uint64)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+# --- Chuẩn hoá ---
+def source_from_path(path: Path) -> Optional[str]:
+    return next((source for pattern, source in SOURCE_FILES.items() if path.match(pattern)), None)
+
+
+def load_listings(paths: List[Path]) -> pd.DataFrame:
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[''])
+        if 'source' not in df.columns:
+            df['source'] = source_from_path(path)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def fold_text(values: pd.Series) -> pd.Series:
+    """Chữ thường, bỏ dấu tiếng Việt, chỉ giữ chữ/số: "Bán Toyota Vios 1.5G" -> "ban toyota vios 1 5g" """
+    values = values.fillna('').astype(str).str.lower().str.replace('đ', 'd', regex=False)
+    values = values.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    return values.str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+
+
+def _map_unique(values: pd.Series, func) -> np.ndarray:
+    """func chạy 1 lần cho mỗi giá trị khác nhau, NaN -> nan"""
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([func(u) for u in uniques] + [None], dtype=float)
+    return mapped[codes]
+
+
+def _fold_unique(values: pd.Series) -> np.ndarray:
+    """fold_text bỏ khoảng trắng ("1.5G CVT" -> "15gcvt"), chạy 1 lần cho mỗi giá trị khác nhau; NaN -> "" """
+    codes, uniques = pd.factorize(values)
+    folded = fold_text(pd.Series(uniques, dtype=object)).str.replace(' ', '', regex=False)
+    return np.append(folded.to_numpy(dtype=object), '')[codes]
+
+
+def prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Các cột dùng để so: make/model/year chuẩn hoá, giá (triệu), số km, version/màu đã fold, title/description"""
+    aliases = load_alias_table()
+    keys = pd.DataFrame(index=df.index)
+    keys['make'] = aliases.normalize_brands(df['make'])
+    keys['model'] = aliases.normalize_models(keys['make'], df['model'])
+    keys['year'] = pd.to_numeric(df['year'], errors='coerce')
+    keys['price'] = pd.to_numeric(df['price_vnd'], errors='coerce')
+    keys['mileage'] = _map_unique(df['mileage'], parse_mileage_km) if 'mileage' in df.columns else np.nan
+    # Rỗng = không biết (không dùng để loại)
+    for col in EXACT_COLUMNS:
+        keys[col] = _fold_unique(df[col]) if col in df.columns else ''
+    for col in ('title', 'description'):
+        keys[col] = df[col] if col in df.columns else None
+    return keys
+
+
+# --- MinHash ---
+def _word_hashes(text: pd.Series):
+    """
+    (dòng, hash 64-bit của từ) theo thứ tự trong câu. Tách theo khoảng trắng/dấu câu, fold (bỏ dấu, chữ thường)
+    từng từ khác nhau 1 lần; hash không phụ thuộc chunk nên các chunk xử lý độc lập.
+    """
+    words = text.dropna().str.lower().str.replace(_SPLIT_RE, ' ', regex=True).str.split().explode().dropna()
+    if words.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+    codes, uniques = pd.factorize(words)
+    folded = fold_text(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    return words.index.to_numpy(dtype=np.int64), pd.util.hash_array(folded)[codes]
+
+
+def _bucket_hashes(values: pd.Series, step: float):
+    """Giá trị -> 2 bucket liền kề theo log (b, b+1): 2 giá trị lệch < step luôn chung ít nhất 1 token"""
+    bucket = np.floor(np.log1p(values.clip(lower=0)) / np.log1p(step)).dropna().astype(np.int64)
+    rows = bucket.index.to_numpy(dtype=np.int64)
+    return np.r_[rows, rows], pd.util.hash_array(np.r_[bucket.to_numpy(), bucket.to_numpy() + 1])
+
+
+def token_hashes(keys: pd.DataFrame):
+    """
+    (dòng, token uint64) của các tin trong keys: từ trong title, cặp 2 từ liên tiếp trong description, bucket giá,
+    bucket số km. Mỗi loại token XOR với 1 salt riêng để không trùng nhau.
+    """
+    parts = []
+    rows, words = _word_hashes(keys['title'])
+    parts.append((rows, words ^ _SALTS[0]))
+    rows, words = _word_hashes(keys['description'])
+    same_row = rows[1:] == rows[:-1]
+    bigrams = (words[:-1] * _MIX) ^ words[1:]
+    parts.append((rows[:-1][same_row], bigrams[same_row] ^ _SALTS[1]))
+    for salt, col, step in ((_SALTS[2], 'price', PRICE_STEP), (_SALTS[3], 'mileage', MILEAGE_STEP)):
+        rows, buckets = _bucket_hashes(keys[col], step)
+        parts.append((rows, buckets ^ salt))
+    rows = np.concatenate([r for r, _ in parts])
+    tokens = np.concatenate([t for _, t in parts])
+    order = np.argsort(rows, kind='stable')
+    return rows[order], tokens[order]
+
+
+def minhash_signatures(keys: pd.DataFrame, seed: int = 42) -> np.ndarray:
+    """
+    Chữ ký MinHash (số dòng x NUM_PERM, uint32): cột k = min trên token của (a_k * token + b_k) >> 32
+    (multiply-shift, số học uint64 tràn vòng). Xử lý theo chunk dòng: token của 1 chunk -> băm -> np.minimum.reduceat
+    theo ranh giới dòng, RAM chỉ phụ thuộc kích thước chunk.
+    Dòng không có token nào giữ chữ ký = 2^32 - 1 (không bao giờ thành ứng viên, xem lsh_candidates).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, np.iinfo(np.uint64).max, NUM_PERM, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, NUM_PERM, dtype=np.uint64, endpoint=True)
+    signatures = np.full((len(keys), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+    for start in range(0, len(keys), MINHASH_CHUNK_ROWS):
+        rows, tokens = token_hashes(keys.iloc[start:start + MINHASH_CHUNK_ROWS])
+        if len(rows) == 0:
+            continue
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        present = rows[starts]
+        for k in range(NUM_PERM):
+            hashed = (a[k] * tokens + b[k]) >> np.uint64(32)
+            signatures[present, k] = np.minimum.reduceat(hashed, starts)
+    return signatures
+
+
+# --- LSH + xác nhận ---
+def lsh_candidates(signatures: np.ndarray, block: np.ndarray, order_key: np.ndarray, window: int) -> np.ndarray:
+    """
+    Cặp (i, j), i < j: cùng block và trùng trọn ít nhất 1 band. Trong mỗi bucket (block, band) các tin được sắp
+    theo order_key (giá) và chỉ ghép với `window` tin kế tiếp -> bucket lớn không sinh ra số cặp bình phương.
+    """
+    has_tokens = (signatures != np.iinfo(np.uint32).max).any(axis=1) & (block >= 0)
+    idx = np.flatnonzero(has_tokens)
+    pairs = []
+    for band in range(BANDS):
+        cols = signatures[idx, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        frame = pd.DataFrame(cols)
+        frame['block'] = block[idx]
+        bucket = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        order = np.lexsort((order_key[idx], bucket))
+        sorted_bucket, sorted_idx = bucket[order], idx[order]
+        for offset in range(1, window + 1):
+            same = sorted_bucket[offset:] == sorted_bucket[:-offset]
+            if not same.any():
+                break
+            pairs.append(np.column_stack([sorted_idx[:-offset][same], sorted_idx[offset:][same]]))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def _relative_gap(x: np.ndarray, y: np.ndarray, slack: float = 0.0) -> np.ndarray:
+    """|x - y| / max(x, y) (trừ slack tuyệt đối); thiếu 1 trong 2 giá trị -> 0 (không dùng để loại)"""
+    gap = np.maximum(np.abs(x - y) - slack, 0) / np.maximum(np.maximum(x, y), 1)
+    return np.nan_to_num(gap, nan=0.0)
+
+
+def verify_pairs(pairs: np.ndarray, signatures: np.ndarray, keys: pd.DataFrame, threshold: float,
+                 price_tol: float, mileage_tol: float) -> pd.DataFrame:
+    i, j = pairs[:, 0], pairs[:, 1]
+    similarity = (signatures[i] == signatures[j]).mean(axis=1)
+    price, mileage = keys['price'].to_numpy(), keys['mileage'].to_numpy()
+    price_gap = _relative_gap(price[i], price[j])
+    mileage_gap = _relative_gap(mileage[i], mileage[j], slack=1000)
+    keep = (similarity >= threshold) & (price_gap <= price_tol) & (mileage_gap <= mileage_tol)
+    # Xe mới 0 km: title/màu/số km giống nhau không có nghĩa là cùng 1 xe
+    keep &= ~((mileage[i] == 0) & (mileage[j] == 0))
+    for col in EXACT_COLUMNS:
+        values = keys[col].to_numpy(dtype=object)
+        keep &= (values[i] == values[j]) | (values[i] == '') | (values[j] == '')
+    return pd.DataFrame({'i': i[keep], 'j': j[keep], 'similarity': similarity[keep].round(3),
+                         'price_gap': price_gap[keep].round(4), 'mileage_gap': mileage_gap[keep].round(4)})
+
+
+def find_duplicates(df: pd.DataFrame, threshold: float = 0.5, price_tol: float = 0.03,
+                    mileage_tol: float = 0.02, window: int = 10, cross_source_only: bool = False):
+    """-> (nhãn cụm theo vị trí dòng, DataFrame các cặp trùng đã xác nhận (i, j là vị trí), số cặp ứng viên)"""
+    keys = prepare(df.reset_index(drop=True))
+    block = keys.groupby(BLOCK_COLUMNS, observed=True, dropna=False, sort=False).ngroup().to_numpy(copy=True)
+    block[keys[BLOCK_COLUMNS[:2]].eq('').any(axis=1).to_numpy() | keys['year'].isna().to_numpy()] = -1
+
+    signatures = minhash_signatures(keys)
+    order_key = keys['price'].fillna(-1).to_numpy()
+    candidates = lsh_candidates(signatures, block, order_key, window)
+    if cross_source_only and len(candidates):
+        source = df['source'].to_numpy()
+        candidates = candidates[source[candidates[:, 0]] != source[candidates[:, 1]]]
+    pairs = verify_pairs(candidates, signatures, keys, threshold, price_tol, mileage_tol)
+
+    labels = star_clusters(pairs['i'].to_numpy(), pairs['j'].to_numpy(), _survivor_rank(df))
+    return labels, pairs, len(candidates)
+
+
+def _survivor_rank(df: pd.DataFrame) -> np.ndarray:
+    """Thứ hạng giữ lại của từng dòng (0 = ưu tiên nhất): nhiều cột có dữ liệu nhất, rồi nguồn ưu tiên, rồi vị trí"""
+    ranked = pd.DataFrame({
+        'filled': -df.notna().sum(axis=1).to_numpy(),
+        'source_rank': df['source'].map({s: i for i, s in enumerate(SOURCE_PRIORITY)})
+                                   .fillna(len(SOURCE_PRIORITY)).to_numpy(),
+    })
+    order = ranked.sort_values(['filled', 'source_rank'], kind='stable').index.to_numpy()
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank
+
+
+def star_clusters(i: np.ndarray, j: np.ndarray, rank: np.ndarray) -> np.ndarray:
+    """
+    Nhãn cụm theo vị trí dòng: duyệt các dòng có cặp trùng theo rank tăng dần, dòng chưa có cụm làm tâm và nhận
+    các dòng chưa có cụm trùng trực tiếp với nó. Không bắc cầu -> tâm (bản được giữ) trùng với mọi dòng trong cụm.
+    """
+    labels = np.arange(len(rank))
+    if not len(i):
+        return labels
+    graph = coo_matrix((np.ones(2 * len(i), dtype=np.int8), (np.r_[i, j], np.r_[j, i])),
+                       shape=(len(rank), len(rank))).tocsr()
+    assigned = np.zeros(len(rank), dtype=bool)
+    nodes = np.unique(np.r_[i, j])
+    for center in nodes[np.argsort(rank[nodes], kind='stable')].tolist():
+        if assigned[center]:
+            continue
+        members = graph.indices[graph.indptr[center]:graph.indptr[center + 1]]
+        members = members[~assigned[members]]
+        labels[members] = center
+        assigned[members] = True
+        assigned[center] = True
+    return labels
+
+
+def choose_survivors(df: pd.DataFrame, labels: np.ndarray) -> pd.DataFrame:
+    """Giữ 1 tin mỗi cụm: nhiều cột có dữ liệu nhất, rồi nguồn ưu tiên, rồi tin xuất hiện trước"""
+    ranked = pd.DataFrame({'group': labels, 'rank': _survivor_rank(df)})
+    sizes = np.bincount(labels)[labels]
+    keep = np.sort(ranked.sort_values(['group', 'rank'], kind='stable')
+                   .drop_duplicates('group').index.to_numpy())
+    out = df.iloc[keep].copy()
+    out['dup_group'] = np.where(sizes[keep] > 1, labels[keep], -1)
+    out['dup_count'] = sizes[keep]
+    return out
+
+
+def pairs_report(df: pd.DataFrame, pairs: pd.DataFrame) -> pd.DataFrame:
+    cols = [c for c in ('ad_id', 'source', 'title', 'price_vnd', 'mileage', 'url') if c in df.columns]
+    left = df[cols].iloc[pairs['i']].reset_index(drop=True).add_suffix('_a')
+    right = df[cols].iloc[pairs['j']].reset_index(drop=True).add_suffix('_b')
+    return pd.concat([left, right, pairs[['similarity', 'price_gap', 'mileage_gap']].reset_index(drop=True)], axis=1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Loại tin đăng trùng giữa các nguồn (MinHash/LSH)")
+    parser.add_argument('inputs', nargs='*', type=Path,
+                        help="File CSV của các scraper (mặc định: mọi file khớp SOURCE_FILES trong data/)")
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE)
+    parser.add_argument('--pairs', type=Path, default=PAIRS_FILE, help="File ghi các cặp trùng đã xác nhận")
+    parser.add_argument('--threshold', type=float, default=0.5, help="Jaccard ước lượng tối thiểu")
+    parser.add_argument('--price-tol', type=float, default=0.03, help="Giá lệch tối đa (tỉ lệ)")
+    parser.add_argument('--mileage-tol', type=float, default=0.02, help="Số km lệch tối đa (tỉ lệ, sau 1000 km)")
+    parser.add_argument('--window', type=int, default=10, help="Số tin kế tiếp được so trong mỗi bucket LSH")
+    parser.add_argument('--cross-source-only', action='store_true',
+                        help="Chỉ coi là trùng khi khác nguồn (giữ tin đăng lại trên cùng 1 trang)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    inputs = args.inputs or sorted(p for pattern in SOURCE_FILES for p in DATA_DIR.glob(pattern))
+    if not inputs:
+        raise FileNotFoundError(f"❌ Không có file scrape nào trong {DATA_DIR}")
+
+    start = time.perf_counter()
+    df = load_listings(inputs)
+    labels, pairs, n_candidates = find_duplicates(df, args.threshold, args.price_tol, args.mileage_tol,
+                                                  args.window, args.cross_source_only)
+    deduped = choose_survivors(df, labels)
+    deduped.to_csv(args.output, index=False)
+    pairs_report(df, pairs).to_csv(args.pairs, index=False)
+
+    cross = (df['source'].to_numpy()[pairs['i']] != df['source'].to_numpy()[pairs['j']]).sum()
+    print(f"📊 {len(df):,} tin từ {len(inputs)} file, {n_candidates:,} cặp ứng viên LSH -> "
+          f"{len(pairs):,} cặp trùng ({cross:,} khác nguồn)")
+    print(f"✅ Giữ {len(deduped):,} tin, bỏ {len(df) - len(deduped):,} tin trùng -> {args.output} "
+          f"| {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
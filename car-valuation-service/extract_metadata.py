@@ -1,120 +1,424 @@
 """
 Script để extract metadata từ dataset và output ra file JSON
+
+Cây make -> model -> year -> version -> color được dựng từ bảng đếm các tổ hợp
+(make, model, year, version, color) duy nhất: 1 lần groupby trên dữ liệu, sau đó chỉ duyệt các tổ hợp
+(vài nghìn dòng) thay vì lọc lại cả DataFrame cho từng nhánh của cây.
+
+- Mặc định: đọc qua dataset_cache (Parquet cache) rồi groupby 1 lần.
+- --stream: đọc CSV theo chunk, chỉ giữ bảng đếm tổ hợp trong RAM (dữ liệu lớn hơn RAM).
+Cả 2 cách cho ra metadata.json giống hệt nhau.
+
+--incremental: chỉ đọc phần dữ liệu mới kể từ lần chạy trước rồi cộng vào bảng đếm đã lưu
+(data/cache/<tên file>-metadata-state.json):
+- File CSV chính chỉ được ghi thêm (phần đầu giữ nguyên, kiểm tra bằng hash) -> đọc từ byte đã xử lý tới
+  watermark mới (cuối dòng hoàn chỉnh cuối cùng, tính trước khi đọc). Mọi lần đọc file chính (kể cả build
+  toàn bộ) dừng ở watermark -> dòng ghi dở / ghi thêm trong lúc chạy được đếm đúng 1 lần ở lần sau.
+  Phần đầu bị sửa -> tự build lại toàn bộ.
+- --delta <file.csv ...>: file tin mới từ lần scrape, mỗi file (theo hash nội dung) chỉ cộng 1 lần (manifest).
+Mọi lần chạy đều ghi <output>_diff.json + <output>_diff.sql cạnh file --output (mặc định metadata_diff.*):
+tổ hợp (make, model, year, version, color) được thêm/bỏ so với file output trước đó, để DB áp dụng phần
+thay đổi thay vì nạp lại seed. --output khác (thử nghiệm, --lake) không ghi đè diff của metadata.json chính.
+
+--lake [--sources/--makes/--since/--until]: đếm tổ hợp từ bảng 'cleaned' của lake Parquet (listings_lake.py),
+chỉ đọc 5 cột COMBO_COLUMNS trong các phân vùng khớp bộ lọc (--stream: theo batch).
+
+Chạy: python extract_metadata.py [--stream --chunk-rows 500000]
+      python extract_metadata.py --lake --makes Toyota --since 2025-12-01
+      python extract_metadata.py --incremental [--delta data/scrape_2025-12-10.csv]
 """
+import argparse
+import hashlib
+import io
 import json
-import pandas as pd
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
 from pathlib import Path
-from collections import defaultdict
+
+import pandas as pd
+
+from dataset_cache import CACHE_DIR, load_dataset, normalize_dataset
+from listings_lake import add_filter_args, describe_filters, filters_from_args, iter_batches, read_listings
+from search_cache import file_content_hash
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 OUTPUT_FILE = BASE_DIR / "metadata.json"
 
-print("="*60)
-print("EXTRACT METADATA TỪ DATASET")
-print("="*60)
-
-# Load dataset đã làm sạch
-cleaned_file = DATA_DIR / "toyota_cleaned.csv"
-if not cleaned_file.exists():
-    raise FileNotFoundError(f"Không tìm thấy file {cleaned_file}")
-
-print(f"\n📁 Đang đọc dữ liệu từ: {cleaned_file.name}")
-df = pd.read_csv(cleaned_file, encoding='utf-8')
-print(f"   ✅ Đã đọc {len(df)} dòng")
-
-# 1. Extract makes
-print(f"\n1️⃣ EXTRACT MAKES:")
-makes = sorted(df['make'].dropna().unique().tolist())
-print(f"   ✅ {len(makes)} makes: {makes}")
-
-# 2. Extract models theo từng make
-print(f"\n2️⃣ EXTRACT MODELS THEO MAKE:")
-make_models = {}
-for make in makes:
-    models = sorted(df[df['make'] == make]['model'].dropna().unique().tolist())
-    make_models[make] = models
-    print(f"   ✅ {make}: {len(models)} models")
-
-# 3. Extract years theo từng model
-print(f"\n3️⃣ EXTRACT YEARS THEO MODEL:")
-model_years = defaultdict(dict)
-for make in makes:
-    for model in make_models[make]:
-        years = df[(df['make'] == make) & (df['model'] == model)]['year'].dropna().unique().tolist()
-        years = sorted([int(y) for y in years if pd.notna(y)])
-        if years:
-            model_years[make][model] = years
-            print(f"   ✅ {make} {model}: {len(years)} years ({min(years)}-{max(years)})")
-
-# 4. Extract versions theo từng year của model
-print(f"\n4️⃣ EXTRACT VERSIONS THEO YEAR CỦA MODEL:")
-year_versions = defaultdict(lambda: defaultdict(dict))
-for make in makes:
-    for model in make_models[make]:
-        if model not in model_years.get(make, {}):
+# Tăng khi đổi cách đếm tổ hợp -> state cũ bị bỏ qua, build lại toàn bộ
+STATE_VERSION = 1
+
+COMBO_COLUMNS = ['make', 'model', 'year', 'version', 'color']
+
+
+def _combo_key(combo: tuple) -> tuple:
+    """Tổ hợp từ index của groupby -> tuple thuần Python: thiếu (NaN/NA) -> None, year -> int"""
+    make, model, year, version, color = (None if pd.isna(v) else v for v in combo)
+    return make, model, None if year is None else int(year), version, color
+
+
+def count_combos(df: pd.DataFrame) -> Counter:
+    """Số dòng theo từng tổ hợp (make, model, year, version, color), giữ cả tổ hợp có cột thiếu (None)"""
+    counts = df.groupby(COMBO_COLUMNS, observed=True, dropna=False, sort=False).size()
+    return Counter({_combo_key(combo): int(n) for combo, n in counts.items()})
+
+
+class _ByteRange(io.RawIOBase):
+    """Đọc file từ vị trí hiện tại, dừng sau remaining byte (pandas thấy EOF tại watermark)"""
+
+    def __init__(self, f, remaining: int):
+        self.f, self.remaining = f, remaining
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.f.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+def count_combos_streaming(source: Path, chunk_rows: int = 500_000, offset: int = 0, end: int = None) -> Counter:
+    """
+    Như count_combos nhưng đọc CSV theo chunk: RAM chỉ tỉ lệ với số tổ hợp, không với số dòng.
+    Chỉ đọc các dòng trong [offset, end) (offset/end là đầu dòng; end=None -> cuối file);
+    offset > 0: header lấy từ dòng đầu.
+    """
+    combos = Counter()
+    end = Path(source).stat().st_size if end is None else end
+    if end <= offset:
+        return combos
+    # Cột text đọc dạng str: chunk chỉ có model kiểu "86" không bị suy ra thành số
+    text_dtypes = {col: 'str' for col in COMBO_COLUMNS if col != 'year'}
+    with open(source, 'rb') as f:
+        names = None
+        if offset:
+            names = pd.read_csv(io.BytesIO(f.readline()), encoding='utf-8', nrows=0).columns.tolist()
+            f.seek(offset)
+        reader = io.BufferedReader(_ByteRange(f, end - offset))
+        for chunk in pd.read_csv(reader, encoding='utf-8', chunksize=chunk_rows, usecols=COMBO_COLUMNS,
+                                 dtype=text_dtypes, names=names, header=None if offset else 'infer'):
+            combos.update(count_combos(normalize_dataset(chunk)))
+    return combos
+
+
+def count_combos_lake(filters: dict, stream: bool = False, batch_rows: int = 500_000) -> Counter:
+    """Bảng đếm tổ hợp từ lake: chỉ đọc COMBO_COLUMNS trong các phân vùng khớp filters"""
+    if not stream:
+        return count_combos(normalize_dataset(read_listings('cleaned', columns=COMBO_COLUMNS, **filters)))
+    combos = Counter()
+    for batch in iter_batches('cleaned', columns=COMBO_COLUMNS, batch_rows=batch_rows, **filters):
+        combos.update(count_combos(normalize_dataset(batch)))
+    return combos
+
+
+def _valid_text(value) -> bool:
+    # Version/color rỗng hoặc chỉ có khoảng trắng bị bỏ qua
+    return bool(value) and bool(str(value).strip())
+
+
+def build_metadata(combos: Counter) -> dict:
+    """
+    Dựng cấu trúc metadata.json từ bảng đếm tổ hợp (duyệt 1 lần, sắp xếp ở cuối).
+    Mỗi tầng chỉ chứa nhánh có giá trị hợp lệ ở tầng đó, giống cách lọc từng tầng trước đây.
+    """
+    make_models = defaultdict(set)
+    model_years = defaultdict(lambda: defaultdict(set))
+    year_versions = defaultdict(lambda: defaultdict(lambda: defaultdict(set)))
+    version_colors = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(set))))
+    combo_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(dict))))
+
+    for (make, model, year, version, color), count in combos.items():
+        if make is None:
+            continue
+        models = make_models[make]      # make không có model nào vẫn xuất hiện (danh sách rỗng)
+        if model is None:
+            continue
+        models.add(model)
+        if year is None:
             continue
-        for year in model_years[make][model]:
-            versions = df[(df['make'] == make) & 
-                         (df['model'] == model) & 
-                         (df['year'] == year)]['version'].dropna().unique().tolist()
-            versions = sorted([v for v in versions if v and str(v).strip()])
-            if versions:
-                year_versions[make][model][year] = versions
-                print(f"   ✅ {make} {model} {year}: {len(versions)} versions")
-
-# 5. Extract colors theo từng version
-print(f"\n5️⃣ EXTRACT COLORS THEO VERSION:")
-version_colors = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
-for make in makes:
-    for model in make_models[make]:
-        if model not in year_versions.get(make, {}):
+        model_years[make][model].add(year)
+        if not _valid_text(version):
             continue
-        for year in year_versions[make][model]:
-            if year not in year_versions[make][model]:
-                continue
-            for version in year_versions[make][model][year]:
-                colors = df[(df['make'] == make) & 
-                           (df['model'] == model) & 
-                           (df['year'] == year) &
-                           (df['version'] == version)]['color'].dropna().unique().tolist()
-                colors = sorted([c for c in colors if c and str(c).strip()])
-                if colors:
-                    version_colors[make][model][year][version] = colors
-                    print(f"   ✅ {make} {model} {year} {version}: {len(colors)} colors")
-
-# 6. Tạo output structure
-output = {
-    'makes': makes,
-    'make_models': make_models,
-    'model_years': dict(model_years),  # {make: {model: [years]}}
-    'year_versions': {make: {model: {str(year): versions for year, versions in years_dict.items()} 
-                              for model, years_dict in models_dict.items()}
-                      for make, models_dict in year_versions.items()},  # {make: {model: {year: [versions]}}}
-    'version_colors': {make: {model: {str(year): {version: colors for version, colors in versions_dict.items()}
-                                      for year, versions_dict in years_dict.items()}
-                              for model, years_dict in models_dict.items()}
-                      for make, models_dict in version_colors.items()}  # {make: {model: {year: {version: [colors]}}}}
-}
-
-# 6. Lưu ra file JSON
-print(f"\n💾 Đang lưu ra file JSON...")
-with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-    json.dump(output, f, ensure_ascii=False, indent=2)
-
-print(f"\n✅ Hoàn thành!")
-print(f"   📁 File output: {OUTPUT_FILE}")
-print(f"   - Makes: {len(makes)}")
-print(f"   - Make-Model pairs: {sum(len(models) for models in make_models.values())}")
-print(f"   - Model-Year pairs: {sum(len(years) for years_dict in model_years.values() for years in years_dict.values())}")
-print(f"   - Year-Version pairs: {sum(len(versions) for models_dict in year_versions.values() for versions_dict in models_dict.values() for versions in versions_dict.values())}")
-print(f"   - Version-Color pairs: {sum(len(colors) for models_dict in version_colors.values() for years_dict in models_dict.values() for versions_dict in years_dict.values() for colors in versions_dict.values())}")
-print(f"\n📋 Cấu trúc output:")
-print(f"   {{")
-print(f"     'makes': [...],")
-print(f"     'make_models': {{'Toyota': ['Camry', 'Vios', ...]}}, ")
-print(f"     'model_years': {{'Toyota': {{'Camry': [2018, 2019, ...]}}}}, ")
-print(f"     'year_versions': {{'Toyota': {{'Camry': {{'2018': ['2.5Q', '2.0E', ...]}}}}}}, ")
-print(f"     'version_colors': {{'Toyota': {{'Camry': {{'2018': {{'2.5Q': ['Trắng', 'Đen', ...]}}}}}}}}")
-print(f"   }}")
+        year_versions[make][model][year].add(version)
+        if not _valid_text(color):
+            continue
+        version_colors[make][model][year][version].add(color)
+        combo_counts[make][model][year][version][color] = count
+
+    def tree(node, leaf, depth):
+        """dict lồng nhau -> dict sắp xếp theo key ở mọi tầng; year (int) -> str ở tầng year"""
+        if depth == 0:
+            return leaf(node)
+        return {str(k) if isinstance(k, int) else k: tree(node[k], leaf, depth - 1) for k in sorted(node)}
+
+    return {
+        'makes': sorted(make_models),
+        'make_models': tree(make_models, sorted, 1),
+        'model_years': tree(model_years, sorted, 2),  # {make: {model: [years]}}
+        'year_versions': tree(year_versions, sorted, 3),  # {make: {model: {year: [versions]}}}
+        'version_colors': tree(version_colors, sorted, 4),  # {make: {model: {year: {version: [colors]}}}}
+        'combo_counts': tree(combo_counts, lambda colors: {c: colors[c] for c in sorted(colors)}, 4),
+        # {make: {model: {year: {version: {color: count}}}}}
+    }
+
+
+def write_metadata(output: dict, path: Path = OUTPUT_FILE) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+
+# --- Incremental: state (bảng đếm + watermark + manifest) và diff ---
+def _source_watermark(path: Path) -> dict:
+    """Vị trí đã xử lý của file nguồn: cuối dòng hoàn chỉnh cuối cùng + hash phần trước đó"""
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - (1 << 16)))
+        tail = f.read()
+    # Dòng cuối đang ghi dở (chưa có \n) để lại cho lần sau
+    offset = size - len(tail) + tail.rfind(b'\n') + 1 if b'\n' in tail else 0
+    return {'path': str(path), 'offset': offset, 'prefix_hash': _prefix_hash(path, offset)}
+
+
+def _prefix_hash(path: Path, n_bytes: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while n_bytes > 0:
+            block = f.read(min(1 << 20, n_bytes))
+            if not block:
+                break
+            digest.update(block)
+            n_bytes -= len(block)
+    return digest.hexdigest()
+
+
+def state_path_for(source: Path) -> Path:
+    """Mỗi file nguồn có state riêng -> chạy trên file khác không ghi đè watermark của file chính"""
+    return CACHE_DIR / f"{Path(source).stem}-metadata-state.json"
+
+
+def load_state(path: Path):
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return None
+    state['combos'] = Counter({tuple(row[:5]): row[5] for row in state['combos']})
+    return state
+
+
+def save_state(combos: Counter, source: dict, deltas: dict, path: Path) -> None:
+    state = {
+        'version': STATE_VERSION,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'deltas': deltas,      # manifest: hash nội dung -> tên file delta đã cộng
+        'combos': [[*combo, count] for combo, count in combos.items()],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+def iter_combos(metadata: dict):
+    """Các tổ hợp đầy đủ (make, model, year, version, color) của metadata.json, year là int"""
+    for make, models in metadata.get('version_colors', {}).items():
+        for model, years in models.items():
+            for year, versions in years.items():
+                for version, colors in versions.items():
+                    for color in colors:
+                        yield make, model, int(year), version, color
+
+
+def metadata_diff(before: dict, after: dict) -> dict:
+    old, new = set(iter_combos(before)), set(iter_combos(after))
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'added': sorted(new - old),
+        'removed': sorted(old - new),
+    }
+
+
+def _sql_text(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sql_row(combo) -> str:
+    make, model, year, version, color = combo
+    return f"{_sql_text(make)}, {_sql_text(model)}, {year}, {_sql_text(version)}, {_sql_text(color)}"
+
+
+def diff_paths(output: Path) -> tuple:
+    """File diff JSON/SQL nằm cạnh file metadata: metadata.json -> metadata_diff.json, metadata_diff.sql"""
+    output = Path(output)
+    return output.with_name(f"{output.stem}_diff.json"), output.with_name(f"{output.stem}_diff.sql")
+
+
+def write_diff(diff: dict, json_path: Path, sql_path: Path) -> None:
+    """Ghi diff dạng JSON và SQL (cùng bảng với seed_valuation_metadata.sql)"""
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(diff, f, ensure_ascii=False, indent=2)
+
+    lines = [
+        "-- ============================================",
+        "-- Diff Car Valuation Metadata",
+        f"-- Generated at: {diff['generated_at'].replace('T', ' ')}",
+        f"-- Added: {len(diff['added'])}, removed: {len(diff['removed'])}",
+        "-- ============================================",
+        "",
+        "BEGIN;",
+    ]
+    if diff['removed']:
+        lines += ["", "DELETE FROM car_valuation_metadata WHERE (make, model, year, version, color) IN (VALUES",
+                  ",\n".join(f"({_sql_row(c)})" for c in diff['removed']) + ");"]
+    if diff['added']:
+        lines += ["", 'INSERT INTO car_valuation_metadata (id, make, model, year, version, color, "createdAt", "updatedAt") VALUES',
+                  ",\n".join(f"(gen_random_uuid(), {_sql_row(c)}, NOW(), NOW())" for c in diff['added']) + ";"]
+    lines += ["", "COMMIT;", ""]
+    with open(sql_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+def update_combos(args) -> Counter:
+    """
+    --incremental: bảng đếm đã lưu + phần mới của file nguồn + các file --delta chưa cộng.
+    Không có state hoặc file nguồn bị sửa (không chỉ ghi thêm) -> đếm lại toàn bộ file nguồn.
+    """
+    state = load_state(state_path_for(args.data))
+    watermark = _source_watermark(args.data)
+    old_source = (state or {}).get('source', {})
+    appended = (state is not None and old_source.get('path') == str(args.data)
+                and watermark['offset'] >= old_source['offset']
+                and _prefix_hash(args.data, old_source['offset']) == old_source['prefix_hash'])
+
+    if appended:
+        combos = state['combos']
+        new_bytes = watermark['offset'] - old_source['offset']
+        print(f"   ➕ {args.data.name}: {new_bytes:,} byte mới từ lần chạy trước")
+        if new_bytes:
+            combos.update(count_combos_streaming(args.data, args.chunk_rows, offset=old_source['offset'],
+                                                 end=watermark['offset']))
+        deltas = state['deltas']
+    else:
+        reason = "chưa có state" if state is None else "file nguồn đã bị sửa"
+        print(f"   🔁 Build lại toàn bộ ({reason})")
+        combos = count_combos_streaming(args.data, args.chunk_rows, end=watermark['offset'])
+        # File nguồn mới được coi là đầy đủ: manifest delta bắt đầu lại từ đầu
+        deltas = {}
+
+    for delta in args.delta:
+        digest = file_content_hash(delta)
+        if digest in deltas:
+            print(f"   ⏭️  {delta.name}: đã cộng trước đó, bỏ qua")
+            continue
+        delta_combos = count_combos_streaming(delta, args.chunk_rows)
+        combos.update(delta_combos)
+        deltas[digest] = delta.name
+        print(f"   ➕ {delta.name}: {sum(delta_combos.values()):,} dòng")
+
+    save_state(combos, watermark, deltas, state_path_for(args.data))
+    return combos
+
+
+def print_summary(output: dict) -> None:
+    make_models, model_years = output['make_models'], output['model_years']
+    year_versions, version_colors = output['year_versions'], output['version_colors']
+    print(f"   - Makes: {len(output['makes'])}")
+    print(f"   - Make-Model pairs: {sum(len(models) for models in make_models.values())}")
+    print(f"   - Model-Year pairs: {sum(len(years) for years_dict in model_years.values() for years in years_dict.values())}")
+    print(f"   - Year-Version pairs: {sum(len(versions) for models_dict in year_versions.values() for versions_dict in models_dict.values() for versions in versions_dict.values())}")
+    print(f"   - Version-Color pairs: {sum(len(colors) for models_dict in version_colors.values() for years_dict in models_dict.values() for versions_dict in years_dict.values() for colors in versions_dict.values())}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract metadata (make/model/year/version/color) từ dataset")
+    parser.add_argument('--data', type=Path, default=DATA_DIR / "toyota_cleaned.csv")
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE)
+    parser.add_argument('--stream', action='store_true',
+                        help="Đọc CSV theo chunk, không load cả file vào RAM")
+    parser.add_argument('--chunk-rows', type=int, default=500_000, help="Số dòng mỗi chunk khi --stream")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Chỉ đọc dữ liệu mới kể từ lần chạy trước (watermark + manifest trong data/cache/)")
+    parser.add_argument('--delta', type=Path, nargs='*', default=[],
+                        help="File CSV tin mới (cùng cột với file chính) cộng thêm khi --incremental")
+    parser.add_argument('--lake', action='store_true',
+                        help="Đọc từ lake Parquet (data/lake/cleaned) thay vì --data, lọc theo các tham số dưới")
+    add_filter_args(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("="*60)
+    print("EXTRACT METADATA TỪ DATASET")
+    print("="*60)
+
+    # Load dataset đã làm sạch
+    if not args.lake and not args.data.exists():
+        raise FileNotFoundError(f"Không tìm thấy file {args.data}")
+
+    if args.delta and not args.incremental:
+        raise ValueError("--delta chỉ dùng cùng --incremental")
+    if args.lake and args.incremental:
+        raise ValueError("--incremental theo dõi watermark của file CSV, không dùng cùng --lake")
+
+    start = time.perf_counter()
+    before = {}
+    if args.output.exists():
+        with open(args.output, 'r', encoding='utf-8') as f:
+            before = json.load(f)
+
+    source_name = f"lake (cleaned, {describe_filters(**filters_from_args(args))})" if args.lake else args.data.name
+    print(f"\n📁 Đang đọc dữ liệu từ: {source_name}" + (f" (stream, chunk {args.chunk_rows:,} dòng)" if args.stream else ""))
+    if args.lake:
+        combos = count_combos_lake(filters_from_args(args), stream=args.stream, batch_rows=args.chunk_rows)
+    elif args.incremental:
+        combos = update_combos(args)
+    else:
+        watermark = _source_watermark(args.data)
+        # Dòng cuối chưa có \n hoặc file được ghi thêm trong lúc đọc: load_dataset đọc quá watermark -> đếm theo chunk
+        past_watermark = args.data.stat().st_size != watermark['offset']
+        if not args.stream and not past_watermark:
+            df = load_dataset(args.data)
+            print(f"   ✅ Đã đọc {len(df)} dòng")
+            combos = count_combos(df)
+            del df
+            past_watermark = args.data.stat().st_size != watermark['offset']
+        if args.stream or past_watermark:
+            combos = count_combos_streaming(args.data, args.chunk_rows, end=watermark['offset'])
+        # Lần chạy --incremental sau chỉ cần đọc phần ghi thêm
+        save_state(combos, watermark, deltas={}, path=state_path_for(args.data))
+    print(f"   ✅ {len(combos)} tổ hợp (make, model, year, version, color), {sum(combos.values()):,} dòng")
+
+    output = build_metadata(combos)
+
+    print(f"\n💾 Đang lưu ra file JSON...")
+    write_metadata(output, args.output)
+    diff = metadata_diff(before, output)
+    json_path, sql_path = diff_paths(args.output)
+    write_diff(diff, json_path, sql_path)
+    print(f"   🔀 Diff so với {args.output.name} cũ: +{len(diff['added'])} / -{len(diff['removed'])} tổ hợp "
+          f"-> {json_path.name}, {sql_path.name}")
+
+    print(f"\n✅ Hoàn thành! ({time.perf_counter() - start:.1f}s)")
+    print(f"   📁 File output: {args.output}")
+    print_summary(output)
+    print(f"\n📋 Cấu trúc output:")
+    print(f"   {{")
+    print(f"     'makes': [...],")
+    print(f"     'make_models': {{'Toyota': ['Camry', 'Vios', ...]}}, ")
+    print(f"     'model_years': {{'Toyota': {{'Camry': [2018, 2019, ...]}}}}, ")
+    print(f"     'year_versions': {{'Toyota': {{'Camry': {{'2018': ['2.5Q', '2.0E', ...]}}}}}}, ")
+    print(f"     'version_colors': {{'Toyota': {{'Camry': {{'2018': {{'2.5Q': ['Trắng', 'Đen', ...]}}}}}}}}, ")
+    print(f"     'combo_counts': {{'Toyota': {{'Camry': {{'2018': {{'2.5Q': {{'Trắng': 12, 'Đen': 7}}}}}}}}}}")
+    print(f"   }}")
+
 
+if __name__ == '__main__':
+    main()
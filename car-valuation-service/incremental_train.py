@@ -0,0 +1,174 @@
+"""
+Train tiếp (continued training) model XGBoost hiện tại trên dữ liệu mới scrape, không chạy lại retrain_model.py.
+
+- Load Pipeline từ models/best_car_price_pipeline.pkl, giữ nguyên preprocessor:
+  + One-hot (ColumnTransformer): vocabulary cố định (số cột phải khớp booster) -> category mới bị bỏ qua
+    (handle_unknown='ignore'), script in ra số dòng bị ảnh hưởng để biết lúc nào cần retrain đầy đủ.
+  + CategoryCodeEncoder (XGBoost native categorical): --extend-vocab thêm category mới vào CUỐI danh sách,
+    mã cũ giữ nguyên nên các cây cũ vẫn đúng.
+- Thêm cây mới vào booster cũ (xgb_model=...) train trên: dòng mới (delta) + mẫu replay từ dữ liệu cũ
+  (tránh model "quên" phân phối cũ).
+- Chỉ ghi artifact khi MAE trên holdout (test split cũ + 20% delta) không tệ hơn model hiện tại.
+
+Chạy: python incremental_train.py --delta data/toyota_cleaned_new.csv
+Sau khi ghi model mới cần chạy lại build_price_table.py (bảng giá cũ tự bị bỏ qua vì khác fingerprint).
+"""
+import argparse
+import copy
+import json
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from retrain_model import TEST_SIZE, SPLIT_SEED, load_training_data
+from service.encoders import CategoryCodeEncoder
+
+BASE_DIR = Path(__file__).resolve().parent
+MODELS_DIR = BASE_DIR / "models"
+MODEL_PATH = MODELS_DIR / "best_car_price_pipeline.pkl"
+METRICS_PATH = MODELS_DIR / "model_metrics.json"
+BASE_DATA_PATH = BASE_DIR / "data" / "toyota_cleaned.csv"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train tiếp model XGBoost trên dữ liệu mới")
+    parser.add_argument('--delta', type=Path, required=True, help="CSV các tin mới (cùng format toyota_cleaned.csv)")
+    parser.add_argument('--base', type=Path, default=BASE_DATA_PATH,
+                        help="CSV dữ liệu đã dùng để train model hiện tại (lấy mẫu replay + holdout)")
+    parser.add_argument('--n-trees', type=int, default=200, help="Số cây tối đa được thêm vào")
+    parser.add_argument('--learning-rate', type=float, default=None,
+                        help="Learning rate cho các cây mới (mặc định giữ như model hiện tại)")
+    parser.add_argument('--replay-ratio', type=float, default=3.0,
+                        help="Số dòng cũ lấy mẫu lại cho mỗi dòng mới")
+    parser.add_argument('--extend-vocab', action='store_true',
+                        help="Thêm category mới vào encoder (chỉ với XGBoost native categorical)")
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help="Cho phép MAE holdout tăng tối đa bao nhiêu phần (0.01 = 1%%)")
+    parser.add_argument('--dry-run', action='store_true', help="Chỉ đánh giá, không ghi model")
+    return parser.parse_args(argv)
+
+
+def unknown_category_rows(preprocessor, X) -> int:
+    """Số dòng có ít nhất 1 category mà encoder chưa biết (sẽ bị bỏ qua khi predict)"""
+    if isinstance(preprocessor, CategoryCodeEncoder):
+        known = preprocessor.categories_
+        columns = preprocessor.cat_features
+    else:
+        _, cat_pipeline, columns = next(t for t in preprocessor.transformers_ if t[0] == 'cat')
+        encoder = cat_pipeline.named_steps['onehot']
+        known = {col: cats for col, cats in zip(columns, encoder.categories_)}
+
+    unknown = np.zeros(len(X), dtype=bool)
+    for col in columns:
+        unknown |= ~X[col].astype(str).isin(set(map(str, known[col]))).to_numpy()
+    return int(unknown.sum())
+
+
+def holdout_report(pipeline, X, y) -> dict:
+    y_pred = pipeline.predict(X)
+    return {'mae': float(mean_absolute_error(y, y_pred)), 'r2': float(r2_score(y, y_pred))}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_start = time.perf_counter()
+
+    print("🚀 TRAIN TIẾP MODEL TRÊN DỮ LIỆU MỚI")
+    print("="*70)
+
+    if not MODEL_PATH.exists():
+        raise FileNotFoundError(f"❌ Không tìm thấy file model tại: {MODEL_PATH}")
+    current = joblib.load(MODEL_PATH)
+    preprocessor = current.named_steps['preprocessor']
+    regressor = current.named_steps['regressor']
+    if not hasattr(regressor, 'get_booster'):
+        raise ValueError(f"❌ Model hiện tại ({type(regressor).__name__}) không phải XGBoost, "
+                         f"hãy chạy retrain_model.py")
+
+    # --- 1. DỮ LIỆU ---
+    X_base, y_base = load_training_data(args.base)
+    X_delta, y_delta = load_training_data(args.delta)
+    if len(X_delta) < 10:
+        raise ValueError(f"❌ Quá ít dòng mới ({len(X_delta)}) để train tiếp")
+
+    # Holdout cũ = đúng test split của retrain_model.py -> model hiện tại chưa thấy các dòng này
+    X_base_train, X_base_test, y_base_train, y_base_test = train_test_split(
+        X_base, y_base, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+    X_delta_train, X_delta_test, y_delta_train, y_delta_test = train_test_split(
+        X_delta, y_delta, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+
+    n_replay = min(len(X_base_train), int(len(X_delta_train) * args.replay_ratio))
+    replay_idx = np.random.RandomState(SPLIT_SEED).choice(len(X_base_train), n_replay, replace=False)
+    X_fit = pd.concat([X_delta_train, X_base_train.iloc[replay_idx]])
+    y_fit = pd.concat([y_delta_train, y_base_train.iloc[replay_idx]])
+    print(f"📁 Delta: {len(X_delta)} dòng ({len(X_delta_train)} train) + replay {n_replay} dòng cũ")
+
+    # --- 2. ENCODER ---
+    new_preprocessor = copy.deepcopy(preprocessor)
+    n_unknown = unknown_category_rows(new_preprocessor, X_delta)
+    if args.extend_vocab:
+        if not isinstance(new_preprocessor, CategoryCodeEncoder):
+            raise ValueError("❌ --extend-vocab chỉ dùng được với XGBoost native categorical "
+                             "(one-hot cố định số cột của booster)")
+        added = new_preprocessor.extend_categories(X_delta)
+        print(f"🔤 Thêm {added} category mới vào encoder")
+    elif n_unknown:
+        print(f"⚠️  {n_unknown} dòng mới có category chưa biết -> bị bỏ qua (cần retrain đầy đủ để học)")
+
+    # --- 3. TRAIN TIẾP ---
+    new_regressor = clone(regressor).set_params(n_estimators=args.n_trees)
+    if args.learning_rate is not None:
+        new_regressor.set_params(learning_rate=args.learning_rate)
+
+    n_trees_before = regressor.get_booster().num_boosted_rounds()
+    start = time.perf_counter()
+    new_regressor.fit(new_preprocessor.transform(X_fit), y_fit, xgb_model=regressor.get_booster())
+    n_trees_after = new_regressor.get_booster().num_boosted_rounds()
+    print(f"🌲 Cây: {n_trees_before} -> {n_trees_after} ({time.perf_counter() - start:.1f}s)")
+
+    candidate = copy.copy(current)
+    candidate.steps = [('preprocessor', new_preprocessor), ('regressor', new_regressor)]
+
+    # --- 4. KIỂM TRA MAE ---
+    X_holdout = pd.concat([X_base_test, X_delta_test])
+    y_holdout = pd.concat([y_base_test, y_delta_test])
+    report = {}
+    for label, (X_eval, y_eval) in {'cũ': (X_base_test, y_base_test),
+                                    'mới': (X_delta_test, y_delta_test),
+                                    'tổng': (X_holdout, y_holdout)}.items():
+        before = holdout_report(current, X_eval, y_eval)
+        after = holdout_report(candidate, X_eval, y_eval)
+        report[label] = (before, after)
+        print(f"   Holdout {label:<4} ({len(y_eval):>6} dòng): MAE {before['mae']:,.2f} -> {after['mae']:,.2f}")
+
+    limit = 1 + args.tolerance
+    regressed = [label for label in ('cũ', 'tổng')
+                 if report[label][1]['mae'] > report[label][0]['mae'] * limit]
+    if regressed:
+        print(f"\n❌ MAE holdout {', '.join(regressed)} tăng -> GIỮ model hiện tại")
+        return False
+
+    if args.dry_run:
+        print("\n✅ Đạt yêu cầu (dry run, không ghi model)")
+        return True
+
+    joblib.dump(candidate, MODEL_PATH)
+    after_total = report['tổng'][1]
+    model_name = json.loads(METRICS_PATH.read_text(encoding='utf-8')).get('Model', 'XGBoost') \
+        if METRICS_PATH.exists() else 'XGBoost'
+    pd.Series({'Model': model_name, 'Test MAE': after_total['mae'], 'R2 Score': after_total['r2']}).to_json(METRICS_PATH)
+
+    print(f"\n💾 Đã lưu Pipeline tại: {MODEL_PATH}")
+    print("👉 Nhớ chạy lại build_price_table.py để cập nhật bảng giá")
+    print(f"⏱️  Tổng thời gian: {time.perf_counter() - run_start:,.0f}s")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+Nạp output của mọi scraper (data/toyota_cars_*.csv, cars_data_*.csv, toyota_oto_*.csv, toyota_chotot_*.csv)
+vào file dữ liệu đã clean (data/toyota_cleaned.csv) trong 1 lần chạy.
+
+- Tự tìm file theo SOURCE_FILES (dedupe_listings.py); mỗi file có thể khác cột/định dạng giữa các scraper
+  (bonbanh không có cột version, mileage "30.961 km" / "5 vạn km" / chỉ có số, giá là số triệu hoặc text
+  "1 tỷ 200 triệu"...) -> map về cùng schema CLEAN_COLUMNS với định dạng của toyota_cleaned.csv
+  (price_vnd triệu VND, mileage "XXXXX km", year số nguyên, make/model theo bảng alias).
+- Parse vector hoá: đường nhanh bằng phép toán trên cả cột (to_numeric, str.extract), chỉ các giá trị không khớp
+  mới gọi hàm parse của service/title_parser.py, và mỗi giá trị khác nhau chỉ parse 1 lần.
+- Các file xử lý song song trong ProcessPoolExecutor (--workers), kết quả gộp theo thứ tự tên file rồi ghi
+  nối vào toyota_cleaned.csv 1 lần (bỏ tin trùng (source, ad_id) đã có trong file hoặc giữa các file mới:
+  giữ bản scrape mới nhất). --lake: ghi thêm vào bảng 'cleaned' của lake Parquet (listings_lake.py).
+- Sau đó loại tin trùng gần đúng (cùng xe đăng trên nhiều trang, khác ad_id) bằng MinHash/LSH của
+  dedupe_listings.py: so các dòng mới với nhau và với các dòng đã clean cùng block make/model/year. Cụm có tin đã
+  có trong file -> bỏ mọi dòng mới của cụm (file chỉ ghi thêm); cụm chỉ gồm dòng mới -> giữ 1 tin như
+  dedupe_listings.choose_survivors. --no-fuzzy-dedupe: chỉ bỏ trùng (source, ad_id).
+- Manifest data/cache/ingest_manifest.json: hash nội dung -> file đã nạp; file đã nạp (kể cả đổi tên) bị bỏ qua.
+  File chỉ được ghi thêm nên extract_metadata.py --incremental chỉ phải đọc phần mới.
+
+Chạy: python ingest_listings.py [--workers 4] [--lake] [--dry-run]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import CACHE_DIR
+from dedupe_listings import BLOCK_COLUMNS, SOURCE_FILES, choose_survivors, find_duplicates, source_from_path
+from search_cache import file_content_hash
+from service.aliases import load_alias_table
+from service.title_parser import extract_price_vnd, extract_version_from_title, parse_mileage_km
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+CLEANED_PATH = DATA_DIR / "toyota_cleaned.csv"
+MANIFEST_PATH = CACHE_DIR / "ingest_manifest.json"
+
+CLEAN_COLUMNS = ['ad_id', 'make', 'model', 'version', 'title', 'price_vnd', 'mileage', 'year', 'color', 'source']
+KEY_COLUMNS = ['source', 'ad_id']
+YEAR_RANGE = (1980, datetime.now().year + 1)
+# Giá >= ngưỡng này là VND đầy đủ chứ không phải triệu (scraper cũ ghi nguyên số tiền)
+FULL_VND_THRESHOLD = 100_000
+
+_KM_RE = r'^\s*(\d[\d.,]*)\s*(?:km)?\s*$'
+
+
+def discover_files(data_dir: Path = DATA_DIR) -> List[Path]:
+    """Output của các scraper trong data_dir, sắp theo tên (timestamp trong tên -> thứ tự scrape)"""
+    found = {path for pattern in SOURCE_FILES for path in Path(data_dir).glob(pattern)}
+    return sorted(found, key=lambda p: p.name)
+
+
+# --- Parse vector hoá ---
+def _parse_unique(values: pd.Series, func) -> pd.Series:
+    """func chạy 1 lần cho mỗi giá trị khác nhau (các giá trị không parse được bằng phép toán trên cột)"""
+    codes, uniques = pd.factorize(values)
+    parsed = np.array([func(u) for u in uniques] + [None], dtype=float)
+    return pd.Series(parsed[codes], index=values.index)
+
+
+def parse_price(values: pd.Series) -> pd.Series:
+    """Giá -> triệu VND (float): số ("174", "174.0") đi thẳng to_numeric, text ("1 tỷ 200 triệu") qua extract_price_vnd"""
+    price = pd.to_numeric(values, errors='coerce')
+    text = values.notna() & price.isna()
+    if text.any():
+        price[text] = _parse_unique(values[text], extract_price_vnd)
+    return price.where(price < FULL_VND_THRESHOLD, price / 1_000_000)
+
+
+def parse_mileage(values: pd.Series) -> pd.Series:
+    """Mileage -> số km (Int64): "30961 km" / "30.961 km" / "30961" bằng regex trên cột, còn lại ("5 vạn km") qua
+    parse_mileage_km"""
+    digits = values.astype('str').str.extract(_KM_RE, expand=False).str.replace(r'[.,]', '', regex=True)
+    km = pd.to_numeric(digits, errors='coerce')
+    rest = values.notna() & km.isna()
+    if rest.any():
+        km[rest] = _parse_unique(values[rest], parse_mileage_km)
+    return km.round().astype('Int64')
+
+
+def parse_year(values: pd.Series) -> pd.Series:
+    year = pd.to_numeric(values, errors='coerce').round().astype('Int64')
+    return year.where(year.between(*YEAR_RANGE))
+
+
+def _versions_from_titles(df: pd.DataFrame) -> pd.Series:
+    """Version trích từ title (file không có cột version) - 1 lần cho mỗi bộ (title, make, model) khác nhau"""
+    keys = df[['title', 'make', 'model']].astype(object)
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(keys.fillna('')))
+    versions = [extract_version_from_title(title, make, model) if title else None for title, make, model in uniques]
+    return pd.Series(np.asarray(versions + [None], dtype=object)[codes], index=df.index)
+
+
+def _text(values: pd.Series) -> pd.Series:
+    values = values.astype('str').str.strip()
+    return values.where(values != '')
+
+
+def to_clean_schema(raw: pd.DataFrame, source: str) -> pd.DataFrame:
+    """DataFrame output của 1 scraper (cột dạng chuỗi) -> CLEAN_COLUMNS; bỏ dòng thiếu make/model/giá/năm"""
+    aliases = load_alias_table()
+    empty = pd.Series(None, index=raw.index, dtype=object)
+    column = lambda name: raw[name] if name in raw.columns else empty
+
+    df = pd.DataFrame(index=raw.index)
+    df['ad_id'] = _text(column('ad_id'))
+    make = aliases.normalize_brands(column('make'))
+    df['make'] = make.astype(object).replace('', None)
+    df['model'] = aliases.normalize_models(make, column('model')).astype(object).replace('', None)
+    df['title'] = _text(column('title'))
+    df['version'] = _text(column('version')) if 'version' in raw.columns else _versions_from_titles(df)
+    df['price_vnd'] = parse_price(column('price_vnd'))
+    km = parse_mileage(column('mileage'))
+    df['mileage'] = (km.astype('str') + ' km').where(km.notna())
+    df['year'] = parse_year(column('year'))
+    df['color'] = _text(column('color'))
+    df['source'] = _text(raw['source']).fillna(source) if 'source' in raw.columns else source
+
+    df = df.dropna(subset=['make', 'model', 'price_vnd', 'year'])
+    return df[CLEAN_COLUMNS]
+
+
+def ingest_file(path: Path) -> dict:
+    """Worker: đọc + map 1 file -> {'path', 'hash', 'rows_in', 'rows', 'frame', 'seconds'}"""
+    start = time.perf_counter()
+    path = Path(path)
+    raw = pd.read_csv(path, dtype='str', encoding='utf-8-sig', keep_default_na=False, na_values=[''])
+    source = source_from_path(path)
+    if source is None and 'source' not in raw.columns:
+        raise ValueError(f"❌ Không biết nguồn của {path.name} (không khớp SOURCE_FILES và không có cột source)")
+    frame = to_clean_schema(raw, source)
+    return {'path': str(path), 'hash': file_content_hash(path), 'rows_in': len(raw), 'rows': len(frame),
+            'frame': frame, 'seconds': time.perf_counter() - start}
+
+
+# --- Manifest ---
+def load_manifest(path: Path = MANIFEST_PATH) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, path: Path = MANIFEST_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+
+def pending_files(files: List[Path], manifest: dict) -> List[Path]:
+    """File chưa nạp: hash nội dung chưa có trong manifest"""
+    return [path for path in files if file_content_hash(path) not in manifest]
+
+
+# --- Gộp ---
+def _existing_keys(cleaned_path: Path) -> pd.MultiIndex:
+    if not cleaned_path.exists():
+        return pd.MultiIndex.from_arrays([[], []], names=KEY_COLUMNS)
+    keys = pd.read_csv(cleaned_path, usecols=KEY_COLUMNS, dtype='str', keep_default_na=False, na_values=[''])
+    return pd.MultiIndex.from_frame(keys[KEY_COLUMNS])
+
+
+def merge_new_rows(frames: List[pd.DataFrame], cleaned_path: Path) -> pd.DataFrame:
+    """
+    Gộp các file mới (index level 'file' = vị trí file trong frames): tin trùng (source, ad_id) giữ bản sau cùng
+    (file mới hơn), bỏ tin đã có trong cleaned_path. Tin không có ad_id luôn giữ.
+    """
+    if not frames:
+        return pd.DataFrame(columns=CLEAN_COLUMNS)
+    new = pd.concat(frames, keys=range(len(frames)), names=['file', 'row'])
+    has_id = new['ad_id'].notna().to_numpy()
+    duplicated = new.duplicated(KEY_COLUMNS, keep='last').to_numpy()
+    seen = pd.MultiIndex.from_frame(new[KEY_COLUMNS]).isin(_existing_keys(cleaned_path))
+    return new[~(has_id & (duplicated | seen))]
+
+
+def _cleaned_in_blocks(cleaned_path: Path, blocks: pd.MultiIndex, chunk_rows: int = 500_000) -> pd.DataFrame:
+    """Các dòng đã clean thuộc các block make/model/year của dòng mới (đọc file theo chunk)"""
+    if not cleaned_path.exists() or cleaned_path.stat().st_size == 0:
+        return pd.DataFrame(columns=CLEAN_COLUMNS)
+    frames = []
+    for chunk in pd.read_csv(cleaned_path, chunksize=chunk_rows, dtype='str', keep_default_na=False,
+                             na_values=['']):
+        year = pd.to_numeric(chunk['year'], errors='coerce').round().astype('Int64')
+        keys = pd.MultiIndex.from_arrays([chunk['make'], chunk['model'], year], names=BLOCK_COLUMNS)
+        frames.append(chunk[keys.isin(blocks)])
+    return pd.concat(frames, ignore_index=True)
+
+
+def drop_fuzzy_duplicates(new_rows: pd.DataFrame, cleaned_path: Path) -> tuple:
+    """
+    Bỏ tin trùng gần đúng (MinHash/LSH, dedupe_listings.find_duplicates) trong new_rows, so với nhau và với các
+    dòng đã clean cùng block -> (dòng giữ lại, số dòng bỏ vì trùng tin đã có trong cleaned_path).
+    """
+    if new_rows.empty:
+        return new_rows, 0
+    blocks = pd.MultiIndex.from_frame(new_rows[BLOCK_COLUMNS].astype({'year': 'Int64'}).drop_duplicates())
+    existing = _cleaned_in_blocks(cleaned_path, blocks)
+    combined = pd.concat([existing[CLEAN_COLUMNS], new_rows[CLEAN_COLUMNS].astype(object)], ignore_index=True)
+    labels, _, _ = find_duplicates(combined)
+
+    # Cụm đã có tin trong file: mọi dòng mới của cụm là bản trùng
+    labels_new = labels[len(existing):]
+    seen = np.isin(labels_new, labels[:len(existing)])
+    survivors = choose_survivors(new_rows[~seen], labels_new[~seen])
+    return survivors.drop(columns=['dup_group', 'dup_count']), int(seen.sum())
+
+
+def append_cleaned(rows: pd.DataFrame, cleaned_path: Path) -> None:
+    """Ghi nối vào file cleaned 1 lần (header chỉ khi file chưa có)"""
+    if rows.empty:
+        return
+    write_header = not cleaned_path.exists() or cleaned_path.stat().st_size == 0
+    if not write_header:
+        header = pd.read_csv(cleaned_path, nrows=0).columns.tolist()
+        if header != CLEAN_COLUMNS:
+            raise ValueError(f"❌ Cột của {cleaned_path.name} ({header}) khác CLEAN_COLUMNS")
+    rows.to_csv(cleaned_path, mode='a', index=False, header=write_header, encoding='utf-8')
+
+
+def run_ingest(files: List[Path], workers: Optional[int] = None) -> List[dict]:
+    """Map các file song song (thứ tự kết quả = thứ tự files); workers=1 chạy ngay trong process hiện tại"""
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    if workers <= 1 or len(files) <= 1:
+        return [ingest_file(path) for path in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(ingest_file, files))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Nạp output của các scraper vào dữ liệu đã clean")
+    parser.add_argument('files', type=Path, nargs='*', help="File cần nạp (mặc định: tự tìm trong data/)")
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    parser.add_argument('--output', type=Path, default=CLEANED_PATH)
+    parser.add_argument('--workers', type=int, default=None, help="Số process song song (mặc định = số core)")
+    parser.add_argument('--force', action='store_true', help="Nạp lại cả file đã có trong manifest")
+    parser.add_argument('--lake', action='store_true', help="Ghi thêm vào bảng 'cleaned' của lake Parquet")
+    parser.add_argument('--no-fuzzy-dedupe', action='store_true',
+                        help="Chỉ bỏ trùng (source, ad_id), không chạy MinHash/LSH của dedupe_listings.py")
+    parser.add_argument('--dry-run', action='store_true', help="Chỉ map + đếm, không ghi file/manifest")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+
+    print("📥 NẠP OUTPUT SCRAPER")
+    print("="*60)
+    files = args.files or discover_files(args.data_dir)
+    manifest = load_manifest()
+    todo = files if args.force else pending_files(files, manifest)
+    print(f"🔍 {len(files)} file scraper, {len(files) - len(todo)} đã nạp trước đó, {len(todo)} file mới")
+    if not todo:
+        print("✅ Không có gì để nạp")
+        return
+
+    results = run_ingest(todo, args.workers)
+    for result in results:
+        print(f"   ✅ {Path(result['path']).name}: {result['rows_in']:,} dòng -> {result['rows']:,} dòng hợp lệ "
+              f"({result['seconds']:.2f}s)")
+
+    new_rows = merge_new_rows([r['frame'] for r in results], args.output)
+    print(f"🔀 {sum(r['rows'] for r in results):,} dòng hợp lệ -> {len(new_rows):,} dòng mới (bỏ tin đã có/trùng)")
+    if not args.no_fuzzy_dedupe:
+        n_rows = len(new_rows)
+        new_rows, n_seen = drop_fuzzy_duplicates(new_rows, args.output)
+        print(f"🧬 MinHash/LSH: bỏ {n_rows - len(new_rows):,} tin trùng gần đúng ({n_seen:,} trùng tin đã có) "
+              f"-> {len(new_rows):,} dòng mới")
+    if args.dry_run:
+        print("ℹ️  --dry-run: không ghi gì")
+        return
+
+    append_cleaned(new_rows, args.output)
+    if args.lake and not new_rows.empty:
+        from listings_lake import append_listings, scrape_date_from_path
+        written = 0
+        for position, rows in new_rows.groupby(level='file'):
+            scrape_date = scrape_date_from_path(Path(results[position]['path']))
+            written += append_listings(rows, table='cleaned', scrape_date=scrape_date)
+        print(f"📦 Lake: +{written:,} dòng -> bảng 'cleaned'")
+
+    ingested_at = datetime.now().isoformat(timespec='seconds')
+    for result in results:
+        manifest[result['hash']] = {'file': Path(result['path']).name, 'rows_in': result['rows_in'],
+                                    'rows': result['rows'], 'ingested_at': ingested_at}
+    save_manifest(manifest)
+    print(f"\n✅ Hoàn thành ({time.perf_counter() - start:.1f}s): +{len(new_rows):,} dòng -> {args.output}")
+    print(f"   📒 Manifest: {MANIFEST_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+"""
+Kho Parquet phân vùng (data lake) cho mọi tin đăng: tin scrape thô và tin đã clean.
+
+data/lake/<bảng>/source=<nguồn>/make=<hãng>/scrape_date=<YYYY-MM-DD>/part-*.parquet
+- 2 bảng: 'scraped' (scrapers ghi vào sau mỗi lần chạy) và 'cleaned' (dữ liệu đã clean, dùng để train
+  và extract metadata). Cùng 1 schema (LISTING_SCHEMA), khác thư mục.
+- Schema cố định: cột lạ -> ValueError (sai tên trường ở scraper bị bắt ngay), cột thiếu -> null,
+  price_vnd/year/mileage/seats ép về số ("30961 km" -> 30961), accident_free/single_owner về bool,
+  make/model chuẩn hoá theo bảng alias (service/aliases.json) để 1 hãng chỉ có 1 phân vùng.
+  Dòng thiếu make hoặc source (khoá phân vùng) bị bỏ và báo số dòng.
+- append_listings(): mỗi lần ghi là file mới tên duy nhất (không sửa file cũ), ghi vào thư mục tạm
+  rồi rename -> người đọc không bao giờ thấy file ghi dở, nhiều scraper ghi song song không đè nhau.
+- read_listings()/iter_batches(): lọc theo source/make/khoảng ngày scrape -> chỉ mở file trong các
+  phân vùng khớp (partition pruning); điều kiện thêm trên cột dữ liệu (vd. year >= 2015) được đẩy xuống
+  thống kê row group của Parquet, và chỉ đọc các cột cần.
+- lake_fingerprint(): hash danh sách file khớp bộ lọc (file không bao giờ bị sửa) -> dùng làm key cache.
+- compact() thì không nguyên tử với người đọc: file gộp xuất hiện trước khi các file cũ bị xoá, người đọc liệt kê
+  file đúng lúc đó thấy cả 2 -> đếm trùng. Chỉ chạy compact khi không có job nào đang đọc bảng đó.
+
+Chạy: python listings_lake.py import data/toyota_oto_*.csv                  # nạp CSV scrape cũ vào 'scraped'
+      python listings_lake.py import data/toyota_cleaned.csv --table cleaned --date 2025-12-01
+      python listings_lake.py stats [--table cleaned]
+      python listings_lake.py compact [--table scraped]                    # gộp file nhỏ trong từng phân vùng
+"""
+import argparse
+import hashlib
+import re
+import shutil
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from service.aliases import load_alias_table
+
+BASE_DIR = Path(__file__).resolve().parent
+LAKE_DIR = BASE_DIR / "data" / "lake"
+TABLES = ('scraped', 'cleaned')
+
+# Cột dữ liệu lưu trong file Parquet (khoá phân vùng nằm ở tên thư mục, không lưu lại trong file)
+LISTING_SCHEMA = pa.schema([
+    ('ad_id', pa.string()),
+    ('model', pa.string()),
+    ('version', pa.string()),
+    ('title', pa.string()),
+    ('price_vnd', pa.float64()),        # triệu VND
+    ('mileage', pa.int64()),            # km
+    ('year', pa.int32()),
+    ('color', pa.string()),
+    ('location', pa.string()),
+    ('fuel', pa.string()),
+    ('engine', pa.string()),
+    ('gearbox', pa.string()),
+    ('body', pa.string()),
+    ('seats', pa.int32()),
+    ('engine_power', pa.string()),
+    ('origin', pa.string()),
+    ('accident_free', pa.bool_()),
+    ('single_owner', pa.bool_()),
+    ('description', pa.string()),
+    ('url', pa.string()),
+])
+PARTITION_SCHEMA = pa.schema([
+    ('source', pa.string()),
+    ('make', pa.string()),
+    ('scrape_date', pa.date32()),
+])
+DATASET_SCHEMA = pa.schema([*LISTING_SCHEMA, *PARTITION_SCHEMA])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+
+_SOURCE_RE = re.compile(r'^[a-z0-9_]+$')
+_TRUE_VALUES = {'true', '1', 'yes', 'có'}
+_FALSE_VALUES = {'false', '0', 'no', 'không'}
+
+
+def table_dir(table: str) -> Path:
+    if table not in TABLES:
+        raise ValueError(f"❌ Bảng không hợp lệ: {table!r} (chọn 1 trong {TABLES})")
+    return LAKE_DIR / table
+
+
+# --- Ghi ---
+def _to_bool(values: pd.Series) -> pd.Series:
+    def convert(v):
+        if isinstance(v, (bool, np.bool_)):
+            return bool(v)
+        text = str(v).strip().casefold()
+        return True if text in _TRUE_VALUES else False if text in _FALSE_VALUES else None
+    return values.map(convert, na_action='ignore').astype('boolean')
+
+
+def _to_integer(values: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(values):
+        # "30.961 km" / "7 chỗ" -> chỉ giữ chữ số, giống normalize_dataset
+        values = values.astype('str').str.replace(r'\D', '', regex=True)
+    return pd.to_numeric(values, errors='coerce').round().astype('Int64')
+
+
+def _to_text(values: pd.Series) -> pd.Series:
+    if isinstance(values.dtype, pd.StringDtype):
+        return values
+    # Chuyển từng giá trị khác nhau 1 lần; code -1 (thiếu) lấy phần tử cuối là None
+    codes, uniques = pd.factorize(values)
+    texts = [v if isinstance(v, str) else str(v) for v in uniques]
+    return pd.Series(np.asarray([*texts, None], dtype=object)[codes], index=values.index)
+
+
+def conform(df: pd.DataFrame, source: Optional[str] = None,
+            scrape_date: Optional[Union[date, str]] = None) -> pa.Table:
+    """
+    DataFrame tin đăng -> pyarrow Table đúng DATASET_SCHEMA.
+    source/scrape_date: giá trị cho mọi dòng; None -> lấy từ cột cùng tên (scrape_date thiếu -> hôm nay).
+    """
+    unknown = sorted(set(df.columns) - set(DATASET_SCHEMA.names))
+    if unknown:
+        raise ValueError(f"❌ Cột không có trong schema của lake: {unknown}")
+    df = df.reset_index(drop=True)
+
+    if source is not None:
+        df['source'] = source
+    elif 'source' not in df.columns:
+        raise ValueError("❌ Thiếu source: truyền source=... hoặc có cột 'source'")
+    if scrape_date is not None or 'scrape_date' not in df.columns:
+        df['scrape_date'] = scrape_date or date.today()
+    df['scrape_date'] = pd.to_datetime(df['scrape_date'], errors='coerce').dt.date
+
+    aliases = load_alias_table()
+    missing = pd.Series(None, index=df.index, dtype=object)
+    make = aliases.normalize_brands(df['make'] if 'make' in df.columns else missing)
+    model = aliases.normalize_models(make, df['model'] if 'model' in df.columns else missing)
+    df['make'] = make.astype(object).replace('', None)
+    df['model'] = model.astype(object).replace('', None)
+
+    source_values = df['source'].astype(object)
+    bad_sources = {s for s in source_values.dropna().unique() if not _SOURCE_RE.match(str(s))}
+    if bad_sources:
+        raise ValueError(f"❌ Tên nguồn không hợp lệ (chỉ a-z, 0-9, _): {sorted(bad_sources)}")
+
+    columns = {}
+    for field in DATASET_SCHEMA:
+        values = df[field.name] if field.name in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if field.name in ('scrape_date', 'make', 'model', 'source'):
+            columns[field.name] = values.astype(object).where(values.notna(), None)
+        elif pa.types.is_floating(field.type):
+            columns[field.name] = pd.to_numeric(values, errors='coerce')
+        elif pa.types.is_integer(field.type):
+            columns[field.name] = _to_integer(values)
+        elif pa.types.is_boolean(field.type):
+            columns[field.name] = _to_bool(values)
+        else:
+            columns[field.name] = _to_text(values)
+    frame = pd.DataFrame(columns)
+
+    keep = frame[['source', 'make', 'scrape_date']].notna().all(axis=1)
+    if not keep.all():
+        print(f"   ⚠️  Bỏ {int((~keep).sum())} dòng thiếu source/make/scrape_date")
+        frame = frame[keep]
+    return pa.Table.from_pandas(frame, schema=DATASET_SCHEMA, preserve_index=False)
+
+
+def append_listings(rows: Union[pd.DataFrame, Iterable[dict]], source: Optional[str] = None,
+                    table: str = 'scraped', scrape_date: Optional[Union[date, str]] = None) -> int:
+    """
+    Ghi thêm tin đăng vào lake (list dict của scraper hoặc DataFrame), trả về số dòng đã ghi.
+    Mỗi phân vùng (source, make, scrape_date) nhận 1 file mới; file cũ không bị sửa.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    if df.empty:
+        return 0
+    data = conform(df, source, scrape_date)
+    if data.num_rows == 0:
+        return 0
+
+    target = table_dir(table)
+    staging = LAKE_DIR / f".staging-{uuid.uuid4().hex}"
+    try:
+        ds.write_dataset(data, staging, format='parquet', partitioning=PARTITIONING,
+                         basename_template=f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+                         existing_data_behavior='error')
+        # rename từng file vào đúng phân vùng: cùng filesystem -> nguyên tử
+        for path in sorted(staging.rglob('*.parquet')):
+            dest = target / path.relative_to(staging)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            path.replace(dest)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return data.num_rows
+
+
+def save_scraped(rows: List[dict], source: str) -> None:
+    """Dùng ở scrapers: ghi batch tin vừa scrape vào bảng 'scraped'; lỗi chỉ cảnh báo, không dừng scrape"""
+    try:
+        written = append_listings(rows, source=source, table='scraped')
+        if written:
+            print(f"  📦 Lake: +{written} tin ({source})")
+    except Exception as e:
+        print(f"  ⚠️  Không ghi được vào lake: {e}")
+
+
+# --- Đọc ---
+def partition_filter(sources: Optional[List[str]] = None, makes: Optional[List[str]] = None,
+                     since: Optional[Union[date, str]] = None, until: Optional[Union[date, str]] = None,
+                     where: Optional[ds.Expression] = None) -> Optional[ds.Expression]:
+    """Bộ lọc pyarrow: source/make trong danh sách, since <= scrape_date <= until, AND thêm `where`"""
+    aliases = load_alias_table()
+    parts = []
+    if sources:
+        parts.append(ds.field('source').isin(list(sources)))
+    if makes:
+        parts.append(ds.field('make').isin([aliases.brand(m) for m in makes]))
+    if since:
+        parts.append(ds.field('scrape_date') >= pa.scalar(pd.Timestamp(since).date(), pa.date32()))
+    if until:
+        parts.append(ds.field('scrape_date') <= pa.scalar(pd.Timestamp(until).date(), pa.date32()))
+    if where is not None:
+        parts.append(where)
+    expr = None
+    for part in parts:
+        expr = part if expr is None else expr & part
+    return expr
+
+
+def lake_dataset(table: str = 'cleaned') -> ds.Dataset:
+    path = table_dir(table)
+    if not path.exists():
+        raise FileNotFoundError(f"❌ Lake chưa có bảng '{table}': {path} (chạy listings_lake.py import ...)")
+    return ds.dataset(path, schema=DATASET_SCHEMA, format='parquet', partitioning=PARTITIONING)
+
+
+def lake_exists(table: str = 'cleaned') -> bool:
+    return any(table_dir(table).rglob('*.parquet')) if table_dir(table).exists() else False
+
+
+def read_listings(table: str = 'cleaned', columns: Optional[List[str]] = None, **filters) -> pd.DataFrame:
+    """
+    Đọc tin từ lake. filters: sources, makes, since, until, where (xem partition_filter).
+    Chỉ mở file trong phân vùng khớp và chỉ đọc `columns` (None = mọi cột).
+    """
+    data = lake_dataset(table).to_table(columns=columns, filter=partition_filter(**filters))
+    return data.to_pandas()
+
+
+def iter_batches(table: str = 'cleaned', columns: Optional[List[str]] = None, batch_rows: int = 500_000,
+                 **filters) -> Iterator[pd.DataFrame]:
+    """Như read_listings nhưng trả từng batch -> RAM chỉ tỉ lệ với batch_rows"""
+    scanner = lake_dataset(table).scanner(columns=columns, filter=partition_filter(**filters),
+                                          batch_size=batch_rows)
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def lake_files(table: str = 'cleaned', **filters) -> List[Path]:
+    """File Parquet nằm trong các phân vùng khớp bộ lọc"""
+    expr = partition_filter(**filters)
+    return sorted(Path(f.path) for f in lake_dataset(table).get_fragments(filter=expr))
+
+
+def lake_fingerprint(table: str = 'cleaned', **filters) -> str:
+    """Hash (đường dẫn, kích thước) các file khớp bộ lọc: file chỉ được thêm mới -> đủ làm key cache"""
+    digest = hashlib.sha256(repr(sorted(filters.items(), key=lambda kv: kv[0])).encode('utf-8'))
+    root = table_dir(table)
+    for path in lake_files(table, **filters):
+        digest.update(f"{path.relative_to(root)}:{path.stat().st_size}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def describe_filters(sources=None, makes=None, since=None, until=None, **_) -> str:
+    parts = [f"source={','.join(sources)}" if sources else None, f"make={','.join(makes)}" if makes else None,
+             f"từ {since}" if since else None, f"tới {until}" if until else None]
+    return ' '.join(p for p in parts if p) or 'toàn bộ'
+
+
+def add_filter_args(parser: argparse.ArgumentParser) -> None:
+    """Tham số lọc lake dùng chung cho các script đọc lake (retrain_model.py, extract_metadata.py)"""
+    parser.add_argument('--sources', nargs='+', default=None, help="Chỉ đọc các nguồn này (vd. bonbanh oto)")
+    parser.add_argument('--makes', nargs='+', default=None, help="Chỉ đọc các hãng này (vd. Toyota)")
+    parser.add_argument('--since', default=None, help="Chỉ đọc tin scrape từ ngày này (YYYY-MM-DD)")
+    parser.add_argument('--until', default=None, help="Chỉ đọc tin scrape tới ngày này (YYYY-MM-DD)")
+
+
+def filters_from_args(args) -> dict:
+    return {'sources': args.sources, 'makes': args.makes, 'since': args.since, 'until': args.until}
+
+
+# --- Bảo trì ---
+def compact(table: str = 'scraped') -> int:
+    """
+    Gộp các file nhỏ trong mỗi phân vùng thành 1 file (tên duy nhất như append_listings, không đè file gộp của lần
+    compact trước); trả về số phân vùng đã gộp. Không chạy song song với người đọc (xem docstring module).
+    """
+    root = table_dir(table)
+    merged = 0
+    for directory in sorted({p.parent for p in root.rglob('*.parquet')}):
+        files = sorted(directory.glob('*.parquet'))
+        if len(files) < 2:
+            continue
+        data = pa.concat_tables(pq.read_table(f, schema=LISTING_SCHEMA) for f in files)
+        tmp_path = directory / f".compact-{uuid.uuid4().hex}.parquet"
+        pq.write_table(data, tmp_path)
+        target = directory / f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}-compacted.parquet"
+        tmp_path.replace(target)
+        for f in files:
+            if f != target:
+                f.unlink()
+        merged += 1
+    return merged
+
+
+def scrape_date_from_path(path: Path) -> date:
+    """Ngày scrape theo timestamp trong tên file (cars_data_20251203_101500.csv), không có thì theo mtime"""
+    match = re.search(r'(\d{8})_\d{6}', path.name)
+    if match:
+        return datetime.strptime(match.group(1), '%Y%m%d').date()
+    return datetime.fromtimestamp(path.stat().st_mtime).date()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Kho Parquet phân vùng source/make/scrape_date cho tin đăng")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    imp = sub.add_parser('import', help="Nạp file CSV vào lake")
+    imp.add_argument('files', type=Path, nargs='+')
+    imp.add_argument('--table', choices=TABLES, default='scraped')
+    imp.add_argument('--source', default=None, help="Nguồn cho mọi dòng (mặc định: cột source hoặc theo tên file)")
+    imp.add_argument('--date', default=None, help="Ngày scrape (mặc định: timestamp trong tên file hoặc mtime)")
+
+    stats = sub.add_parser('stats', help="Số dòng/file theo phân vùng")
+    stats.add_argument('--table', choices=TABLES, default='scraped')
+
+    comp = sub.add_parser('compact', help="Gộp file nhỏ trong từng phân vùng")
+    comp.add_argument('--table', choices=TABLES, default='scraped')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'import':
+        from dedupe_listings import source_from_path
+        total = 0
+        for path in args.files:
+            df = pd.read_csv(path, encoding='utf-8-sig', dtype='str')
+            source = args.source or (None if 'source' in df.columns else source_from_path(path))
+            if source is None and 'source' not in df.columns:
+                raise ValueError(f"❌ Không biết nguồn của {path.name}: dùng --source")
+            extra = sorted(set(df.columns) - set(DATASET_SCHEMA.names))
+            if extra:
+                print(f"   ⚠️  {path.name}: bỏ cột ngoài schema {extra}")
+                df = df.drop(columns=extra)
+            written = append_listings(df, source=source, table=args.table,
+                                      scrape_date=args.date or scrape_date_from_path(path))
+            total += written
+            print(f"   ✅ {path.name}: {written:,} dòng -> {args.table}")
+        print(f"📦 Đã nạp {total:,} dòng vào {table_dir(args.table)}")
+
+    elif args.command == 'stats':
+        fragments = list(lake_dataset(args.table).get_fragments())
+        rows = []
+        for fragment in fragments:
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            rows.append({**keys, 'files': 1, 'rows': fragment.count_rows()})
+        if not rows:
+            print(f"⚠️  Bảng '{args.table}' trống")
+            return
+        summary = pd.DataFrame(rows).groupby(['source', 'make', 'scrape_date'])[['files', 'rows']].sum()
+        print(summary.to_string())
+        print(f"\n📊 {summary['rows'].sum():,} dòng, {summary['files'].sum()} file, {len(summary)} phân vùng")
+
+    elif args.command == 'compact':
+        merged = compact(args.table)
+        print(f"🧹 Đã gộp {merged} phân vùng")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Xuất metadata.json sang định dạng COPY của PostgreSQL và nạp vào bảng car_valuation_metadata.
+
+Thay cho seed_valuation_metadata.sql (TRUNCATE + 1 câu INSERT hàng nghìn dòng, gọi gen_random_uuid() từng dòng):
+- export: ghi các tổ hợp (make, model, year, version, color) ra file COPY dạng csv hoặc binary (PGCOPY).
+- load: COPY file vào bảng tạm (staging) rồi áp dụng trong 1 transaction:
+  * merge (mặc định): xoá tổ hợp không còn, thêm tổ hợp mới; dòng không đổi giữ nguyên id/createdAt.
+  * swap: dựng bảng mới đầy đủ rồi đổi tên thay bảng cũ (bảng cũ giữ lại dạng <bảng>_old).
+  Người đọc luôn thấy bảng cũ hoặc bảng mới, không bao giờ thấy bảng rỗng giữa chừng.
+  swap cũng làm view/foreign key đang trỏ vào bảng cũ đi theo bảng _old -> chỉ dùng khi không có ràng buộc đó.
+
+Chạy:
+    python metadata_db.py export --format binary --output models/metadata.copy
+    python metadata_db.py load --dsn postgresql://user@localhost/db [--mode swap] [--create-table]
+DSN mặc định lấy từ biến môi trường DATABASE_URL. Cần: pip install "psycopg[binary]"
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import time
+from pathlib import Path
+
+from extract_metadata import OUTPUT_FILE, iter_combos
+
+BASE_DIR = Path(__file__).resolve().parent
+TABLE = "car_valuation_metadata"
+COLUMNS = ['make', 'model', 'year', 'version', 'color']
+
+PGCOPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+
+CREATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    make text NOT NULL,
+    model text NOT NULL,
+    year integer NOT NULL,
+    version text NOT NULL,
+    color text NOT NULL,
+    "createdAt" timestamptz NOT NULL DEFAULT NOW(),
+    "updatedAt" timestamptz NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS {TABLE}_combo_idx ON {TABLE} (make, model, year, version, color);
+"""
+
+
+def load_metadata_rows(path: Path = OUTPUT_FILE) -> list:
+    with open(path, 'r', encoding='utf-8') as f:
+        return sorted(iter_combos(json.load(f)))
+
+
+# --- Export ---
+def write_copy_csv(rows, f) -> None:
+    """COPY ... FROM STDIN (FORMAT csv): không header, text được quote khi cần"""
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerows(rows)
+
+
+def write_copy_binary(rows, f) -> None:
+    """COPY ... FROM STDIN (FORMAT binary): header PGCOPY, mỗi dòng 5 field (text UTF-8, year int4), trailer -1"""
+    f.write(PGCOPY_SIGNATURE + struct.pack('!ii', 0, 0))
+    for make, model, year, version, color in rows:
+        f.write(struct.pack('!h', len(COLUMNS)))
+        for value in (make, model):
+            data = value.encode('utf-8')
+            f.write(struct.pack('!i', len(data)) + data)
+        f.write(struct.pack('!ii', 4, year))
+        for value in (version, color):
+            data = value.encode('utf-8')
+            f.write(struct.pack('!i', len(data)) + data)
+    f.write(struct.pack('!h', -1))
+
+
+def export_copy(rows, path: Path, fmt: str = 'binary') -> None:
+    if fmt == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            write_copy_csv(rows, f)
+    elif fmt == 'binary':
+        with open(path, 'wb') as f:
+            write_copy_binary(rows, f)
+    else:
+        raise ValueError(f"Định dạng COPY không hợp lệ: {fmt}")
+
+
+# --- Load ---
+def _connect(dsn: str):
+    try:
+        import psycopg
+    except ImportError:
+        raise ImportError("❌ Cần psycopg để nạp vào PostgreSQL: pip install \"psycopg[binary]\"")
+    return psycopg.connect(dsn)
+
+
+def _copy_into_staging(cur, path: Path, fmt: str) -> None:
+    cur.execute(f"CREATE TEMP TABLE {TABLE}_staging "
+                f"(make text, model text, year integer, version text, color text) ON COMMIT DROP")
+    with open(path, 'rb') as f, cur.copy(f"COPY {TABLE}_staging ({', '.join(COLUMNS)}) FROM STDIN "
+                                         f"(FORMAT {fmt})") as copy:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            copy.write(block)
+    cur.execute(f"ANALYZE {TABLE}_staging")
+
+
+def _merge(cur) -> dict:
+    """Đồng bộ bảng chính theo staging: chỉ xoá/thêm phần khác nhau"""
+    combo = ' AND '.join(f"t.{c} = s.{c}" for c in COLUMNS)
+    cur.execute(f"DELETE FROM {TABLE} t WHERE NOT EXISTS (SELECT 1 FROM {TABLE}_staging s WHERE {combo})")
+    removed = cur.rowcount
+    cur.execute(f"""
+        INSERT INTO {TABLE} (id, {', '.join(COLUMNS)}, "createdAt", "updatedAt")
+        SELECT gen_random_uuid(), {', '.join(f's.{c}' for c in COLUMNS)}, NOW(), NOW()
+        FROM (SELECT DISTINCT * FROM {TABLE}_staging) s
+        WHERE NOT EXISTS (SELECT 1 FROM {TABLE} t WHERE {combo})""")
+    return {'removed': removed, 'added': cur.rowcount}
+
+
+def _swap(cur) -> dict:
+    """Dựng bảng mới (cùng cấu trúc, index) từ staging rồi đổi tên; bảng cũ thành <bảng>_old"""
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}_new")
+    cur.execute(f"CREATE TABLE {TABLE}_new (LIKE {TABLE} INCLUDING ALL)")
+    cur.execute(f"""
+        INSERT INTO {TABLE}_new (id, {', '.join(COLUMNS)}, "createdAt", "updatedAt")
+        SELECT gen_random_uuid(), {', '.join(COLUMNS)}, NOW(), NOW()
+        FROM (SELECT DISTINCT * FROM {TABLE}_staging) s""")
+    added = cur.rowcount
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}_old")
+    cur.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_old")
+    cur.execute(f"ALTER TABLE {TABLE}_new RENAME TO {TABLE}")
+    return {'removed': None, 'added': added}
+
+
+def load_copy(dsn: str, path: Path, fmt: str = 'binary', mode: str = 'merge', create_table: bool = False,
+              work_mem: str = '64MB') -> dict:
+    """COPY file vào staging + merge/swap, tất cả trong 1 transaction (lỗi -> bảng chính không đổi)"""
+    with _connect(dsn) as conn, conn.cursor() as cur:
+        # Chỉ trong transaction này: anti-join staging x bảng chính sort/hash trong RAM thay vì ghi đĩa
+        cur.execute(f"SET LOCAL work_mem = '{work_mem}'")
+        if create_table:
+            cur.execute(CREATE_TABLE_SQL)
+        _copy_into_staging(cur, path, fmt)
+        result = _merge(cur) if mode == 'merge' else _swap(cur)
+        cur.execute(f"SELECT count(*) FROM {TABLE}")
+        result['total'] = cur.fetchone()[0]
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Xuất/nạp metadata xe bằng COPY của PostgreSQL")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export = sub.add_parser('export', help="metadata.json -> file COPY")
+    export.add_argument('--metadata', type=Path, default=OUTPUT_FILE)
+    export.add_argument('--format', choices=['binary', 'csv'], default='binary')
+    export.add_argument('--output', type=Path, default=BASE_DIR / "models" / "metadata.copy")
+
+    load = sub.add_parser('load', help="COPY vào staging rồi merge/swap vào bảng chính")
+    load.add_argument('--dsn', default=os.environ.get('DATABASE_URL'))
+    load.add_argument('--metadata', type=Path, default=OUTPUT_FILE)
+    load.add_argument('--input', type=Path, default=None,
+                      help="File COPY đã export (mặc định: export từ --metadata vào file tạm rồi nạp)")
+    load.add_argument('--format', choices=['binary', 'csv'], default='binary')
+    load.add_argument('--mode', choices=['merge', 'swap'], default='merge')
+    load.add_argument('--create-table', action='store_true', help="Tạo bảng nếu chưa có (DB local/test)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+
+    if args.command == 'export':
+        rows = load_metadata_rows(args.metadata)
+        export_copy(rows, args.output, args.format)
+        print(f"✅ Đã xuất {len(rows):,} tổ hợp ({args.format}) -> {args.output} "
+              f"({args.output.stat().st_size / 1024:,.0f} KB)")
+        return
+
+    if not args.dsn:
+        raise ValueError("❌ Thiếu --dsn (hoặc biến môi trường DATABASE_URL)")
+    path = args.input
+    if path is None:
+        path = BASE_DIR / "models" / f"metadata.copy.{args.format}.tmp"
+        export_copy(load_metadata_rows(args.metadata), path, args.format)
+    try:
+        result = load_copy(args.dsn, path, args.format, args.mode, args.create_table)
+    finally:
+        if args.input is None:
+            path.unlink(missing_ok=True)
+    changes = (f"+{result['added']:,} / -{result['removed']:,} dòng" if result['removed'] is not None
+               else f"bảng mới {result['added']:,} dòng")
+    print(f"✅ {TABLE} ({args.mode}): {changes}, tổng {result['total']:,} | {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Tìm hyperparameter cho retrain_model.py.
+- grid: thử hết grid như GridSearchCV trước đây (để so sánh).
+- halving: successive halving theo số dòng dữ liệu + giới hạn thời gian (wall-clock).
+  Vòng đầu thử nhiều bộ tham số trên ít dữ liệu, mỗi vòng giữ lại 1/factor bộ tốt nhất
+  và tăng dữ liệu lên factor lần. Hết thời gian -> dừng và lấy bộ tốt nhất ở vòng cao nhất đã chạy.
+Cả 2 chế độ nhận cache (search_cache.EvaluationCache): bộ tham số đã đánh giá trên cùng dữ liệu,
+cùng cách chia fold thì lấy lại điểm cũ thay vì fit lại.
+Mỗi fold được đo (wall/CPU/đỉnh RSS) ngay trong process chạy fold đó, dùng cho training_profiler.
+"""
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+from sklearn.utils import _safe_indexing
+
+from search_cache import pipeline_fingerprint
+from training_profiler import measure
+
+
+@dataclass
+class SearchResult:
+    best_estimator: object
+    best_params: dict
+    best_score: float                      # neg MAE trung bình trên các fold
+    evaluations: List[dict] = field(default_factory=list)
+    timed_out: bool = False
+    cache_hits: int = 0
+    refit_stats: Optional[dict] = None     # thời gian/bộ nhớ của lần refit trên toàn bộ X
+
+
+def _candidates(param_space: Dict, n_candidates: int, random_state: int) -> List[dict]:
+    """Grid nhỏ -> thử hết; grid lớn hoặc có phân phối liên tục -> lấy mẫu n_candidates bộ"""
+    is_grid = all(isinstance(v, (list, tuple)) for v in param_space.values())
+    if is_grid and len(ParameterGrid(param_space)) <= n_candidates:
+        return list(ParameterGrid(param_space))
+    return list(ParameterSampler(param_space, n_iter=n_candidates, random_state=random_state))
+
+
+def summarize_scores(params: dict, fold_scores, fit_times, cached: bool, folds: Optional[List[dict]] = None) -> dict:
+    """Kết quả đánh giá 1 bộ tham số (dùng chung cho cross-validation, cache và train_orchestrator)"""
+    fold_scores = [float(s) for s in fold_scores]
+    result = {
+        'params': params,
+        'fold_scores': fold_scores,
+        'fit_times': [float(t) for t in fit_times],
+        'mean_score': float(np.mean(fold_scores)) if not np.isnan(fold_scores).any() else -np.inf,
+        'cached': cached,
+    }
+    if folds is not None:
+        result['folds'] = folds
+    return result
+
+
+def fit_stats(stats: dict) -> dict:
+    """Số đo của measure() quanh 1 lần fit -> các trường ghi vào báo cáo profile"""
+    return {'fit_s': round(stats['wall_s'], 3), 'cpu_s': round(stats['cpu_s'], 3),
+            'peak_rss_mb': stats['peak_rss_mb'], 'peak_scope': stats['peak_scope']}
+
+
+def _fit_and_score(estimator, X, y, train, test, fold: int) -> dict:
+    """1 fold: fit + -MAE trên phần test, đo trong process đang chạy fold (fit lỗi -> điểm NaN)"""
+    estimator = clone(estimator)
+    with measure() as stats:
+        try:
+            estimator.fit(_safe_indexing(X, train), _safe_indexing(y, train))
+            failed = False
+        except Exception:
+            failed = True
+
+    start = time.perf_counter()
+    score = np.nan if failed else -mean_absolute_error(_safe_indexing(y, test),
+                                                       estimator.predict(_safe_indexing(X, test)))
+    return {'fold': fold, 'n_train': int(len(train)), 'score': float(score), **fit_stats(stats),
+            'score_s': round(time.perf_counter() - start, 3), 'pid': os.getpid()}
+
+
+def _refit(pipeline, params: dict, X, y):
+    estimator = clone(pipeline).set_params(**params)
+    with measure() as stats:
+        estimator.fit(X, y)
+    return estimator, {**fit_stats(stats), 'n_train': int(len(y))}
+
+
+def _refit_estimate(result: dict, n_samples: int, cv: int) -> float:
+    """
+    Ước lượng thời gian refit trên n_samples dòng từ fold fit chậm nhất, co giãn theo n·log n (cây quyết định;
+    với model tuyến tính/XGBoost là cận trên -> không vượt time_budget)
+    """
+    n_train = max(result['n_resources'] * (cv - 1) / cv, 2.0)
+    scale = (n_samples * math.log(max(n_samples, 2))) / (n_train * math.log(n_train))
+    return max(result['fit_times'], default=0.0) * max(scale, 1.0)
+
+
+def _final_choice(evaluations: List[dict]) -> dict:
+    """Bộ tốt nhất ở vòng cao nhất đã chạy"""
+    return max(evaluations, key=lambda r: (r['rung'], r['mean_score']))
+
+
+def evaluate_candidate(pipeline, params: dict, X, y, cv, n_jobs: int = -1,
+                       cache=None, model_name: str = '', fingerprint: Optional[str] = None) -> dict:
+    """
+    Cross-validate 1 bộ tham số, trả về điểm từng fold + thời gian fit.
+    Có cache -> tra (model, cấu hình pipeline, params, cv, số dòng) trước; chỉ fit khi chưa có.
+    """
+    if cache is not None:
+        fingerprint = fingerprint or pipeline_fingerprint(pipeline)
+        hit = cache.get(model_name, fingerprint, params, cv, len(y))
+        if hit is not None:
+            return summarize_scores(params, hit['fold_scores'], hit['fit_times'], cached=True)
+
+    estimator = clone(pipeline).set_params(**params)
+    folds = Parallel(n_jobs=n_jobs)(delayed(_fit_and_score)(estimator, X, y, train, test, fold)
+                                    for fold, (train, test) in enumerate(cv.split(X, y)))
+    result = summarize_scores(params, [f['score'] for f in folds], [f['fit_s'] for f in folds],
+                              cached=False, folds=folds)
+
+    # Fold lỗi (NaN) có thể do thiếu RAM tạm thời -> không cache, lần sau thử lại
+    if cache is not None and np.isfinite(result['mean_score']):
+        cache.put(model_name, fingerprint, params, cv, len(y), result['fold_scores'], result['fit_times'])
+    return result
+
+
+def grid_search(pipeline, param_grid: Dict, X, y, cv: int = 3, n_jobs: int = -1,
+                cache=None, model_name: str = '') -> SearchResult:
+    """
+    Cách cũ: thử hết grid với KFold(cv) không xáo trộn (giống GridSearchCV với regressor),
+    rồi refit bộ tốt nhất trên toàn bộ X.
+    """
+    splitter = KFold(n_splits=cv)
+    fingerprint = pipeline_fingerprint(pipeline) if cache is not None else None
+
+    evaluations = [evaluate_candidate(pipeline, params, X, y, splitter, n_jobs=n_jobs,
+                                      cache=cache, model_name=model_name, fingerprint=fingerprint)
+                   for params in ParameterGrid(param_grid)]
+    best = max(evaluations, key=lambda r: r['mean_score'])
+
+    best_estimator, refit_stats = _refit(pipeline, best['params'], X, y)
+    return SearchResult(best_estimator, best['params'], best['mean_score'], evaluations,
+                        cache_hits=sum(r['cached'] for r in evaluations), refit_stats=refit_stats)
+
+
+def successive_halving_search(pipeline, param_space: Dict, X, y, *, time_budget: Optional[float] = None,
+                              n_candidates: int = 27, factor: int = 3, cv: int = 3,
+                              min_resources: Optional[int] = None, random_state: int = 42,
+                              n_jobs: int = -1, verbose: bool = True,
+                              cache=None, model_name: str = '') -> SearchResult:
+    """
+    Successive halving trên số dòng dữ liệu, dừng sớm khi vượt time_budget (giây).
+    Model cuối cùng luôn được refit trên toàn bộ X; thời gian refit (ước lượng từ thời gian fit fold) tính vào
+    time_budget: dừng đánh giá sớm để còn giờ refit, và nếu bộ tốt nhất refit không kịp thì lấy bộ tốt nhất
+    trong các bộ refit kịp (không có bộ nào -> bộ refit nhanh nhất).
+    """
+    if time_budget is not None and time_budget <= 0:
+        raise ValueError(f"time_budget phải > 0 (nhận {time_budget})")
+    start = time.monotonic()
+    deadline = start + time_budget if time_budget is not None else None
+
+    candidates = _candidates(param_space, n_candidates, random_state) if param_space else [{}]
+    n_samples = len(y)
+    n_rungs = max(1, math.ceil(math.log(len(candidates), factor)) + 1) if len(candidates) > 1 else 1
+    if min_resources is None:
+        min_resources = max(cv * 50, n_samples // factor ** (n_rungs - 1))
+
+    # Thứ tự dòng cố định -> vòng sau dùng tập dữ liệu chứa tập của vòng trước
+    order = np.random.RandomState(random_state).permutation(n_samples)
+    splitter = KFold(n_splits=cv, shuffle=True, random_state=random_state)
+    fingerprint = pipeline_fingerprint(pipeline) if cache is not None else None
+
+    evaluations = []
+    best_in_rung = None
+    timed_out = False
+    survivors = candidates
+
+    for rung in range(n_rungs):
+        n_resources = n_samples if rung == n_rungs - 1 else min(n_samples, min_resources * factor ** rung)
+        subset = order[:n_resources]
+        X_rung = X.iloc[subset] if hasattr(X, 'iloc') else X[subset]
+        y_rung = y.iloc[subset] if hasattr(y, 'iloc') else y[subset]
+
+        rung_results = []
+        for params in survivors:
+            # Chừa thời gian refit bộ đang dẫn đầu trên toàn bộ X
+            reserve = _refit_estimate(_final_choice(evaluations), n_samples, cv) if evaluations else 0.0
+            if deadline is not None and time.monotonic() + reserve > deadline:
+                timed_out = True
+                break
+            result = evaluate_candidate(pipeline, params, X_rung, y_rung, splitter, n_jobs=n_jobs,
+                                        cache=cache, model_name=model_name, fingerprint=fingerprint)
+            result.update({'rung': rung, 'n_resources': int(n_resources)})
+            rung_results.append(result)
+            evaluations.append(result)
+
+        if rung_results:
+            rung_results.sort(key=lambda r: r['mean_score'], reverse=True)
+            best_in_rung = rung_results[0]
+            if verbose:
+                print(f"\n      vòng {rung}: {len(rung_results)} bộ x {n_resources} dòng, "
+                      f"MAE tốt nhất {-best_in_rung['mean_score']:,.1f}", end="", flush=True)
+
+        if timed_out or rung == n_rungs - 1:
+            break
+        survivors = [r['params'] for r in rung_results[:max(1, len(rung_results) // factor)]]
+
+    if evaluations:
+        chosen = _final_choice(evaluations)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            in_time = [r for r in evaluations if _refit_estimate(r, n_samples, cv) <= remaining]
+            if _refit_estimate(chosen, n_samples, cv) > remaining:
+                best = chosen
+                chosen = (_final_choice(in_time) if in_time else
+                          min(evaluations, key=lambda r: _refit_estimate(r, n_samples, cv)))
+                if verbose and chosen is not best:
+                    print(f"\n      refit bộ tốt nhất không kịp thời gian còn lại ({remaining:.0f}s) "
+                          f"-> dùng bộ của vòng {chosen['rung']}", end="", flush=True)
+    else:
+        # Hết giờ trước khi đánh giá được bộ nào -> dùng bộ đầu tiên
+        chosen = {'params': candidates[0], 'mean_score': -np.inf}
+
+    best_estimator, refit_stats = _refit(pipeline, chosen['params'], X, y)
+    if verbose:
+        print(f"(refit {refit_stats['fit_s']:.0f}s)", end=" ", flush=True)
+    return SearchResult(best_estimator, chosen['params'], chosen['mean_score'],
+                        evaluations, timed_out, cache_hits=sum(r['cached'] for r in evaluations),
+                        refit_stats=refit_stats)
@@ -0,0 +1,175 @@
+"""
+Train XGBoost out-of-core: đọc CSV theo chunk, encode từng chunk rồi đẩy qua xgb.DataIter vào
+DMatrix external memory (cache trên đĩa). RAM đỉnh chỉ phụ thuộc kích thước chunk, không phụ thuộc số dòng.
+
+Quy trình:
+1. Quét CSV 1 lượt (chỉ các cột categorical) để lấy danh sách category đầy đủ.
+2. Preprocessor với category cố định: numeric giữ nguyên (XGBoost tự xử lý NaN, không cần scale)
+   + one-hot sparse -> mọi chunk ra cùng số cột.
+3. DataIter đọc lại CSV từng chunk, XGBoost ghi các page đã lượng tử hoá ra cache_dir.
+4. Test split chọn ngẫu nhiên theo từng chunk (seed cố định), MAE tính dần từng chunk.
+
+Kết quả vẫn là sklearn Pipeline (preprocessor + XGBRegressor) nên service load như model thường.
+"""
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from retrain_model import CAT_FEATURES, NUM_FEATURES, TARGET_COL, clean_training_frame
+
+DEFAULT_CHUNK_ROWS = 200_000
+DEFAULT_PARAMS = {
+    'objective': 'reg:squarederror',
+    'tree_method': 'hist',
+    'learning_rate': 0.1,
+    'max_depth': 8,
+    'min_child_weight': 1,
+    'subsample': 0.8,
+    'max_bin': 256,
+    'eval_metric': 'mae',
+    'seed': 42,
+}
+
+
+def scan_categories(csv_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[Dict[str, List[str]], int]:
+    """Lượt quét đầu: tập category của từng cột + tổng số dòng (chỉ đọc cột categorical)"""
+    seen = {col: set() for col in CAT_FEATURES}
+    n_rows = 0
+    for chunk in pd.read_csv(csv_path, usecols=CAT_FEATURES, dtype=str, chunksize=chunk_rows):
+        n_rows += len(chunk)
+        for col in CAT_FEATURES:
+            seen[col].update(chunk[col].dropna().unique())
+    return {col: sorted(values) for col, values in seen.items()}, n_rows
+
+
+def build_chunk_preprocessor(categories: Dict[str, List[str]]) -> ColumnTransformer:
+    """
+    Preprocessor có category cố định -> fit trên 1 dòng là đủ, mọi chunk encode ra cùng số cột.
+    Giá trị thiếu/chưa gặp -> toàn 0 ở phần one-hot (handle_unknown='ignore').
+    """
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', 'passthrough', NUM_FEATURES),
+            ('cat', OneHotEncoder(categories=[categories[col] for col in CAT_FEATURES],
+                                  handle_unknown='ignore', sparse_output=True), CAT_FEATURES),
+        ],
+        sparse_threshold=1.0)
+    sample = pd.DataFrame({**{col: [categories[col][0] if categories[col] else 'Unknown'] for col in CAT_FEATURES},
+                           **{col: [0.0] for col in NUM_FEATURES}})
+    return preprocessor.fit(sample)
+
+
+def _is_test(chunk_id: int, n_rows: int, test_fraction: float, seed: int) -> np.ndarray:
+    """Mask test cố định theo (seed, chunk) -> lượt train và lượt đánh giá chọn cùng các dòng"""
+    return np.random.default_rng([seed, chunk_id]).random(n_rows) < test_fraction
+
+
+def iter_encoded_chunks(csv_path: Path, preprocessor: ColumnTransformer, *, subset: str = 'train',
+                        test_fraction: float = 0.2, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        seed: int = 42) -> Iterator[Tuple[object, np.ndarray]]:
+    """Đọc CSV từng chunk, làm sạch, chọn dòng train/test rồi encode -> (CSR, y)"""
+    reader = pd.read_csv(csv_path, usecols=CAT_FEATURES + NUM_FEATURES + [TARGET_COL],
+                         dtype={col: str for col in CAT_FEATURES}, chunksize=chunk_rows)
+    for chunk_id, chunk in enumerate(reader):
+        test_mask = _is_test(chunk_id, len(chunk), test_fraction, seed)
+        chunk = chunk[test_mask if subset == 'test' else ~test_mask]
+        X, y = clean_training_frame(chunk)
+        if len(X):
+            yield preprocessor.transform(X), y.to_numpy(dtype=np.float32)
+
+
+class CsvChunkIter(xgb.DataIter):
+    """DataIter của XGBoost: mỗi lần next() đưa 1 chunk đã encode vào DMatrix external memory"""
+
+    def __init__(self, csv_path: Path, preprocessor: ColumnTransformer, cache_prefix: str, **chunk_kwargs):
+        self._csv_path = csv_path
+        self._preprocessor = preprocessor
+        self._chunk_kwargs = chunk_kwargs
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._chunks is None:
+            self._chunks = iter_encoded_chunks(self._csv_path, self._preprocessor, **self._chunk_kwargs)
+        batch = next(self._chunks, None)
+        if batch is None:
+            return False
+        X, y = batch
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self) -> None:
+        self._chunks = None
+
+
+def make_external_dmatrix(data_iter: xgb.DataIter, max_bin: int):
+    # XGBoost >= 3.0: ExtMemQuantileDMatrix lượng tử hoá sẵn cho 'hist'; bản cũ dùng DMatrix(iter)
+    if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+        return xgb.ExtMemQuantileDMatrix(data_iter, max_bin=max_bin)
+    return xgb.DMatrix(data_iter)
+
+
+def streaming_mae(booster: xgb.Booster, chunks) -> Tuple[float, float, int]:
+    """MAE + R2 tính dần theo chunk (không giữ toàn bộ tập test trong RAM)"""
+    abs_err = sq_err = sum_y = sum_y2 = 0.0
+    n = 0
+    for X, y in chunks:
+        pred = booster.inplace_predict(X)
+        abs_err += float(np.abs(pred - y).sum())
+        sq_err += float(((pred - y) ** 2).sum())
+        sum_y += float(y.sum())
+        sum_y2 += float((y.astype(np.float64) ** 2).sum())
+        n += len(y)
+    if n == 0:
+        return float('nan'), float('nan'), 0
+    total_var = sum_y2 - sum_y ** 2 / n
+    return abs_err / n, 1 - sq_err / total_var if total_var > 0 else float('nan'), n
+
+
+def train_out_of_core(csv_path: Path, *, params: Optional[dict] = None, num_boost_round: int = 500,
+                      chunk_rows: int = DEFAULT_CHUNK_ROWS, test_fraction: float = 0.2,
+                      cache_dir: Optional[Path] = None, seed: int = 42, verbose: bool = True):
+    """Train XGBoost trên CSV bất kỳ kích thước. Trả về (Pipeline, metrics dict)."""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    timings = {}
+
+    start = time.perf_counter()
+    categories, n_rows = scan_categories(csv_path, chunk_rows)
+    preprocessor = build_chunk_preprocessor(categories)
+    timings['scan_s'] = time.perf_counter() - start
+    if verbose:
+        n_cat = sum(len(v) for v in categories.values())
+        print(f"   🔎 Quét {n_rows:,} dòng, {n_cat:,} category ({timings['scan_s']:.1f}s)")
+
+    chunk_kwargs = dict(test_fraction=test_fraction, chunk_rows=chunk_rows, seed=seed)
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        start = time.perf_counter()
+        train_iter = CsvChunkIter(csv_path, preprocessor, str(Path(tmp) / 'train'), subset='train', **chunk_kwargs)
+        dtrain = make_external_dmatrix(train_iter, params['max_bin'])
+        timings['dmatrix_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+        timings['train_s'] = time.perf_counter() - start
+        del dtrain
+
+    start = time.perf_counter()
+    mae, r2, n_test = streaming_mae(booster, iter_encoded_chunks(csv_path, preprocessor, subset='test', **chunk_kwargs))
+    timings['eval_s'] = time.perf_counter() - start
+    if verbose:
+        print(f"   🌲 DMatrix {timings['dmatrix_s']:.1f}s, train {timings['train_s']:.1f}s, "
+              f"MAE {mae:,.2f} trên {n_test:,} dòng test")
+
+    regressor = xgb.XGBRegressor()
+    regressor.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+    pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('regressor', regressor)])
+    metrics = {'Test MAE': mae, 'R2 Score': r2, 'n_rows': n_rows, 'n_test': n_test, **timings}
+    return pipeline, metrics
@@ -4,15 +4,35 @@ Script tối ưu hóa quy trình huấn luyện model định giá xe (V3 - Wind
 - Thêm bảo vệ __main__ cho Windows.
 - Tự động phát hiện và cảnh báo XGBoost.
 - FIX: Bỏ early_stopping_rounds trong GridSearch để tránh lỗi thiếu validation set.
+- One-hot dạng sparse (CSR) xuyên suốt pipeline để giảm RAM và thời gian fit.
+- Thêm ứng viên XGBoost categorical native (hist + enable_categorical), không cần one-hot.
+- Successive halving + early stopping thật (tách validation bên trong) với giới hạn thời gian.
+  Dùng --search grid để chạy lại GridSearchCV vét cạn như cũ.
+- --out-of-core: train XGBoost theo chunk với DMatrix external memory (out_of_core.py) cho dữ liệu
+  lớn hơn RAM, bỏ qua bước so sánh/tìm tham số.
+- --search pool: grid của mọi model chạy chung 1 pool process với giới hạn --cores (train_orchestrator.py).
+- --version-encoding target|frequency: cột version thành 1 cột số (bảng tra cứu nhỏ) thay vì one-hot.
+- --lake [--sources/--makes/--since/--until]: đọc bảng 'cleaned' của lake Parquet (listings_lake.py), chỉ mở
+  các phân vùng source/make/ngày scrape khớp bộ lọc. Không có data/toyota_cleaned.csv mà lake có dữ liệu
+  -> tự đọc lake thay vì lấy file CSV mới nhất theo mtime.
+- Cache kết quả cross-validation giữa các lần chạy (models/search_cache.sqlite): dữ liệu không đổi
+  -> bộ tham số đã thử không phải fit lại. Tắt bằng --no-cache.
+- Báo cáo thời gian/CPU/đỉnh RSS theo stage và theo từng (model, tham số, fold) ở
+  models/training_profile.json (training_profiler.py); --profile-slowest ghi thêm cProfile của lần fit chậm nhất.
 """
 
+import argparse
+import json
+import os
+import time
 import joblib
 import pandas as pd
 import numpy as np
 import sys
 from pathlib import Path
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import OneHotEncoder, StandardScaler, TargetEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
@@ -20,6 +40,17 @@ from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, r2_score
 import warnings
+from scipy.stats import loguniform, randint, uniform
+
+from model_search import grid_search, successive_halving_search
+from dataset_cache import load_dataset, normalize_dataset
+from listings_lake import (add_filter_args, describe_filters, filters_from_args, lake_exists, lake_fingerprint,
+                           read_listings)
+from search_cache import EvaluationCache, file_content_hash
+from train_orchestrator import ModelSpec, orchestrated_grid_search, print_task_summary
+from training_profiler import TrainingProfiler
+from service.encoders import CategoryCodeEncoder, FrequencyEncoder
+from service.estimators import EarlyStoppingXGBRegressor
 
 # Tắt warning
 warnings.filterwarnings('ignore')
@@ -27,7 +58,131 @@ warnings.filterwarnings('ignore')
 # Cấu hình hiển thị số thực đẹp hơn
 pd.options.display.float_format = '{:,.2f}'.format
 
-def main():
+CAT_FEATURES = ['make', 'model', 'version', 'color']
+NUM_FEATURES = ['year', 'mileage']
+TARGET_COL = 'price_vnd'
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+
+def build_preprocessor(cat_features=CAT_FEATURES, num_features=NUM_FEATURES, sparse=True,
+                       version_encoding='onehot'):
+    """
+    Tiền xử lý: numeric (impute median + scale) + categorical (impute 'Unknown' + one-hot).
+    sparse=True: one-hot trả về CSR và ColumnTransformer luôn ghép thành CSR (sparse_threshold=1.0),
+    nên ma trận version x color x model không bao giờ bị dense hoá. Ridge/Linear/RandomForest/XGBoost
+    đều nhận CSR trực tiếp. sparse=False giữ cách cũ (dense float64) để so sánh.
+
+    version_encoding: cách mã hoá riêng cột version (hàng trăm biến thể):
+    - 'onehot': như các cột categorical khác (mặc định).
+    - 'target': TargetEncoder của sklearn - giá trung bình theo version, lúc fit tính out-of-fold
+      (cross fitting) để không rò rỉ target; lúc serving dùng bảng tra cứu encodings_ đã lưu.
+    - 'frequency': tỉ lệ xuất hiện của version (service.encoders.FrequencyEncoder).
+    Hai cách sau chỉ tạo 1 cột số thay vì 1 cột cho mỗi version.
+    """
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler())
+    ])
+
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='constant', fill_value='Unknown')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=sparse))
+    ])
+
+    transformers = [('num', numeric_transformer, num_features)]
+    if version_encoding == 'onehot' or 'version' not in cat_features:
+        transformers.append(('cat', categorical_transformer, cat_features))
+    else:
+        if version_encoding == 'target':
+            version_encoder = TargetEncoder(target_type='continuous', cv=5, shuffle=True, random_state=42)
+        elif version_encoding == 'frequency':
+            version_encoder = FrequencyEncoder()
+        else:
+            raise ValueError(f"version_encoding không hợp lệ: {version_encoding}")
+        transformers.append(('cat', categorical_transformer, [c for c in cat_features if c != 'version']))
+        # Thiếu version -> 'Unknown' như nhánh one-hot: serving gửi "Unknown" khi không có version,
+        # nên lúc train cũng phải là đúng category đó (không để NaN thành 1 category khác); scaler cho Linear/Ridge
+        transformers.append(('version', Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='constant', fill_value='Unknown')),
+            ('encoder', version_encoder),
+            ('scaler', StandardScaler())
+        ]), ['version']))
+
+    return ColumnTransformer(transformers=transformers, sparse_threshold=1.0 if sparse else 0.0)
+
+
+def load_training_data(data_path):
+    """Đọc dữ liệu đã clean (qua Parquet cache của dataset_cache), bỏ dòng thiếu giá/mileage -> (X, y)"""
+    return clean_training_frame(load_dataset(data_path))
+
+
+def clean_training_frame(df):
+    """Chuẩn hoá mileage về số và bỏ dòng thiếu giá/mileage -> (X, y). Dùng được cho từng chunk."""
+    # Clean mileage
+    if not pd.api.types.is_numeric_dtype(df['mileage']):
+        df['mileage'] = df['mileage'].astype(str).str.replace(r'\D', '', regex=True)
+        df['mileage'] = pd.to_numeric(df['mileage'], errors='coerce')
+
+    df = df.dropna(subset=[TARGET_COL, 'mileage'])
+    return df[CAT_FEATURES + NUM_FEATURES], df[TARGET_COL]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Huấn luyện model định giá xe")
+    parser.add_argument('--search', choices=['halving', 'grid', 'pool'], default='halving',
+                        help="halving: successive halving + early stopping (mặc định); grid: GridSearchCV vét cạn như cũ; "
+                             "pool: grid của mọi model trên 1 pool process chung")
+    parser.add_argument('--cores', type=int, default=os.cpu_count(),
+                        help="Số core tối đa cho --search pool (mỗi task dùng 1 core)")
+    parser.add_argument('--time-budget', type=float, default=1800,
+                        help="Giới hạn thời gian tìm tham số cho toàn bộ model (giây, chỉ áp dụng cho halving)")
+    parser.add_argument('--n-candidates', type=int, default=27,
+                        help="Số bộ tham số thử ở vòng đầu của successive halving")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Không dùng cache kết quả đánh giá (luôn fit lại mọi bộ tham số)")
+    parser.add_argument('--cache-path', type=Path, default=None,
+                        help="File SQLite lưu cache (mặc định models/search_cache.sqlite)")
+    parser.add_argument('--version-encoding', choices=['onehot', 'target', 'frequency'], default='onehot',
+                        help="Mã hoá cột version: one-hot (mặc định), target encoding out-of-fold hoặc tần suất")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="Chỉ train XGBoost, đọc CSV theo chunk vào DMatrix external memory (dữ liệu lớn hơn RAM)")
+    parser.add_argument('--chunk-rows', type=int, default=200_000, help="Số dòng mỗi chunk khi --out-of-core")
+    parser.add_argument('--num-boost-round', type=int, default=500, help="Số cây khi --out-of-core")
+    parser.add_argument('--lake', action='store_true',
+                        help="Đọc dữ liệu từ lake Parquet (data/lake/cleaned) thay vì CSV, lọc theo các tham số dưới")
+    add_filter_args(parser)
+    parser.add_argument('--profile-slowest', action='store_true',
+                        help="Chạy lại lần fit chậm nhất dưới cProfile -> models/slowest_fit.prof "
+                             "(xem bằng snakeviz hoặc flameprof)")
+    return parser.parse_args(argv)
+
+
+def run_out_of_core(args, data_path, models_dir, profiler):
+    """Nhánh --out-of-core: không load cả file vào pandas, lưu Pipeline + metrics như luồng thường"""
+    from out_of_core import train_out_of_core
+
+    print(f"\n🔄 ĐANG HUẤN LUYỆN XGBOOST OUT-OF-CORE (chunk {args.chunk_rows:,} dòng)...")
+    with profiler.stage('train_out_of_core', chunk_rows=args.chunk_rows):
+        pipeline, metrics = train_out_of_core(data_path, num_boost_round=args.num_boost_round,
+                                              chunk_rows=args.chunk_rows, test_fraction=TEST_SIZE,
+                                              cache_dir=models_dir, seed=SPLIT_SEED)
+    print(f"✅ MAE: {metrics['Test MAE']:,.0f} | R2: {metrics['R2 Score']:.4f}")
+
+    save_path = models_dir / "best_car_price_pipeline.pkl"
+    with profiler.stage('save_model'):
+        joblib.dump(pipeline, save_path)
+    print(f"💾 Đã lưu Pipeline tại: {save_path}")
+
+    pd.Series({'Model': 'XGBoost (Out-of-core)', 'Test MAE': metrics['Test MAE'],
+               'R2 Score': metrics['R2 Score']}).to_json(models_dir / "model_metrics.json")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_start = time.perf_counter()
+    profiler = TrainingProfiler()
+
     print("🚀 BẮT ĐẦU QUÁ TRÌNH HUẤN LUYỆN (V3 - WINDOWS SAFE - XGB FIX)")
     print("="*70)
 
@@ -50,60 +205,84 @@ def main():
 
     # Load dữ liệu
     data_path = DATA_DIR / "toyota_cleaned.csv"
-    if not data_path.exists():
-        csv_files = list(DATA_DIR.glob("*.csv"))
-        if not csv_files:
-            raise FileNotFoundError("❌ Không tìm thấy file dữ liệu .csv nào!")
-        data_path = max(csv_files, key=lambda p: p.stat().st_mtime)
-
-    print(f"📁 Đang đọc dữ liệu từ: {data_path.name}")
-    df = pd.read_csv(data_path)
-
-    # --- 2. SƠ CHẾ DỮ LIỆU ---
-    cat_features = ['make', 'model', 'version', 'color'] 
-    num_features = ['year', 'mileage']                   
-    target_col = 'price_vnd'
+    use_lake = args.lake
+    lake_filters = filters_from_args(args)
+    if not use_lake and not data_path.exists():
+        if lake_exists('cleaned'):
+            use_lake = True
+        else:
+            csv_files = list(DATA_DIR.glob("*.csv"))
+            if not csv_files:
+                raise FileNotFoundError("❌ Không tìm thấy file dữ liệu .csv nào!")
+            data_path = max(csv_files, key=lambda p: p.stat().st_mtime)
 
-    # Clean mileage
-    if df['mileage'].dtype == 'object':
-        df['mileage'] = df['mileage'].astype(str).str.replace(r'\D', '', regex=True)
-        df['mileage'] = pd.to_numeric(df['mileage'], errors='coerce')
+    if use_lake:
+        print(f"📁 Đang đọc dữ liệu từ lake (cleaned, {describe_filters(**lake_filters)})")
+    else:
+        print(f"📁 Đang đọc dữ liệu từ: {data_path.name}")
+    if args.out_of_core:
+        if use_lake:
+            raise ValueError("❌ --out-of-core đọc CSV theo chunk, chưa hỗ trợ đọc từ lake")
+        if not XGBOOST_AVAILABLE:
+            raise ImportError("❌ --out-of-core cần XGBoost")
+        run_out_of_core(args, data_path, MODELS_DIR, profiler)
+        profiler.write(MODELS_DIR / "training_profile.json")
+        print(f"\n⏱️  Tổng thời gian retrain: {time.perf_counter() - run_start:,.0f}s")
+        print("\n✅ HOÀN TẤT!")
+        return
 
-    df = df.dropna(subset=[target_col, 'mileage'])
+    # Tách load/clean (thay vì load_training_data) để đo riêng từng bước.
+    # Regex mileage chạy lúc tạo Parquet cache nên nằm trong 'load' ở lần đầu, các lần sau gần như 0.
+    with profiler.stage('load') as info:
+        if use_lake:
+            df = normalize_dataset(read_listings('cleaned', columns=CAT_FEATURES + NUM_FEATURES + [TARGET_COL],
+                                                 **lake_filters))
+        else:
+            df = load_dataset(data_path)
+        info['rows'] = len(df)
+    with profiler.stage('clean') as info:
+        X, y = clean_training_frame(df)
+        info['rows'] = len(X)
+    del df
 
-    X = df[cat_features + num_features]
-    y = df[target_col]
+    # --- 2. SƠ CHẾ DỮ LIỆU ---
+    cat_features = CAT_FEATURES
+    num_features = NUM_FEATURES
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    with profiler.stage('split'):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
     print(f"✅ Dữ liệu sẵn sàng: Train ({len(X_train)}) - Test ({len(X_test)})")
 
-    # --- 3. PIPELINE ---
-    numeric_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='median')),
-        ('scaler', StandardScaler())
-    ])
-
-    categorical_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='constant', fill_value='Unknown')),
-        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False)) 
-    ])
+    # Cache theo nội dung file + cách chia train/test -> file đổi dù 1 dòng là cache miss toàn bộ
+    cache = None
+    if not args.no_cache:
+        source_hash = lake_fingerprint('cleaned', **lake_filters) if use_lake else file_content_hash(data_path)
+        dataset_hash = f"{source_hash}:test_size={TEST_SIZE}:seed={SPLIT_SEED}"
+        cache = EvaluationCache(args.cache_path or MODELS_DIR / "search_cache.sqlite", dataset_hash)
+        print(f"🗃️  Cache đánh giá: {cache.path.name}")
 
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', numeric_transformer, num_features),
-            ('cat', categorical_transformer, cat_features)
-        ])
+    # --- 3. PIPELINE ---
+    # One-hot sparse (CSR) -> mỗi worker của GridSearchCV chỉ giữ ma trận thưa thay vì bản dense float64
+    preprocessor = build_preprocessor(cat_features, num_features, sparse=True,
+                                      version_encoding=args.version_encoding)
+    # Đo riêng 1 lần fit_transform trên tập train: cho biết phần tiền xử lý trong mỗi lần fit tốn bao nhiêu
+    with profiler.stage('preprocess', version_encoding=args.version_encoding) as info:
+        info['n_features'] = int(clone(preprocessor).fit_transform(X_train, y_train).shape[1])
 
     # --- 4. CẤU HÌNH MODEL ---
     # LƯU Ý QUAN TRỌNG: Để model n_jobs=1 hoặc None để GridSearchCV (n_jobs=-1) quản lý luồng.
+    # 'params': grid (dùng cho grid/pool); 'distributions': không gian lấy mẫu riêng cho halving.
+    # 'cost': độ nặng tương đối của 1 task, --search pool xếp task nặng chạy trước.
     models_config = {
         'Linear Regression': {
             'model': LinearRegression(),
-            'params': {}
+            'params': {},
+            'cost': 1
         },
         'Ridge Regression': {
             'model': Ridge(),
-            'params': {'regressor__alpha': [0.1, 1.0, 10.0]}
+            'params': {'regressor__alpha': [0.1, 1.0, 10.0]},
+            'cost': 1
         },
         'Random Forest': {
             'model': RandomForestRegressor(random_state=42, n_jobs=1), 
@@ -111,54 +290,116 @@ def main():
                 'regressor__n_estimators': [200, 300, 500],
                 'regressor__max_depth': [30, 50, None],
                 'regressor__min_samples_split': [2, 5]
-            }
+            },
+            'cost': 10
         }
     }
 
     if XGBOOST_AVAILABLE:
+        # Early stopping trên 10% validation tách bên trong -> số cây do dữ liệu quyết định,
+        # n_estimators chỉ còn là giới hạn trên nên không cần đưa vào grid.
+        xgb_distributions = {
+            'regressor__learning_rate': loguniform(0.01, 0.3),
+            'regressor__max_depth': randint(4, 11),
+            'regressor__min_child_weight': loguniform(1, 20),
+            'regressor__subsample': uniform(0.6, 0.4),
+            'regressor__colsample_bytree': uniform(0.5, 0.5),
+        }
+
         models_config['XGBoost'] = {
-            'model': xgb.XGBRegressor(random_state=42, n_jobs=1),
+            'model': EarlyStoppingXGBRegressor(n_estimators=2000, early_stopping_rounds=50,
+                                               random_state=42, n_jobs=1),
             'params': {
-                # Đã bỏ early_stopping_rounds để tránh lỗi với Pipeline
-                'regressor__n_estimators': [200, 500, 1000], 
                 'regressor__learning_rate': [0.01, 0.05, 0.1],
                 'regressor__max_depth': [5, 7, 10]
-            }
+            },
+            'distributions': xgb_distributions,
+            'cost': 5
+        }
+
+        # XGBoost split trực tiếp trên category (version/model có hàng trăm giá trị) thay vì one-hot.
+        # CategoryCodeEncoder lưu danh sách category lúc train -> mã category ổn định khi serving.
+        models_config['XGBoost (Native Categorical)'] = {
+            'preprocessor': CategoryCodeEncoder(cat_features, num_features),
+            'model': EarlyStoppingXGBRegressor(n_estimators=2000, early_stopping_rounds=50,
+                                               enable_categorical=True, max_cat_to_onehot=1,
+                                               random_state=42, n_jobs=1),
+            'params': {
+                'regressor__learning_rate': [0.05, 0.1],
+                'regressor__max_depth': [6, 8]
+            },
+            'distributions': xgb_distributions,
+            'cost': 5
         }
 
     # --- 5. HUẤN LUYỆN ---
-    print("\n🔄 ĐANG HUẤN LUYỆN VÀ TỐI ƯU HÓA (GRID SEARCH)...")
+    search_label = {'grid': "GRID SEARCH", 'pool': f"GRID SEARCH, POOL {args.cores} CORE",
+                    'halving': f"SUCCESSIVE HALVING, {args.time_budget:.0f}s"}[args.search]
+    print(f"\n🔄 ĐANG HUẤN LUYỆN VÀ TỐI ƯU HÓA ({search_label})...")
     results = []
     best_overall_model = None
     best_overall_score = float('inf')
     best_overall_name = ""
+    search_deadline = time.monotonic() + args.time_budget
+
+    pipelines = {name: Pipeline(steps=[('preprocessor', config.get('preprocessor', preprocessor)),
+                                       ('regressor', config['model'])])
+                 for name, config in models_config.items()}
 
-    for name, config in models_config.items():
+    pool_searches = None
+    if args.search == 'pool':
+        # Mọi (model, params, fold) vào chung 1 pool -> model nhỏ không để core trống, model lớn không tranh core
+        specs = {name: ModelSpec(pipelines[name], config['params'], config.get('cost', 1))
+                 for name, config in models_config.items()}
+        with profiler.stage('search:pool', cores=args.cores):
+            pool_searches, pool_report = orchestrated_grid_search(specs, X_train, y_train, cores=args.cores,
+                                                                  cv=3, cache=cache)
+        print_task_summary(pool_report)
+        with open(MODELS_DIR / "training_tasks.json", 'w', encoding='utf-8') as f:
+            json.dump(pool_report, f, ensure_ascii=False, indent=2, default=str)
+
+    for i, (name, config) in enumerate(models_config.items()):
         print(f"   🔹 {name}...", end=" ", flush=True)
         
-        full_pipeline = Pipeline(steps=[('preprocessor', preprocessor),
-                                        ('regressor', config['model'])])
-        
-        # GridSearchCV sẽ dùng toàn bộ CPU (n_jobs=-1) để chạy song song các fold
-        search = GridSearchCV(full_pipeline, config['params'], cv=3, 
-                              scoring='neg_mean_absolute_error', n_jobs=-1)
+        full_pipeline = pipelines[name]
         
         try:
-            search.fit(X_train, y_train)
-            
-            best_estimator = search.best_estimator_
+            if pool_searches is not None:
+                search = pool_searches[name]
+                if isinstance(search, Exception):
+                    raise search
+            elif args.search == 'grid':
+                # GridSearchCV sẽ dùng toàn bộ CPU (n_jobs=-1) để chạy song song các fold
+                with profiler.stage(f'search:{name}'):
+                    search = grid_search(full_pipeline, config['params'], X_train, y_train, cv=3, n_jobs=-1,
+                                         cache=cache, model_name=name)
+            else:
+                # Chia đều thời gian còn lại cho các model chưa chạy (gồm cả refit); hết giờ -> bỏ qua model
+                model_budget = (search_deadline - time.monotonic()) / (len(models_config) - i)
+                if model_budget <= 0:
+                    print("⏭️  Bỏ qua (hết --time-budget)")
+                    continue
+                with profiler.stage(f'search:{name}'):
+                    search = successive_halving_search(
+                        full_pipeline, config.get('distributions', config['params']), X_train, y_train,
+                        time_budget=model_budget, n_candidates=args.n_candidates, cv=3, n_jobs=-1,
+                        cache=cache, model_name=name)
+            profiler.record_search(name, search)
+
+            best_estimator = search.best_estimator
             y_pred = best_estimator.predict(X_test)
             
             mae = mean_absolute_error(y_test, y_pred)
             r2 = r2_score(y_test, y_pred)
             
-            print(f"✅ MAE: {mae:,.0f} | R2: {r2:.4f}")
+            cached_note = f" | cache {search.cache_hits}/{len(search.evaluations)}" if cache is not None else ""
+            print(f"✅ MAE: {mae:,.0f} | R2: {r2:.4f}{cached_note}")
             
             results.append({
                 'Model': name,
                 'Test MAE': mae,
                 'R2 Score': r2,
-                'Best Params': str(search.best_params_)
+                'Best Params': str(search.best_params)
             })
             
             if mae < best_overall_score:
@@ -190,7 +431,7 @@ def main():
                 
                 feat_imp = pd.DataFrame({'Feature': feature_names, 'Importance': importances})
                 feat_imp = feat_imp.sort_values(by='Importance', ascending=False).head(10)
-                feat_imp['Feature'] = feat_imp['Feature'].str.replace('cat__', '').str.replace('num__', '')
+                feat_imp['Feature'] = feat_imp['Feature'].str.replace('cat__', '').str.replace('num__', '').str.replace('version__', '')
                 print(feat_imp.to_string(index=False))
             except Exception as e:
                 pass
@@ -199,13 +440,27 @@ def main():
 
         # Lưu Model
         save_path = MODELS_DIR / "best_car_price_pipeline.pkl"
-        joblib.dump(best_overall_model, save_path)
+        with profiler.stage('save_model') as info:
+            joblib.dump(best_overall_model, save_path)
+            info['size_mb'] = round(save_path.stat().st_size / 1e6, 2)
         print(f"💾 Đã lưu Pipeline tại: {save_path}")
 
         # Lưu metrics
         metrics_path = MODELS_DIR / "model_metrics.json"
         results_df.iloc[0][['Model', 'Test MAE', 'R2 Score']].to_json(metrics_path)
 
+        if cache is not None:
+            print(f"🗃️  Cache: {cache.hits} hit / {cache.misses} miss")
+
+        slowest = profiler.slowest_fit()
+        if args.profile_slowest and slowest is not None:
+            prof_path = MODELS_DIR / "slowest_fit.prof"
+            print(f"🔬 cProfile lần fit chậm nhất ({slowest['model']}, {slowest['fit_s']:.1f}s) -> {prof_path.name}")
+            profiler.profile_fit(pipelines[slowest['model']], slowest, X_train, y_train, prof_path)
+
+        profiler.print_summary()
+        profiler.write(MODELS_DIR / "training_profile.json")
+        print(f"\n⏱️  Tổng thời gian retrain: {time.perf_counter() - run_start:,.0f}s")
         print("\n✅ HOÀN TẤT!")
     else:
         print("\n❌ Không có model nào train thành công!")
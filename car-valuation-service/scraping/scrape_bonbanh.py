@@ -1,4 +1,5 @@
 import os
+import sys
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
@@ -7,6 +8,18 @@ import time
 import random
 import csv
 from datetime import datetime
+from pathlib import Path
+
+# Bảng alias hãng/dòng xe dùng chung với valuation service (slug URL "mercedes-benz" -> "Mercedes-Benz")
+# và lake Parquet (listings_lake.py): mỗi model scrape xong được ghi thêm vào data/lake/scraped
+SERVICE_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVICE_ROOT) not in sys.path:
+    sys.path.append(str(SERVICE_ROOT))
+
+from listings_lake import save_scraped
+from service.aliases import load_alias_table
+
+ALIASES = load_alias_table()
 
 # ----------------- CẤU HÌNH ----------------- 
 BRANDS = ["toyota", "vinfast", "honda", "hyundai", "kia", "mazda", "suzuki", "bmw", "ford", "mercedes-benz"]
@@ -345,6 +358,7 @@ def scrape_listings(make, model, max_pages, csv_writer, scraped_urls):
     }
     
     count = 0
+    lake_rows = []
     for page in range(1, max_pages + 1):
         url_page = f"{base_url}?page={page}" if page > 1 else base_url
         print(f"    📄 Page {page}...")
@@ -389,11 +403,12 @@ def scrape_listings(make, model, max_pages, csv_writer, scraped_urls):
                 if not details:
                     continue
                 
-                # Ghi vào CSV
-                csv_writer.writerow({
+                # Ghi vào CSV (make/model chuẩn hoá theo bảng alias)
+                make_name = ALIASES.brand(make)
+                row = {
                     "ad_id": ad_id,
-                    "make": make,
-                    "model": model,
+                    "make": make_name,
+                    "model": ALIASES.model(make_name, model),
                     "title": details["title"],
                     "price_vnd": details["price"],
                     "mileage": details["mileage"],
@@ -410,7 +425,9 @@ def scrape_listings(make, model, max_pages, csv_writer, scraped_urls):
                     "single_owner": details["single_owner"],
                     "description": details["description"],
                     "url": details["url"]
-                })
+                }
+                csv_writer.writerow(row)
+                lake_rows.append(row)
                 
                 count += 1
                 title_short = (details['title'][:50] + '...') if details['title'] and len(details['title']) > 50 else details['title']
@@ -423,6 +440,8 @@ def scrape_listings(make, model, max_pages, csv_writer, scraped_urls):
             print(f"    ❌ Error on page {page}: {e}")
             time.sleep(random.uniform(2, 3))
     
+    # Ghi cả model vào lake (data/lake/scraped) 1 lần
+    save_scraped(lake_rows, "bonbanh")
     return count
 
 # ----------------- RUN ----------------- 
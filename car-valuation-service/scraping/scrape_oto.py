@@ -14,6 +14,21 @@ import csv
 from datetime import datetime
 from pathlib import Path
 
+# Parser dùng chung (regex biên dịch sẵn) - cùng bản với valuation service
+SERVICE_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVICE_ROOT) not in sys.path:
+    sys.path.append(str(SERVICE_ROOT))
+
+from listings_lake import save_scraped
+from service.aliases import load_alias_table
+from service.title_parser import (
+    extract_price_vnd,
+    extract_mileage_from_text,
+    parse_color_from_text,
+)
+
+ALIASES = load_alias_table()
+
 # Selenium imports
 try:
     from selenium import webdriver
@@ -76,107 +91,6 @@ def clean_text(text):
         return None
     return ' '.join(str(text).split()).strip()
 
-def extract_price_vnd(text):
-    """Trích xuất giá theo triệu VND từ text (ví dụ: "435.000.000 đ" -> 435)"""
-    if not text:
-        return None
-    
-    text = str(text).lower()
-    
-    # Pattern 1: "1 tỷ 200 triệu" hoặc "1 tỷ 420 triệu"
-    match = re.search(r'(\d+(?:\.\d+)?)\s*tỷ\s*(\d+)?\s*triệu?', text)
-    if match:
-        ty = float(match.group(1))
-        tr = int(match.group(2)) if match.group(2) else 0
-        return int(ty * 1000 + tr)
-    
-    # Pattern 2: "1.42 tỷ" hoặc "1 tỷ"
-    match = re.search(r'(\d+(?:\.\d+)?)\s*tỷ', text)
-    if match:
-        return int(float(match.group(1)) * 1000)
-    
-    # Pattern 3: "250 triệu" hoặc "420 triệu"
-    match = re.search(r'(\d+)\s*triệu', text)
-    if match:
-        return int(match.group(1))
-    
-    # Pattern 4: "435.000.000 đ" hoặc "500.000.000"
-    text_clean = text.replace('.', '').replace(',', '').replace(' ', '').replace('đ', '')
-    match = re.search(r'(\d+)', text_clean)
-    if match:
-        price_vnd = int(match.group(1))
-        price_million = price_vnd // 1000000
-        return price_million if price_million > 0 else None
-    
-    return None
-
-def extract_mileage_from_text(text):
-    """Trích xuất số km từ text, trả về format "XXXXX km" """
-    if not text:
-        return None
-    
-    text = str(text).lower()
-    
-    # Pattern 1: "5 vạn km" hoặc "5.5 vạn km" -> 50000 km
-    match_van = re.search(r'([\d,\.]+)\s*vạn\s*km', text)
-    if match_van:
-        num_str = match_van.group(1).replace(',', '.').replace(' ', '')
-        try:
-            num = float(num_str) * 10000
-            return f"{int(num)} km"
-        except:
-            pass
-    
-    # Pattern 2: "50,000 km" hoặc "50.000 km" hoặc "50000 km"
-    match_km = re.search(r'([\d,\.]+)\s*km', text)
-    if match_km:
-        num_str = match_km.group(1).replace(',', '').replace('.', '')
-        try:
-            return f"{int(num_str)} km"
-        except:
-            pass
-    
-    # Pattern 3: Chỉ có số (không có "km") - giả định là km nếu số lớn hơn 1000
-    match_num = re.search(r'(\d{4,})', text)
-    if match_num:
-        num_str = match_num.group(1)
-        try:
-            num = int(num_str)
-            if num >= 1000:
-                return f"{num} km"
-        except:
-            pass
-    
-    return None
-
-def parse_color_from_text(text):
-    """Parse màu sắc từ text"""
-    if not text:
-        return None
-    
-    text_lower = str(text).lower()
-    color_map = {
-        'trắng': 'Trắng',
-        'đen': 'Đen',
-        'bạc': 'Bạc',
-        'xám': 'Xám',
-        'ghi': 'Ghi',
-        'đỏ': 'Đỏ',
-        'xanh': 'Xanh',
-        'vàng': 'Vàng',
-        'cát': 'Cát',
-        'nâu': 'Nâu',
-        'bạch kim': 'Bạch kim',
-        'xanh dương': 'Xanh dương',
-        'xanh lá': 'Xanh lá',
-    }
-    
-    for key, value in color_map.items():
-        if key in text_lower:
-            return value
-    
-    return None
-
 def extract_version_from_title(title, make, model):
     """
     Extract version từ title oto.com.vn
@@ -727,10 +641,11 @@ def scrape_oto_listings(model=None, max_pages=MAX_PAGES, scraped_urls=None):
                 if details.get("make") and details["make"].lower() != "toyota":
                     continue
                 
+                make = ALIASES.brand(details.get("make") or "Toyota")
                 car_data = {
                     "ad_id": ad_id,
-                    "make": details.get("make") or "Toyota",
-                    "model": details.get("model"),
+                    "make": make,
+                    "model": ALIASES.model(make, details.get("model")) or None,
                     "version": details.get("version"),
                     "title": details["title"],
                     "price_vnd": details["price_vnd"],
@@ -796,6 +711,7 @@ def main():
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(cars)
+        save_scraped(cars, "oto")
         
         print(f"\n{'='*60}")
         print(f"🎉 SCRAPING COMPLETED!")
@@ -12,6 +12,8 @@ if str(CURRENT_DIR) not in sys.path:
     sys.path.append(str(CURRENT_DIR))
 
 from scrape_bonbanh import (
+    ALIASES,
+    save_scraped,
     get_car_details,
     extract_ad_id_from_url,
     clean_text
@@ -155,8 +157,8 @@ def scrape_toyota_model(model_slug, base_url, max_pages=MAX_PAGES_PER_MODEL):
                     continue
                 
                 # Ưu tiên dùng make/model từ title
-                final_make = extracted_make or "Toyota"
-                final_model = details.get("extracted_model") or model_slug
+                final_make = ALIASES.brand(extracted_make or "Toyota")
+                final_model = ALIASES.model(final_make, details.get("extracted_model") or model_slug)
                 
                 car_data = {
                     "ad_id": ad_id,
@@ -228,6 +230,7 @@ def main():
         
         cars = scrape_toyota_model(model_slug, base_url, max_pages=MAX_PAGES_PER_MODEL)
         all_cars.extend(cars)
+        save_scraped(cars, "bonbanh")
         
         print(f"✅ Progress: {len(all_cars)} total cars scraped so far")
         
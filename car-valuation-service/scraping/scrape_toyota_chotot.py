@@ -14,6 +14,20 @@ import random
 import csv
 from datetime import datetime
 from pathlib import Path
+
+# Parser dùng chung (regex biên dịch sẵn) - cùng bản với valuation service
+SERVICE_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVICE_ROOT) not in sys.path:
+    sys.path.append(str(SERVICE_ROOT))
+
+from listings_lake import save_scraped
+from service.title_parser import (
+    extract_price_vnd,
+    extract_mileage_from_text,
+    parse_color_from_text,
+    extract_version_from_title,
+)
+
 import warnings
 from contextlib import redirect_stderr, redirect_stdout
 from io import StringIO
@@ -73,211 +87,6 @@ def clean_text(text):
         return None
     return ' '.join(str(text).split()).strip()
 
-def extract_price_vnd(text):
-    """Trích xuất giá theo triệu VND từ text (ví dụ: "435.000.000 đ" -> 435)"""
-    if not text:
-        return None
-    
-    text = str(text).lower()
-    
-    # Pattern 1: "1 tỷ 200 triệu" hoặc "1 tỷ 420 triệu"
-    match = re.search(r'(\d+(?:\.\d+)?)\s*tỷ\s*(\d+)?\s*triệu?', text)
-    if match:
-        ty = float(match.group(1))
-        tr = int(match.group(2)) if match.group(2) else 0
-        return int(ty * 1000 + tr)
-    
-    # Pattern 2: "1.42 tỷ" hoặc "1 tỷ"
-    match = re.search(r'(\d+(?:\.\d+)?)\s*tỷ', text)
-    if match:
-        return int(float(match.group(1)) * 1000)
-    
-    # Pattern 3: "250 triệu" hoặc "420 triệu"
-    match = re.search(r'(\d+)\s*triệu', text)
-    if match:
-        return int(match.group(1))
-    
-    # Pattern 4: "435.000.000 đ" hoặc "500.000.000"
-    # Loại bỏ dấu chấm và khoảng trắng
-    text_clean = text.replace('.', '').replace(',', '').replace(' ', '').replace('đ', '')
-    
-    # Tìm số
-    match = re.search(r'(\d+)', text_clean)
-    if match:
-        price_vnd = int(match.group(1))
-        # Chuyển từ VND sang triệu VND
-        price_million = price_vnd // 1000000
-        return price_million if price_million > 0 else None
-    
-    return None
-
-def extract_mileage_from_text(text):
-    """Trích xuất số km từ text, trả về format "XXXXX km" """
-    if not text:
-        return None
-    
-    text = str(text).lower()
-    
-    # Pattern 1: "5 vạn km" hoặc "5.5 vạn km" -> 50000 km
-    match_van = re.search(r'([\d,\.]+)\s*vạn\s*km', text)
-    if match_van:
-        num_str = match_van.group(1).replace(',', '.').replace(' ', '')
-        try:
-            num = float(num_str) * 10000
-            return f"{int(num)} km"
-        except:
-            pass
-    
-    # Pattern 2: "50,000 km" hoặc "50.000 km" hoặc "50000 km"
-    match_km = re.search(r'([\d,\.]+)\s*km', text)
-    if match_km:
-        num_str = match_km.group(1).replace(',', '').replace('.', '')
-        try:
-            return f"{int(num_str)} km"
-        except:
-            pass
-    
-    # Pattern 3: Chỉ có số (không có "km") - giả định là km nếu số lớn hơn 1000
-    match_num = re.search(r'(\d{4,})', text)
-    if match_num:
-        num_str = match_num.group(1)
-        try:
-            num = int(num_str)
-            # Nếu số >= 1000, giả định là km
-            if num >= 1000:
-                return f"{num} km"
-        except:
-            pass
-    
-    return None
-
-def parse_color_from_text(text):
-    """Parse màu sắc từ text"""
-    if not text:
-        return None
-    
-    text_lower = str(text).lower()
-    color_map = {
-        'trắng': 'Trắng',
-        'đen': 'Đen',
-        'bạc': 'Bạc',
-        'xám': 'Xám',
-        'ghi': 'Ghi',
-        'đỏ': 'Đỏ',
-        'xanh': 'Xanh',
-        'vàng': 'Vàng',
-        'cát': 'Cát',
-        'nâu': 'Nâu',
-        'bạch kim': 'Bạch kim',
-        'xanh dương': 'Xanh dương',
-        'xanh lá': 'Xanh lá',
-    }
-    
-    for key, value in color_map.items():
-        if key in text_lower:
-            return value
-    
-    return None
-
-def extract_version_from_title(title, make, model):
-    """
-    Extract version từ title
-    Format chotot thường: "{Make} {Model} {Version} {Year} - {Mileage}" hoặc "{Version} {Year} - {Mileage}"
-    
-    Examples:
-    - "2 54 2013 2.5G - 127000 km" -> "2.5G"
-    - "Toyota Camry 2.5G 2013 - 127000 km" -> "2.5G"
-    - "Toyota Vios 2023 1.5G 5390 km" -> "1.5G"
-    - "Bán Toyota Corolla 2009 Japan chính chủ cavet" -> None (không có version rõ ràng)
-    """
-    if not title:
-        return None
-    
-    title = str(title).strip()
-    
-    # Pattern 1: "Toyota Model Version Year" hoặc "Model Version Year"
-    if make and model:
-        make_str = str(make).strip()
-        model_str = str(model).strip()
-        
-        # Pattern: Make Model Version Year (có thể có "Bán" ở đầu)
-        # Ví dụ: "Bán Toyota Corolla 2009" hoặc "Toyota Vios 2023 1.5G"
-        pattern = rf"(?:Bán\s+)?{re.escape(make_str)}\s+{re.escape(model_str)}\s+(.+?)\s+(20\d{{2}})"
-        match = re.search(pattern, title, re.IGNORECASE)
-        
-        if match:
-            version = match.group(1).strip()
-            # Loại bỏ các ký tự không cần thiết ở cuối
-            version = re.sub(r'\s*-\s*$', '', version)  # Loại bỏ " -" ở cuối
-            # Loại bỏ các từ không phải version (như "Japan", "chính chủ", etc.)
-            version = re.sub(r'\s+(Japan|chính chủ|cavet|chủ|màu|xe|chỗ|số|tự động|chạy|xăng|km).*$', '', version, flags=re.IGNORECASE)
-            version = version.strip()
-            # Chỉ trả về nếu có chứa số hoặc chữ cái (không phải chỉ là từ thông thường)
-            if version and (re.search(r'\d', version) or len(version) <= 10):
-                return version if version else None
-        
-        # Pattern 1b: "Toyota Model Version" (không có năm, có thể trong description)
-        # Ví dụ: "Toyota Vios 1.5G màu Nâu vàng"
-        pattern = rf"{re.escape(make_str)}\s+{re.escape(model_str)}\s+([\d\.]+\s*[A-Z]+(?:\s+[A-Z]+)?)"
-        match = re.search(pattern, title, re.IGNORECASE)
-        if match:
-            version = match.group(1).strip()
-            # Loại bỏ các từ không phải version ở sau
-            version = re.sub(r'\s+(màu|xe|chỗ|số|tự động|chạy|xăng|km|Japan|chính chủ|cavet|chủ|Bán).*$', '', version, flags=re.IGNORECASE)
-            version = version.strip()
-            if version and (re.search(r'\d', version) or len(version) <= 15):
-                return version
-    
-    # Pattern 2: Format "2 54 2013 2.5G - 127000 km" (có số ở đầu)
-    # Loại bỏ các số đơn lẻ ở đầu trước
-    title_clean = re.sub(r'^\d+\s+\d+\s+', '', title)  # Loại bỏ "2 54 "
-    title_clean = re.sub(r'^\d+\s+', '', title_clean)  # Loại bỏ số đơn lẻ ở đầu
-    
-    # Tìm pattern: Version Year
-    pattern = r'(.+?)\s+(20\d{2})\s*-'
-    match = re.search(pattern, title_clean)
-    if match:
-        before_year = match.group(1).strip()
-        
-        # Loại bỏ Make và Model nếu có
-        if make and model:
-            make_model_pattern = rf"{re.escape(make)}\s+{re.escape(model)}\s+"
-            before_year = re.sub(make_model_pattern, '', before_year, flags=re.IGNORECASE)
-        
-        version = before_year.strip()
-        # Loại bỏ các từ không phải version
-        version = re.sub(r'\s+(Japan|chính chủ|cavet|chủ|Bán|màu|xe|chỗ|số|tự động|chạy|xăng|km).*$', '', version, flags=re.IGNORECASE)
-        version = version.strip()
-        
-        # Chỉ trả về nếu có chứa số hoặc là version ngắn (như "1.5G", "2.5G")
-        if version and (re.search(r'\d', version) or len(version) <= 10):
-            return version if version else None
-    
-    # Pattern 3: Tìm pattern số + chữ cái ngay trước năm (như "1.5G 2023")
-    pattern = r'([\d\.]+\s*[A-Z]+(?:\s+[A-Z]+)?)\s+(20\d{2})'
-    match = re.search(pattern, title, re.IGNORECASE)
-    if match:
-        version = match.group(1).strip()
-        return version
-    
-    # Pattern 4: Tìm pattern số + chữ cái đơn giản (như "1.5G", "2.5G") trong text
-    # Chỉ tìm nếu có make và model trước đó
-    if make and model:
-        # Tìm pattern: số.chữ hoặc số chữ (như "1.5G", "2.5G", "1.5 E")
-        pattern = r'([\d\.]+\s*[A-Z]+(?:\s+[A-Z]+)?)'
-        matches = re.findall(pattern, title)
-        for match in matches:
-            version_candidate = match.strip()
-            # Kiểm tra xem có phải version không (có số và chữ, độ dài hợp lý)
-            if re.search(r'\d', version_candidate) and len(version_candidate) <= 15:
-                # Loại bỏ các từ không phải version
-                version_candidate = re.sub(r'\s+(màu|xe|chỗ|số|tự động|chạy|xăng|km|Japan|chính chủ|cavet|chủ|Bán).*$', '', version_candidate, flags=re.IGNORECASE)
-                version_candidate = version_candidate.strip()
-                if version_candidate:
-                    return version_candidate
-    
-    return None
-
 def get_car_details(url, headers):
     """Lấy chi tiết 1 xe từ trang chi tiết chotot sử dụng itemprop
     Returns: (details_dict, error_type) hoặc (None, None) nếu thành công
@@ -902,6 +711,7 @@ def main():
         cars = scrape_chotot_listings(region=region, max_pages=MAX_PAGES, scraped_urls=scraped_urls)
         
         all_cars.extend(cars)
+        save_scraped(cars, "chotot")
         print(f"✅ Scraped {len(cars)} cars from {region} (total: {len(all_cars)})")
         
         # Delay giữa các khu vực
@@ -0,0 +1,102 @@
+"""
+Cache kết quả đánh giá hyperparameter giữa các lần chạy retrain_model.py (SQLite).
+
+Key = (hash nội dung file dữ liệu, tên model, cấu hình pipeline gốc, bộ tham số, cách chia CV + seed,
+số dòng dùng để đánh giá). Giá trị = điểm từng fold + thời gian fit.
+Dữ liệu và cấu hình không đổi -> lần chạy sau bỏ qua fit; chỉ tham số mới hoặc dữ liệu mới mới phải train.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    key TEXT PRIMARY KEY,
+    dataset_hash TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    params_json TEXT NOT NULL,
+    cv_json TEXT NOT NULL,
+    n_resources INTEGER,
+    fold_scores TEXT NOT NULL,
+    fit_times TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def _to_json(value) -> str:
+    """JSON ổn định (sort key) cho params có kiểu numpy, class (vd dtype=np.float64) hoặc estimator"""
+    def default(o):
+        if isinstance(o, type):
+            return f"{o.__module__}.{o.__qualname__}"
+        if hasattr(o, 'item'):
+            return o.item()
+        if hasattr(o, 'get_params'):
+            return type(o).__name__
+        return str(o)
+    return json.dumps(value, sort_keys=True, default=default, ensure_ascii=False)
+
+
+def file_content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pipeline_fingerprint(pipeline) -> str:
+    """Hash cấu hình pipeline gốc (mọi tham số không phải estimator) -> đổi model gốc thì cache tự miss"""
+    params = {k: v for k, v in pipeline.get_params(deep=True).items() if not hasattr(v, 'get_params')}
+    params['__steps__'] = [type(step).__name__ for _, step in pipeline.steps]
+    return hashlib.sha256(_to_json(params).encode('utf-8')).hexdigest()
+
+
+def cv_description(cv) -> dict:
+    """Mô tả cách chia fold (loại splitter, số fold, shuffle, seed)"""
+    return {
+        'splitter': type(cv).__name__,
+        'n_splits': getattr(cv, 'n_splits', None),
+        'shuffle': getattr(cv, 'shuffle', None),
+        'random_state': getattr(cv, 'random_state', None),
+    }
+
+
+class EvaluationCache:
+    def __init__(self, path: Path, dataset_hash: str):
+        self.path = Path(path)
+        self.dataset_hash = dataset_hash
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def _key(self, model_name, fingerprint, params, cv, n_resources) -> str:
+        raw = _to_json([self.dataset_hash, model_name, fingerprint, params, cv_description(cv), n_resources])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, model_name: str, fingerprint: str, params: dict, cv, n_resources: int) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT fold_scores, fit_times FROM evaluations WHERE key = ?",
+            (self._key(model_name, fingerprint, params, cv, n_resources),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {'fold_scores': json.loads(row[0]), 'fit_times': json.loads(row[1])}
+
+    def put(self, model_name: str, fingerprint: str, params: dict, cv, n_resources: int,
+            fold_scores, fit_times) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self._key(model_name, fingerprint, params, cv, n_resources), self.dataset_hash, model_name,
+             _to_json(params), _to_json(cv_description(cv)), int(n_resources),
+             json.dumps(list(fold_scores)), json.dumps(list(fit_times)), time.time()))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
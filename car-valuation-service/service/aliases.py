@@ -0,0 +1,114 @@
+"""
+Bảng alias hãng/dòng xe (service/aliases.json) dùng chung cho scrapers, clean_data.py và valuation service.
+
+- aliases.json: tên chuẩn -> danh sách alias, model theo từng hãng. Sửa file này, không sửa code.
+- So khớp theo key: bỏ khoảng trắng, '-', '_' và không phân biệt hoa thường -> "mercedes-benz" (slug URL),
+  "Mercedes Benz", "MERCEDES-BENZ" cùng về "Mercedes-Benz"; "Lux SA2.0" == "Lux SA 2.0".
+- Giá trị không có trong bảng giữ nguyên (chỉ strip), giá trị không phải chuỗi -> "".
+- normalize_brands/normalize_models (cột pandas): factorize cột rồi chuẩn hoá từng giá trị *khác nhau* 1 lần,
+  kết quả là Categorical dựng lại từ codes -> chi phí theo số giá trị khác nhau, không theo số dòng.
+"""
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+ALIASES_PATH = Path(__file__).resolve().parent / "aliases.json"
+
+_KEY_STRIP_RE = re.compile(r'[\s\-_]+')
+
+
+def alias_key(text: str) -> str:
+    """Key so khớp alias: "Mercedes-Benz" / "mercedes benz" / "MERCEDES_BENZ" -> "mercedesbenz" """
+    return _KEY_STRIP_RE.sub('', text).casefold()
+
+
+def _compile(names: Dict[str, list], scope: str) -> Dict[str, str]:
+    """{tên chuẩn: [alias]} -> {key: tên chuẩn}; 2 tên chuẩn khác nhau trùng key là lỗi dữ liệu"""
+    table = {}
+    for canonical, aliases in names.items():
+        for name in [canonical, *aliases]:
+            key = alias_key(name)
+            if table.setdefault(key, canonical) != canonical:
+                raise ValueError(f"❌ Alias trùng trong {scope}: '{name}' -> '{table[key]}' và '{canonical}'")
+    return table
+
+
+class AliasTable:
+    """Bảng alias đã biên dịch (key -> tên chuẩn)"""
+
+    def __init__(self, data: dict):
+        self.brand_names: Dict[str, list] = data.get('brands', {})
+        self.model_names: Dict[str, Dict[str, list]] = data.get('models', {})
+        self._brands = _compile(self.brand_names, 'brands')
+        self._models = {brand: _compile(models, f"models.{brand}") for brand, models in self.model_names.items()}
+
+    @classmethod
+    def load(cls, path: Path = ALIASES_PATH) -> 'AliasTable':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    # --- Từng giá trị (scraper, request của service) ---
+    def brand(self, value) -> str:
+        if not isinstance(value, str):
+            return ""
+        value = value.strip()
+        return self._brands.get(alias_key(value), value)
+
+    def model(self, brand: str, value) -> str:
+        """brand phải là tên chuẩn (kết quả của brand())"""
+        if not isinstance(value, str):
+            return ""
+        value = value.strip()
+        models = self._models.get(brand)
+        return models.get(alias_key(value), value) if models else value
+
+    def brand_aliases(self) -> Iterator[Tuple[str, str]]:
+        """(alias, tên chuẩn) của các hãng, không gồm chính tên chuẩn"""
+        for canonical, aliases in self.brand_names.items():
+            for name in aliases:
+                yield name, canonical
+
+    def model_aliases(self, brand: str) -> Iterator[Tuple[str, str]]:
+        for canonical, aliases in self.model_names.get(brand, {}).items():
+            for name in aliases:
+                yield name, canonical
+
+    # --- Cả cột (clean_data, batch) ---
+    def normalize_brands(self, values: pd.Series) -> pd.Series:
+        codes, uniques = pd.factorize(values)
+        return _remap(codes, [self.brand(v) for v in uniques], values.index)
+
+    def normalize_models(self, brands: pd.Series, values: pd.Series) -> pd.Series:
+        """brands: cột hãng đã chuẩn hoá (kết quả normalize_brands); model được tra theo cặp (hãng, model)"""
+        brand_codes, brand_uniques = pd.factorize(brands)
+        model_codes, model_uniques = pd.factorize(values)
+        # Mã hoá cặp (hãng, model) thành 1 số nguyên; +1 để giá trị thiếu (code -1) thành 0
+        width = len(model_uniques) + 1
+        pair_codes, pairs = pd.factorize(brand_codes.astype(np.int64) * width + (model_codes + 1))
+        normalized = []
+        for pair in pairs:
+            b, m = divmod(int(pair), width)
+            brand = brand_uniques[b] if b >= 0 else ""
+            normalized.append(self.model(brand, model_uniques[m - 1] if m else None))
+        return _remap(pair_codes, normalized, values.index)
+
+
+def _remap(codes: np.ndarray, normalized: list, index) -> pd.Series:
+    """
+    codes/uniques của pd.factorize + giá trị đã chuẩn hoá của từng unique -> Series Categorical.
+    Nhiều alias về cùng 1 tên chuẩn -> factorize lần 2 để category không trùng, category sắp xếp theo tên
+    (sort/groupby trên cột cho cùng thứ tự như cột chuỗi); phần tử cuối là giá trị cho NaN (code -1 lấy phần tử cuối).
+    """
+    new_codes, categories = pd.factorize(pd.Index([*normalized, ""], dtype=object), sort=True)
+    return pd.Series(pd.Categorical.from_codes(new_codes[codes], categories), index=index)
+
+
+@lru_cache(maxsize=None)
+def load_alias_table(path: Path = ALIASES_PATH) -> AliasTable:
+    """Bảng alias dùng chung, chỉ đọc + biên dịch 1 lần mỗi process"""
+    return AliasTable.load(path)
@@ -0,0 +1,215 @@
+"""
+Index autocomplete hãng/dòng/phiên bản xe, compile từ vocabulary của metadata.json.
+
+- Mỗi gợi ý là 1 hãng hoặc 1 cặp (hãng, dòng) kèm các version của dòng đó.
+- Key tìm kiếm đã fold sẵn (bỏ dấu, "đ" -> "d", không phân biệt hoa thường, dấu câu -> khoảng trắng) cho mọi
+  điểm bắt đầu từ của nhãn "Toyota Camry 2.5Q": "toyota camry 2.5q", "camry 2.5q", "2.5q"...
+  -> gõ tiền tố của bất kỳ từ nào ("cam", "2.5") đều là 1 lần bisect trên mảng key đã sắp xếp.
+- Query khớp phần hãng/dòng -> trả về mọi version; query đi vào phần version ("camry 2.5") -> chỉ version khớp.
+- Còn thiếu gợi ý thì tìm chuỗi con trong nhãn hãng/dòng ("amry" -> Camry) bằng str.find trên 1 chuỗi nối sẵn.
+- Xếp hạng: khớp hãng/dòng > khớp version > chuỗi con, cùng mức thì hãng trước dòng, nhiều tin đăng trước.
+- build_autocomplete_index.py lưu index ra models/autocomplete_index.json (kèm hash metadata.json) để client
+  không phải tải và duyệt cả metadata.json; service load file này, thiếu/cũ thì compile lại từ metadata.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+INDEX_PATH = BASE_DIR / "models" / "autocomplete_index.json"
+
+_NON_KEY_RE = re.compile(r'[^0-9a-z.]+')
+# Mức khớp (số nhỏ xếp trước)
+TIER_NAME, TIER_VERSION, TIER_INFIX = 0, 1, 2
+_NO_VERSION = -1
+
+
+def fold_key(text) -> str:
+    """Key so khớp: "Mercedes-Benz" -> "mercedes benz", "Đà Nẵng" -> "da nang", "2.5Q" -> "2.5q" (giữ dấu chấm)"""
+    decomposed = unicodedata.normalize('NFKD', str(text).replace('đ', 'd').replace('Đ', 'D'))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_KEY_RE.sub(' ', stripped.casefold()).strip()
+
+
+def _word_suffixes(folded: str):
+    """(vị trí, hậu tố) cho mỗi điểm bắt đầu từ: "toyota camry" -> (0, "toyota camry"), (7, "camry")"""
+    yield 0, folded
+    for match in re.finditer(' ', folded):
+        yield match.end(), folded[match.end():]
+
+
+def metadata_fingerprint(path: Path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compile_index(metadata: dict) -> dict:
+    """
+    metadata.json -> index dạng JSON-able:
+    entries [hãng, dòng|""], versions theo entry, weights (số tin), và các mảng song song keys (đã sắp xếp) /
+    key_entry / key_version (-1 = key trên nhãn hãng/dòng) / key_split (độ dài phần hãng/dòng trong key).
+    """
+    counts = metadata.get('combo_counts', {})
+    year_versions = metadata.get('year_versions', {})
+
+    entries, versions, weights = [], [], []
+    for make, models in metadata.get('make_models', {}).items():
+        make_entry = len(entries)
+        entries.append([make, ""])
+        versions.append([])
+        weights.append(0)
+        for model in models:
+            years = year_versions.get(make, {}).get(model, {})
+            model_counts = counts.get(make, {}).get(model, {})
+            if model_counts:
+                weight = sum(n for by_version in model_counts.values()
+                             for by_color in by_version.values() for n in by_color.values())
+            else:
+                # Metadata chưa có số đếm -> số tổ hợp (năm, version) làm độ phổ biến
+                weight = sum(len(v) for v in years.values())
+            entries.append([make, model])
+            versions.append(sorted({v for year_list in years.values() for v in year_list}))
+            weights.append(weight)
+            weights[make_entry] += weight
+
+    rows = []
+    for entry, (make, model) in enumerate(entries):
+        label = fold_key(f"{make} {model}")
+        rows.extend((key, entry, _NO_VERSION, 0) for _, key in _word_suffixes(label))
+        for v, version in enumerate(versions[entry]):
+            full = f"{label} {fold_key(version)}"
+            rows.extend((key, entry, v, max(len(label) + 1 - start, 0)) for start, key in _word_suffixes(full))
+    rows.sort()
+    keys, key_entry, key_version, key_split = (list(col) for col in zip(*rows)) if rows else ([], [], [], [])
+    return {'entries': entries, 'versions': versions, 'weights': weights,
+            'keys': keys, 'key_entry': key_entry, 'key_version': key_version, 'key_split': key_split}
+
+
+def save_index(index: dict, fingerprint: str, path: Path = INDEX_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'metadata_fingerprint': fingerprint, **index}, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_path.replace(path)
+
+
+class AutocompleteIndex:
+    """Tra cứu tiền tố/chuỗi con trên index đã compile; chi phí search() theo số key khớp, không theo cả vocabulary"""
+
+    def __init__(self, index: dict):
+        self.entries = [tuple(e) for e in index['entries']]
+        self.versions = index['versions']
+        self.keys = index['keys']
+        self.key_entry = np.asarray(index['key_entry'], dtype=np.int32)
+        self.key_version = np.asarray(index['key_version'], dtype=np.int32)
+        self.key_split = np.asarray(index['key_split'], dtype=np.int32)
+
+        # Hạng của entry: hãng trước dòng, rồi nhiều tin đăng trước, rồi theo tên
+        order = sorted(range(len(self.entries)),
+                       key=lambda i: (self.entries[i][1] != "", -index['weights'][i], self.entries[i]))
+        self.rank = np.empty(len(order), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+
+        # Nhãn hãng/dòng nối bằng '\n' cho tìm chuỗi con, offsets[i] = vị trí bắt đầu nhãn i
+        labels = [fold_key(f"{make} {model}") for make, model in self.entries]
+        self.offsets = np.cumsum([0] + [len(label) + 1 for label in labels[:-1]]).tolist()
+        self.blob = '\n'.join(labels)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def from_metadata(cls, metadata: dict) -> "AutocompleteIndex":
+        return cls(compile_index(metadata))
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH,
+             expected_fingerprint: Optional[str] = None) -> Optional["AutocompleteIndex"]:
+        """Mở index đã build. None nếu thiếu file hoặc build từ metadata.json khác (caller compile lại)"""
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if expected_fingerprint and index.get('metadata_fingerprint') != expected_fingerprint:
+            print("⚠️ Index autocomplete được build từ metadata.json khác, bỏ qua. "
+                  "Hãy chạy lại build_autocomplete_index.py")
+            return None
+        return cls(index)
+
+    def _prefix_range(self, query: str):
+        lo = bisect_left(self.keys, query)
+        # '\uffff' > mọi ký tự của key đã fold -> cận trên của mọi key bắt đầu bằng query
+        hi = bisect_left(self.keys, query + '\uffff', lo)
+        return lo, hi
+
+    def search(self, text: str, limit: int = 10) -> List[Dict]:
+        """
+        Gợi ý cho chuỗi đang gõ: [{'make', 'model' (None nếu là hãng), 'versions', 'label'}], tối đa limit gợi ý.
+        "cam" -> Toyota Camry + mọi version; "camry 2.5" -> Toyota Camry + các version bắt đầu bằng "2.5".
+        """
+        query = fold_key(text)
+        if not query or limit <= 0:
+            return []
+
+        best, matched_versions = self._prefix_matches(query, limit)
+        if len(best) < limit:
+            self._add_infix(query, best, limit)
+
+        results = []
+        for entry, _ in sorted(best.items(), key=lambda item: item[1]):
+            make, model = self.entries[entry]
+            all_versions = self.versions[entry]
+            picked = matched_versions.get(entry) if best[entry] // len(self.rank) == TIER_VERSION else None
+            results.append({
+                'make': make,
+                'model': model or None,
+                'versions': [all_versions[v] for v in sorted(picked)] if picked else list(all_versions),
+                'label': f"{make} {model}".strip(),
+            })
+        return results
+
+    def _prefix_matches(self, query: str, limit: int):
+        """{entry: điểm} của tối đa limit entry khớp tiền tố + {entry: version khớp} khi query đi vào phần version"""
+        lo, hi = self._prefix_range(query)
+        if lo == hi:
+            return {}, {}
+        entries = self.key_entry[lo:hi]
+        version = self.key_version[lo:hi]
+        # Key version mà query chưa đi tới phần version -> trùng với key hãng/dòng, bỏ
+        into_version = (version != _NO_VERSION) & (len(query) > self.key_split[lo:hi])
+        keep = (version == _NO_VERSION) | into_version
+        entries, version, into_version = entries[keep], version[keep], into_version[keep]
+
+        score = np.where(into_version, TIER_VERSION, TIER_NAME) * len(self.rank) + self.rank[entries]
+        # Lần xuất hiện đầu tiên theo điểm tăng dần = điểm tốt nhất của entry, dừng khi đủ limit entry
+        order = np.argsort(score, kind='stable')
+        best = {}
+        for entry, entry_score in zip(entries[order].tolist(), score[order].tolist()):
+            if entry not in best:
+                best[entry] = entry_score
+                if len(best) == limit:
+                    break
+
+        matched_versions = {}
+        for entry, v in zip(entries[into_version].tolist(), version[into_version].tolist()):
+            if entry in best:
+                matched_versions.setdefault(entry, set()).add(v)
+        return best, matched_versions
+
+    def _add_infix(self, query: str, best: dict, limit: int) -> None:
+        """Thêm entry có query là chuỗi con (không ở đầu từ) của nhãn hãng/dòng"""
+        found = []
+        pos = self.blob.find(query)
+        while pos != -1:
+            entry = bisect_left(self.offsets, pos + 1) - 1
+            if entry not in best:
+                found.append(entry)
+            pos = self.blob.find(query, self.offsets[entry + 1] if entry + 1 < len(self.offsets) else len(self.blob))
+        for entry in sorted(found, key=lambda e: self.rank[e])[:limit - len(best)]:
+            best[entry] = TIER_INFIX * len(self.rank) + int(self.rank[entry])
@@ -0,0 +1,88 @@
+"""
+Encoder dùng chung giữa lúc train (retrain_model.py) và lúc serving (service/main.py).
+Được pickle cùng Pipeline, nên phải import được từ service.encoders khi load model.
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class CategoryCodeEncoder(BaseEstimator, TransformerMixin):
+    """
+    Chuyển cột categorical sang pandas Categorical với danh sách category cố định lúc fit,
+    để XGBoost (enable_categorical=True) split trực tiếp trên category thay vì one-hot.
+
+    - Thứ tự category được sort và lưu trong categories_ -> mã (code) ổn định giữa train và serving.
+    - Giá trị chưa gặp lúc train (hoặc thiếu) -> NaN, XGBoost đi theo nhánh mặc định.
+    - Cột numeric được giữ nguyên dạng float (XGBoost tự xử lý NaN, không cần scale).
+    """
+
+    def __init__(self, cat_features: List[str], num_features: List[str]):
+        self.cat_features = cat_features
+        self.num_features = num_features
+
+    def fit(self, X, y=None):
+        self.categories_ = {}
+        for col in self.cat_features:
+            values = X[col].dropna().astype(str).unique()
+            self.categories_[col] = sorted(values.tolist())
+        return self
+
+    def extend_categories(self, X) -> int:
+        """
+        Thêm category mới vào CUỐI danh sách (mã cũ giữ nguyên) - dùng khi train tiếp trên dữ liệu mới.
+        Trả về số category được thêm.
+        """
+        added = 0
+        for col in self.cat_features:
+            known = set(self.categories_[col])
+            new_values = sorted(set(X[col].dropna().astype(str).unique()) - known)
+            self.categories_[col] = self.categories_[col] + new_values
+            added += len(new_values)
+        return added
+
+    def transform(self, X):
+        out = pd.DataFrame(index=X.index)
+        for col in self.num_features:
+            out[col] = pd.to_numeric(X[col], errors='coerce').astype(np.float64)
+        for col in self.cat_features:
+            categories = self.categories_[col]
+            # get_indexer trả -1 cho giá trị lạ/thiếu -> NaN trong Categorical
+            codes = pd.Index(categories).get_indexer(X[col].astype('string'))
+            out[col] = pd.Categorical.from_codes(codes, categories=categories)
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(list(self.num_features) + list(self.cat_features), dtype=object)
+
+
+class FrequencyEncoder(BaseEstimator, TransformerMixin):
+    """
+    Thay mỗi category bằng tần suất xuất hiện lúc train (1 cột số / 1 cột đầu vào thay vì hàng trăm cột one-hot).
+    Bảng tra cứu frequencies_ (giá trị -> tỉ lệ) được pickle cùng Pipeline; giá trị chưa gặp -> 0.
+    """
+
+    def __init__(self, normalize: bool = True):
+        self.normalize = normalize
+
+    def fit(self, X, y=None):
+        frame = pd.DataFrame(X)
+        self.feature_names_in_ = np.asarray([str(c) for c in frame.columns], dtype=object)
+        self.frequencies_ = []
+        for col in frame.columns:
+            counts = frame[col].astype(str).value_counts(normalize=self.normalize)
+            self.frequencies_.append(counts.astype(np.float64).to_dict())
+        return self
+
+    def transform(self, X):
+        frame = pd.DataFrame(X)
+        out = np.zeros((len(frame), len(self.frequencies_)), dtype=np.float64)
+        for i, (col, table) in enumerate(zip(frame.columns, self.frequencies_)):
+            out[:, i] = frame[col].astype(str).map(table).fillna(0.0).to_numpy(dtype=np.float64)
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        names = input_features if input_features is not None else self.feature_names_in_
+        return np.asarray([f"{name}_freq" for name in names], dtype=object)
@@ -0,0 +1,74 @@
+"""
+Estimator tuỳ biến dùng khi train và được pickle cùng Pipeline (phải import được khi serving).
+"""
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.model_selection import train_test_split
+
+
+class EarlyStoppingXGBRegressor(BaseEstimator, RegressorMixin):
+    """
+    XGBRegressor có early stopping thật bên trong Pipeline/GridSearchCV.
+
+    Khi fit, tách validation_fraction dữ liệu (đã qua preprocessor) làm eval_set và dừng khi MAE
+    validation không cải thiện sau early_stopping_rounds cây. n_estimators chỉ là giới hạn trên;
+    số cây thực tế nằm ở best_iteration_.
+    """
+
+    def __init__(self, n_estimators=2000, learning_rate=0.1, max_depth=6, min_child_weight=1.0,
+                 subsample=1.0, colsample_bytree=1.0, early_stopping_rounds=50,
+                 validation_fraction=0.1, tree_method='hist', enable_categorical=False,
+                 max_cat_to_onehot=None, random_state=42, n_jobs=1):
+        self.n_estimators = n_estimators
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_child_weight = min_child_weight
+        self.subsample = subsample
+        self.colsample_bytree = colsample_bytree
+        self.early_stopping_rounds = early_stopping_rounds
+        self.validation_fraction = validation_fraction
+        self.tree_method = tree_method
+        self.enable_categorical = enable_categorical
+        self.max_cat_to_onehot = max_cat_to_onehot
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def _make_estimator(self, **overrides):
+        import xgboost as xgb
+
+        params = dict(
+            n_estimators=self.n_estimators,
+            learning_rate=self.learning_rate,
+            max_depth=self.max_depth,
+            min_child_weight=self.min_child_weight,
+            subsample=self.subsample,
+            colsample_bytree=self.colsample_bytree,
+            tree_method=self.tree_method,
+            enable_categorical=self.enable_categorical,
+            max_cat_to_onehot=self.max_cat_to_onehot,
+            eval_metric='mae',
+            random_state=self.random_state,
+            n_jobs=self.n_jobs,
+        )
+        params.update(overrides)
+        return xgb.XGBRegressor(**params)
+
+    def fit(self, X, y, xgb_model=None):
+        """xgb_model: booster có sẵn -> train tiếp, thêm tối đa n_estimators cây vào sau các cây cũ"""
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y, test_size=self.validation_fraction, random_state=self.random_state)
+
+        self.estimator_ = self._make_estimator(early_stopping_rounds=self.early_stopping_rounds)
+        self.estimator_.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False, xgb_model=xgb_model)
+        self.best_iteration_ = self.estimator_.best_iteration
+        return self
+
+    def predict(self, X):
+        # XGBRegressor tự dùng best_iteration khi đã early stopping
+        return self.estimator_.predict(X)
+
+    def get_booster(self):
+        return self.estimator_.get_booster()
+
+    @property
+    def feature_importances_(self):
+        return self.estimator_.feature_importances_
@@ -1,12 +1,21 @@
 import json
 import os
 import joblib
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Optional
-from fastapi import FastAPI, HTTPException
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from service.aliases import load_alias_table
+from service.autocomplete import AutocompleteIndex, metadata_fingerprint
+from service.market_index import MarketIndex
+from service.metadata_index import load_metadata, expand_partial, METADATA_PATH
+from service.price_table import PriceTable, model_fingerprint
+from service.shard_router import ShardRouter
+from service.title_parser import TitleParser
 
 # --- CẤU HÌNH PATH ---
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -14,6 +23,16 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 MODEL_PATH = BASE_DIR / "models" / "best_car_price_pipeline.pkl"
 # Metrics bây giờ lưu dưới dạng JSON
 METRICS_PATH = BASE_DIR / "models" / "model_metrics.json"
+# Bảng giá tính sẵn (build bằng build_price_table.py). "off" để luôn gọi model trực tiếp
+PRICE_TABLE_MODE = os.getenv("PRICE_TABLE_MODE", "auto").lower()
+# Model theo hãng (build bằng train_shards.py). "off" để chỉ dùng model tổng
+SHARD_MODE = os.getenv("SHARD_MODE", "auto").lower()
+MAX_LOADED_SHARDS = int(os.getenv("MAX_LOADED_SHARDS", 3))
+SHARD_IDLE_SECONDS = float(os.getenv("SHARD_IDLE_SECONDS", 0)) or None
+# Giới hạn số tiêu đề trong 1 request /parse-and-predict
+MAX_TITLES_PER_REQUEST = int(os.getenv("MAX_TITLES_PER_REQUEST", 10000))
+# Số gợi ý tối đa của /autocomplete
+MAX_AUTOCOMPLETE_LIMIT = int(os.getenv("MAX_AUTOCOMPLETE_LIMIT", 50))
 
 # --- INPUT SCHEMA ---
 class CarInput(BaseModel):
@@ -25,6 +44,15 @@ class CarInput(BaseModel):
     color: Optional[str] = Field(None, description="Màu xe (ví dụ: Trắng)")
     transmission: Optional[str] = Field(None, description="Hộp số (AT/MT) - (Hiện tại chưa dùng trong model)")
     location: Optional[str] = Field(None, description="Địa điểm - (Hiện tại chưa dùng trong model)")
+    expand_missing: bool = Field(False, description="Thiếu version/color: định giá trung bình có trọng số trên mọi version/color đã biết")
+
+    @model_validator(mode='after')
+    def _canonical_names(self):
+        """Alias hãng/dòng xe ("Mec", "Lux SA2.0") -> tên chuẩn như trong dữ liệu train (service/aliases.json)"""
+        aliases = load_alias_table()
+        self.brand = aliases.brand(self.brand)
+        self.model = aliases.model(self.brand, self.model)
+        return self
 
 class PricePrediction(BaseModel):
     price_estimate: float = Field(..., description="Giá dự đoán (triệu VND)")
@@ -32,6 +60,43 @@ class PricePrediction(BaseModel):
     price_max: float = Field(..., description="Giá tối đa (triệu VND)")
     confidence_level: str = Field(..., description="Độ tin cậy")
     mae_estimate: float = Field(..., description="Sai số ước tính (triệu VND)")
+    price_spread: Optional[float] = Field(None, description="Độ lệch chuẩn có trọng số giữa các version/color (triệu VND) - chỉ có khi expand_missing")
+    expanded_count: Optional[int] = Field(None, description="Số tổ hợp version/color đã dùng để tính trung bình")
+
+class TitleBatch(BaseModel):
+    titles: List[str] = Field(..., min_length=1, max_length=MAX_TITLES_PER_REQUEST,
+                              description="Tiêu đề tin đăng (ví dụ: Toyota Vios 1.5G 2019 - 45000 km)")
+
+class ParsedListing(BaseModel):
+    title: str
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    year: Optional[int] = None
+    version: Optional[str] = None
+    color: Optional[str] = None
+    mileage_km: Optional[int] = None
+    listed_price: Optional[float] = Field(None, description="Giá ghi trong tiêu đề nếu có (triệu VND)")
+    prediction: Optional[PricePrediction] = None
+    error: Optional[str] = None
+
+class AutocompleteSuggestion(BaseModel):
+    label: str = Field(..., description="Tên hiển thị (ví dụ: Toyota Camry)")
+    make: str
+    model: Optional[str] = Field(None, description="None nếu gợi ý là hãng")
+    versions: List[str] = Field(default_factory=list, description="Version của dòng xe (chỉ version khớp nếu query gõ tới version)")
+
+class MarketPoint(BaseModel):
+    scrape_date: str = Field(..., description="Ngày scrape (YYYY-MM-DD)")
+    count: int = Field(..., description="Số tin đăng trong ngày")
+    p25: float = Field(..., description="Phân vị 25% giá rao (triệu VND)")
+    median: float = Field(..., description="Giá rao trung vị (triệu VND)")
+    p75: float = Field(..., description="Phân vị 75% giá rao (triệu VND)")
+
+class MarketSeries(BaseModel):
+    make: str
+    model: str
+    year: int
+    points: List[MarketPoint]
 
 # --- APP SETUP ---
 app = FastAPI(title="Car Valuation Service", version="2.0.0")
@@ -50,12 +115,19 @@ app.add_middleware(
 
 # Global variables
 model_pipeline = None
+price_table = None
+shard_router = None
+metadata = None
+title_parser = None
+autocomplete_index = None
+market_index = None
 test_mae = 35.0  # Default fallback từ log train gần nhất
 test_r2 = 0.98   # Default fallback
 
 def load_model_resources():
-    """Load Pipeline hoàn chỉnh và Metrics"""
-    global model_pipeline, test_mae, test_r2
+    """Load Pipeline hoàn chỉnh, Shard theo hãng, Bảng giá tính sẵn, Parser tiêu đề và Metrics"""
+    global model_pipeline, price_table, shard_router, metadata, title_parser, autocomplete_index, market_index
+    global test_mae, test_r2
     
     # 1. Load Model Pipeline
     if not MODEL_PATH.exists():
@@ -69,6 +141,54 @@ def load_model_resources():
     except Exception as e:
         raise RuntimeError(f"❌ Lỗi khi load model bằng joblib: {e}")
 
+    # 1a. Index các shard theo hãng (không bắt buộc). Shard được load khi có request đầu tiên.
+    shard_router = None
+    if SHARD_MODE != "off":
+        try:
+            shard_router = ShardRouter.load(max_loaded=MAX_LOADED_SHARDS, idle_seconds=SHARD_IDLE_SECONDS)
+            if shard_router is not None:
+                print(f"✅ Đã đọc index shard: {len(shard_router)} hãng (giữ tối đa {MAX_LOADED_SHARDS} trong RAM)")
+        except Exception as e:
+            print(f"⚠️ Không thể đọc index shard: {e}. Sẽ dùng model tổng.")
+
+    # 1b. Load Bảng giá tính sẵn (không bắt buộc). Bảng được build từ model tổng
+    # -> không dùng khi đã có shard, tránh trả giá của 2 model khác nhau cho cùng 1 hãng.
+    price_table = None
+    if PRICE_TABLE_MODE != "off" and shard_router is None:
+        try:
+            price_table = PriceTable.load(expected_fingerprint=model_fingerprint(MODEL_PATH))
+            if price_table is not None:
+                print(f"✅ Đã load Bảng giá tính sẵn: {len(price_table)} tổ hợp")
+        except Exception as e:
+            print(f"⚠️ Không thể load bảng giá: {e}. Sẽ dùng model trực tiếp.")
+
+    # 1c. Metadata (cho expand_missing) + Parser tiêu đề theo vocabulary (cho /parse-and-predict)
+    if METADATA_PATH.exists():
+        try:
+            metadata = load_metadata()
+            title_parser = TitleParser(metadata)
+            print(f"✅ Đã khởi tạo Parser tiêu đề từ: {METADATA_PATH.name}")
+        except Exception as e:
+            print(f"⚠️ Không thể khởi tạo parser tiêu đề: {e}")
+
+        # 1d. Index autocomplete: file build sẵn nếu khớp metadata.json, không thì compile trong RAM
+        try:
+            autocomplete_index = AutocompleteIndex.load(expected_fingerprint=metadata_fingerprint(METADATA_PATH))
+            if autocomplete_index is None and metadata is not None:
+                autocomplete_index = AutocompleteIndex.from_metadata(metadata)
+            if autocomplete_index is not None:
+                print(f"✅ Đã load index autocomplete: {len(autocomplete_index)} hãng/dòng")
+        except Exception as e:
+            print(f"⚠️ Không thể load index autocomplete: {e}")
+
+    # 1e. Chỉ số giá thị trường theo ngày scrape (không bắt buộc, build bằng build_market_index.py)
+    try:
+        market_index = MarketIndex.load()
+        if market_index is not None:
+            print(f"✅ Đã load chỉ số giá thị trường: {len(market_index)} segment")
+    except Exception as e:
+        print(f"⚠️ Không thể load chỉ số giá thị trường: {e}")
+
     # 2. Load Metrics (JSON)
     if METRICS_PATH.exists():
         try:
@@ -94,9 +214,91 @@ def health_check():
         "status": "ok",
         "model_loaded": model_pipeline is not None,
         "current_mae": test_mae,
+        "price_table_size": len(price_table) if price_table is not None else 0,
+        "shards": len(shard_router) if shard_router is not None else 0,
+        "loaded_shards": shard_router.loaded_makes if shard_router is not None else [],
         "model_type": str(type(model_pipeline)) if model_pipeline else "None"
     }
 
+def predict_frame(input_data: pd.DataFrame) -> np.ndarray:
+    """
+    Dự đoán cho nhiều dòng. Có shard -> mỗi hãng gọi shard của nó 1 lần (hãng chưa có shard dùng model tổng).
+    Không có shard -> tổ hợp đã biết được trả lời bằng bảng giá (tra cứu + nội suy theo km),
+    các dòng còn lại được gom lại và gọi model 1 lần.
+    """
+    if shard_router is not None:
+        return shard_router.predict(input_data, fallback=model_pipeline.predict)
+
+    if price_table is not None:
+        prices = price_table.lookup_many(input_data)
+    else:
+        prices = np.full(len(input_data), np.nan)
+
+    misses = np.isnan(prices)
+    if misses.any():
+        prices[misses] = model_pipeline.predict(input_data[misses])
+    return prices
+
+def build_prediction(price_estimate: float, price_spread: Optional[float] = None,
+                     expanded_count: Optional[int] = None) -> PricePrediction:
+    """Tính khoảng giá và độ tin cậy quanh giá dự đoán"""
+    # Dùng hệ số an toàn 2.0 * MAE để bao phủ 95% trường hợp (theo quy tắc thống kê cơ bản)
+    # Tuy nhiên để user thấy khoảng hẹp hơn cho hấp dẫn, ta dùng 1.5 hoặc 1.0 tùy chiến lược
+    margin = test_mae * 1.5
+    if price_spread:
+        # Cộng thêm độ phân tán do không biết version/color (hai nguồn sai số độc lập)
+        margin = float(np.hypot(margin, price_spread))
+
+    price_min = max(0.0, price_estimate - margin)
+    price_max = price_estimate + margin
+
+    # Xác định text độ tin cậy
+    if test_r2 > 0.90:
+        confidence = "Rất cao (>90%)"
+    elif test_r2 > 0.80:
+        confidence = "Cao (>80%)"
+    else:
+        confidence = "Trung bình"
+
+    return PricePrediction(
+        price_estimate=round(price_estimate, 0),
+        price_min=round(price_min, 0),
+        price_max=round(price_max, 0),
+        confidence_level=confidence,
+        mae_estimate=round(test_mae, 0),
+        price_spread=round(price_spread, 0) if price_spread is not None else None,
+        expanded_count=expanded_count
+    )
+
+def predict_marginal(car: CarInput) -> Optional[PricePrediction]:
+    """
+    Định giá khi thiếu version/color: mở rộng thành mọi version/color đã biết của make/model/year,
+    chấm điểm cả batch trong 1 lần và lấy trung bình + độ lệch chuẩn theo số lượng tin đăng.
+    Trả về None nếu metadata không có tổ hợp phù hợp (caller dùng cách dự đoán thông thường).
+    """
+    if metadata is None:
+        return None
+
+    expansions = expand_partial(metadata, car.brand, car.model, car.year, car.version, car.color)
+    if not expansions:
+        return None
+
+    versions, colors, weights = zip(*expansions)
+    input_data = pd.DataFrame({
+        'make': car.brand,
+        'model': car.model,
+        'year': car.year,
+        'version': list(versions),
+        'color': list(colors),
+        'mileage': car.mileage_km,
+    })
+    prices = predict_frame(input_data)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    mean = float(np.average(prices, weights=weights))
+    spread = float(np.sqrt(np.average((prices - mean) ** 2, weights=weights)))
+    return build_prediction(mean, price_spread=spread, expanded_count=len(expansions))
+
 @app.post("/predict", response_model=PricePrediction)
 def predict_price(car: CarInput):
     """
@@ -107,6 +309,12 @@ def predict_price(car: CarInput):
         raise HTTPException(status_code=500, detail="Model chưa được load.")
     
     try:
+        # 0. Thiếu version/color và client yêu cầu -> định giá trung bình trên các tổ hợp đã biết
+        if car.expand_missing and (not car.version or not car.color):
+            prediction = predict_marginal(car)
+            if prediction is not None:
+                return prediction
+
         # 1. Chuẩn bị dữ liệu đầu vào dưới dạng DataFrame
         # Tên cột PHẢI KHỚP chính xác với lúc train trong file csv
         input_data = pd.DataFrame([{
@@ -121,32 +329,11 @@ def predict_price(car: CarInput):
         # Debug input
         # print(f"[DEBUG] Input DataFrame:\n{input_data}")
 
-        # 2. Dự đoán (Pipeline tự động xử lý NaN, Encode, Scale -> Predict)
-        price_estimate = float(model_pipeline.predict(input_data)[0])
+        # 2. Dự đoán (Bảng giá nếu có, nếu không Pipeline tự động xử lý NaN, Encode, Scale -> Predict)
+        price_estimate = float(predict_frame(input_data)[0])
 
         # 3. Tính toán khoảng giá và độ tin cậy
-        # Dùng hệ số an toàn 2.0 * MAE để bao phủ 95% trường hợp (theo quy tắc thống kê cơ bản)
-        # Tuy nhiên để user thấy khoảng hẹp hơn cho hấp dẫn, ta dùng 1.5 hoặc 1.0 tùy chiến lược
-        margin = test_mae * 1.5 
-        
-        price_min = max(0.0, price_estimate - margin)
-        price_max = price_estimate + margin
-        
-        # Xác định text độ tin cậy
-        if test_r2 > 0.90:
-            confidence = "Rất cao (>90%)"
-        elif test_r2 > 0.80:
-            confidence = "Cao (>80%)"
-        else:
-            confidence = "Trung bình"
-
-        return PricePrediction(
-            price_estimate=round(price_estimate, 0),
-            price_min=round(price_min, 0),
-            price_max=round(price_max, 0),
-            confidence_level=confidence,
-            mae_estimate=round(test_mae, 0)
-        )
+        return build_prediction(price_estimate)
 
     except Exception as e:
         import traceback
@@ -154,4 +341,90 @@ def predict_price(car: CarInput):
         raise HTTPException(
             status_code=500, 
             detail=f"Lỗi khi dự đoán: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@app.post("/parse-and-predict", response_model=List[ParsedListing])
+def parse_and_predict(batch: TitleBatch):
+    """
+    Parse tiêu đề tin đăng (1 hoặc nhiều) thành request định giá và dự đoán trong 1 batch.
+    Tiêu đề thiếu hãng/dòng/năm/số km sẽ có `error` thay vì `prediction`.
+    """
+    if model_pipeline is None:
+        raise HTTPException(status_code=500, detail="Model chưa được load.")
+    if title_parser is None:
+        raise HTTPException(status_code=500, detail="Parser tiêu đề chưa được khởi tạo (thiếu metadata.json).")
+
+    results = []
+    rows = []
+    row_owner = []
+    for title in batch.titles:
+        parsed = title_parser.parse(title)
+        item = ParsedListing(title=title, **parsed)
+        missing = [f for f in ('brand', 'model', 'year', 'mileage_km') if parsed[f] is None]
+        if missing:
+            item.error = f"Không nhận diện được: {', '.join(missing)}"
+        elif not 1990 <= parsed['year'] <= 2030:
+            item.error = f"Năm sản xuất không hợp lệ: {parsed['year']}"
+        else:
+            rows.append({
+                'make': parsed['brand'],
+                'model': parsed['model'],
+                'year': parsed['year'],
+                'version': parsed['version'] or "Unknown",
+                'color': parsed['color'] or "Unknown",
+                'mileage': parsed['mileage_km'],
+            })
+            row_owner.append(len(results))
+        results.append(item)
+
+    if rows:
+        try:
+            prices = predict_frame(pd.DataFrame(rows))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Lỗi khi dự đoán: {str(e)}")
+
+        for owner, price in zip(row_owner, prices):
+            results[owner].prediction = build_prediction(float(price))
+
+    return results
+
+@app.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+def autocomplete(q: str = Query(..., min_length=1, description="Chuỗi đang gõ (ví dụ: cam, camry 2.5)"),
+                 limit: int = Query(10, ge=1, le=MAX_AUTOCOMPLETE_LIMIT)):
+    """
+    Gợi ý hãng/dòng xe (kèm version) theo tiền tố của bất kỳ từ nào, không phân biệt hoa thường/dấu.
+    "cam" -> Toyota Camry + mọi version; "camry 2.5" -> chỉ các version bắt đầu bằng 2.5.
+    """
+    if autocomplete_index is None:
+        raise HTTPException(status_code=500, detail="Index autocomplete chưa được khởi tạo (thiếu metadata.json).")
+    return autocomplete_index.search(q, limit=limit)
+
+@app.get("/market-index", response_model=List[MarketSeries])
+def market_price_index(make: str, model: str, year: Optional[int] = Query(None, description="Bỏ trống: mọi năm"),
+                       since: Optional[str] = Query(None, description="Từ ngày scrape (YYYY-MM-DD)"),
+                       until: Optional[str] = Query(None, description="Tới ngày scrape (YYYY-MM-DD)"),
+                       min_count: int = Query(1, ge=1, description="Bỏ ngày có ít tin hơn")):
+    """
+    Giá rao thị trường theo ngày scrape (số tin, p25/median/p75) của make/model, từng năm sản xuất.
+    Tên hãng/dòng xe nhận alias như /predict.
+    """
+    if market_index is None:
+        raise HTTPException(status_code=500, detail="Chỉ số giá thị trường chưa được build (build_market_index.py).")
+
+    aliases = load_alias_table()
+    make = aliases.brand(make)
+    model = aliases.model(make, model)
+    years = [year] if year is not None else market_index.years.get((make, model), [])
+    try:
+        series = [MarketSeries(make=make, model=model, year=y,
+                               points=market_index.series(make, model, y, since=since, until=until, min_count=min_count))
+                  for y in years]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Ngày không hợp lệ: {e}")
+    series = [s for s in series if s.points]
+    if not series:
+        raise HTTPException(status_code=404, detail=f"Không có dữ liệu thị trường cho {make} {model}"
+                                                    + (f" {year}" if year is not None else ""))
+    return series
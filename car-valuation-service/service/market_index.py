@@ -0,0 +1,84 @@
+"""
+Chỉ số giá thị trường theo thời gian (build bằng build_market_index.py): số tin, p25 / median / p75 giá rao
+theo (make, model, year) cho từng ngày scrape.
+
+- File Parquet đã sắp theo make/model/year/ngày -> mỗi segment là 1 đoạn liên tiếp [start, stop) của các mảng
+  numpy; series() là 1 lần tra dict + searchsorted theo ngày, không lọc cả bảng.
+- Giá theo triệu VND như mọi nơi khác trong service.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+INDEX_PATH = BASE_DIR / "models" / "market_price_index.parquet"
+
+SEGMENT_COLUMNS = ['make', 'model', 'year']
+
+
+def _day(value) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+def load_index_frame(path: Path = INDEX_PATH) -> pd.DataFrame:
+    return pd.read_parquet(path)
+
+
+class MarketIndex:
+    """Tra chuỗi thời gian giá thị trường của 1 segment (make, model, year)"""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.dates = frame['scrape_date'].to_numpy(dtype='datetime64[D]')
+        self.count = frame['count'].to_numpy(dtype=np.int64)
+        self.p25 = frame['p25'].to_numpy(dtype=np.float64)
+        self.median = frame['median'].to_numpy(dtype=np.float64)
+        self.p75 = frame['p75'].to_numpy(dtype=np.float64)
+
+        # Segment -> đoạn [start, stop): frame đã sắp theo segment rồi ngày -> segment mới bắt đầu ở dòng đổi key
+        keys = frame[SEGMENT_COLUMNS].astype({'make': object, 'model': object, 'year': int}).to_numpy()
+        starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]) if len(keys) else np.array([], int)
+        stops = np.r_[starts[1:], len(keys)]
+        self.segments: Dict[Tuple[str, str, int], Tuple[int, int]] = {
+            (make, model, int(year)): (int(start), int(stop))
+            for (make, model, year), start, stop in zip(keys[starts].tolist(), starts, stops)}
+        if len(self.segments) != len(starts):
+            raise ValueError("❌ Index giá thị trường chưa sắp theo segment (build lại bằng build_market_index.py)")
+        self.years: Dict[Tuple[str, str], List[int]] = {}
+        for make, model, year in self.segments:
+            self.years.setdefault((make, model), []).append(year)
+
+    def __len__(self):
+        return len(self.segments)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH) -> Optional["MarketIndex"]:
+        """Mở index. None nếu chưa build (service vẫn chạy, chỉ không có /market-index)"""
+        if not path.exists():
+            return None
+        return cls(load_index_frame(path))
+
+    def _point(self, i: int) -> dict:
+        return {'scrape_date': str(self.dates[i]), 'count': int(self.count[i]), 'p25': float(self.p25[i]),
+                'median': float(self.median[i]), 'p75': float(self.p75[i])}
+
+    def series(self, make: str, model: str, year: int, since=None, until=None, min_count: int = 1) -> List[dict]:
+        """
+        Các điểm [{'scrape_date', 'count', 'p25', 'median', 'p75'}] của segment theo ngày tăng dần,
+        trong [since, until] và có ít nhất min_count tin. Segment không có -> [].
+        """
+        first, last = self.segments.get((make, model, int(year)), (0, 0))
+        dates = self.dates[first:last]
+        lo = np.searchsorted(dates, _day(since)) if since else 0
+        hi = np.searchsorted(dates, _day(until), side='right') if until else len(dates)
+        rows = np.arange(first + lo, first + hi)
+        return [self._point(i) for i in rows[self.count[rows] >= min_count]]
+
+    def latest(self, make: str, model: str, year: int, min_count: int = 1) -> Optional[dict]:
+        """Điểm gần nhất có ít nhất min_count tin (giá thị trường hiện tại của segment)"""
+        first, last = self.segments.get((make, model, int(year)), (0, 0))
+        for i in range(last - 1, first - 1, -1):
+            if self.count[i] >= min_count:
+                return self._point(i)
+        return None
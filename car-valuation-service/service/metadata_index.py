@@ -0,0 +1,53 @@
+"""
+Đọc metadata.json (make -> model -> year -> version -> color) và duyệt các tổ hợp đã biết.
+Dùng chung cho service và các script build (price table, ...).
+"""
+import json
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+METADATA_PATH = BASE_DIR / "metadata.json"
+
+Combination = Tuple[str, str, int, str, str]
+
+
+def load_metadata(path: Path = METADATA_PATH) -> dict:
+    """Load metadata.json do extract_metadata.py sinh ra"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_combinations(metadata: dict) -> Iterator[Combination]:
+    """
+    Duyệt toàn bộ tổ hợp (make, model, year, version, color) theo thứ tự đã sắp xếp trong metadata.
+    Year trong JSON là string key -> trả về int.
+    """
+    version_colors = metadata.get('version_colors', {})
+    for make, models in version_colors.items():
+        for model, years in models.items():
+            for year, versions in years.items():
+                for version, colors in versions.items():
+                    for color in colors:
+                        yield make, model, int(year), version, color
+
+
+def expand_partial(metadata: dict, make: str, model: str, year: int,
+                   version: Optional[str] = None, color: Optional[str] = None) -> List[Tuple[str, str, float]]:
+    """
+    Mở rộng request thiếu version/color thành mọi (version, color) đã biết của make/model/year.
+    Trọng số = số tin đăng của tổ hợp (combo_counts), mặc định 1 nếu metadata chưa có số đếm.
+    Trả về list rỗng nếu không có tổ hợp nào khớp.
+    """
+    versions = metadata.get('version_colors', {}).get(make, {}).get(model, {}).get(str(year), {})
+    counts = metadata.get('combo_counts', {}).get(make, {}).get(model, {}).get(str(year), {})
+
+    expansions = []
+    for v, colors in versions.items():
+        if version is not None and v != version:
+            continue
+        for c in colors:
+            if color is not None and c != color:
+                continue
+            expansions.append((v, c, float(counts.get(v, {}).get(c, 1))))
+    return expansions
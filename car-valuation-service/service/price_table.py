@@ -0,0 +1,134 @@
+"""
+Bảng giá tính sẵn (dense price table) cho các tổ hợp xe đã biết trong metadata.json.
+
+- Mỗi tổ hợp (make, model, year, version, color) là 1 hàng, mỗi cột là 1 mốc km trong MILEAGE_GRID.
+- Ma trận float32 lưu dạng .npy và được mở bằng memory-map khi serving.
+- File index (JSON) chứa danh sách key, lưới km và fingerprint của model đã dùng để build.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from service.metadata_index import Combination
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+TABLE_PATH = BASE_DIR / "models" / "price_table.npy"
+INDEX_PATH = BASE_DIR / "models" / "price_table_index.json"
+
+# Lưới km: 0 -> 500.000 km, bước 10.000 km (khớp với ngưỡng lọc mileage trong clean_data.py)
+MILEAGE_GRID = np.arange(0, 500_001, 10_000, dtype=np.float64)
+
+KEY_SEP = "\t"
+
+
+def make_key(make, model, year, version, color) -> str:
+    """Key dạng text cho 1 tổ hợp, dùng chung cho lúc build và lúc tra cứu"""
+    return KEY_SEP.join([str(make), str(model), str(int(year)), str(version), str(color)])
+
+
+def model_fingerprint(model_path: Path) -> str:
+    """Hash nội dung file model - bảng giá chỉ hợp lệ khi fingerprint khớp với model đang load"""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_price_table(pipeline, combos: List[Combination],
+                      mileage_grid: np.ndarray = MILEAGE_GRID) -> np.ndarray:
+    """
+    Chấm điểm toàn bộ tổ hợp x lưới km trong 1 lần predict (batch).
+    Trả về ma trận float32 shape (len(combos), len(mileage_grid)).
+    """
+    n_grid = len(mileage_grid)
+    frame = pd.DataFrame(combos, columns=['make', 'model', 'year', 'version', 'color'])
+    frame = frame.loc[frame.index.repeat(n_grid)].reset_index(drop=True)
+    frame['mileage'] = np.tile(mileage_grid, len(combos))
+
+    prices = pipeline.predict(frame)
+    return np.asarray(prices, dtype=np.float32).reshape(len(combos), n_grid)
+
+
+def save_price_table(table: np.ndarray, keys: List[str], mileage_grid: np.ndarray,
+                     fingerprint: str, table_path: Path = TABLE_PATH,
+                     index_path: Path = INDEX_PATH) -> None:
+    np.save(table_path, table.astype(np.float32, copy=False))
+    index = {
+        'model_fingerprint': fingerprint,
+        'mileage_grid': [float(m) for m in mileage_grid],
+        'keys': keys,
+    }
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+
+
+class PriceTable:
+    """Tra cứu giá theo key + nội suy tuyến tính theo km trên ma trận memory-mapped"""
+
+    def __init__(self, table: np.ndarray, keys: Iterable[str], mileage_grid: np.ndarray):
+        self.table = table
+        self.mileage_grid = np.asarray(mileage_grid, dtype=np.float64)
+        self.row_of = {key: i for i, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.row_of)
+
+    @classmethod
+    def load(cls, table_path: Path = TABLE_PATH, index_path: Path = INDEX_PATH,
+             expected_fingerprint: Optional[str] = None) -> Optional["PriceTable"]:
+        """
+        Mở bảng giá. Trả về None nếu thiếu file hoặc bảng được build từ model khác
+        (khi đó service sẽ dùng model trực tiếp).
+        """
+        if not table_path.exists() or not index_path.exists():
+            return None
+
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        if expected_fingerprint and index.get('model_fingerprint') != expected_fingerprint:
+            print("⚠️ Bảng giá được build từ model khác, bỏ qua. Hãy chạy lại build_price_table.py")
+            return None
+
+        table = np.load(table_path, mmap_mode='r')
+        if table.shape != (len(index['keys']), len(index['mileage_grid'])):
+            print(f"⚠️ Kích thước bảng giá không khớp index: {table.shape}, bỏ qua.")
+            return None
+
+        return cls(table, index['keys'], index['mileage_grid'])
+
+    def lookup_many(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Tra cứu cho nhiều dòng (cột make/model/year/version/color/mileage).
+        Dòng không có trong bảng hoặc km nằm ngoài lưới -> NaN để caller fallback sang model.
+        """
+        result = np.full(len(frame), np.nan, dtype=np.float64)
+        if len(frame) == 0:
+            return result
+
+        rows = np.fromiter(
+            (self.row_of.get(make_key(*combo), -1) for combo in zip(
+                frame['make'], frame['model'], frame['year'], frame['version'], frame['color'])),
+            dtype=np.int64, count=len(frame))
+        mileage = frame['mileage'].to_numpy(dtype=np.float64)
+
+        grid = self.mileage_grid
+        hit = (rows >= 0) & (mileage >= grid[0]) & (mileage <= grid[-1])
+        if not hit.any():
+            return result
+
+        m = mileage[hit]
+        # Chỉ số mốc bên trái, giới hạn để luôn có mốc bên phải
+        left = np.clip(np.searchsorted(grid, m, side='right') - 1, 0, len(grid) - 2)
+        weight = (m - grid[left]) / (grid[left + 1] - grid[left])
+
+        r = rows[hit]
+        lo = self.table[r, left]
+        hi = self.table[r, left + 1]
+        result[hit] = lo + (hi - lo) * weight
+        return result
@@ -0,0 +1,112 @@
+"""
+Router cho model theo từng hãng (shard), build bằng train_shards.py.
+
+- models/shards/index.json: make -> file pipeline + metrics của shard.
+- Shard chỉ được load khi có request đầu tiên của hãng đó (lazy), giữ tối đa max_loaded shard trong RAM
+  theo LRU; shard không dùng quá idle_seconds cũng bị giải phóng.
+- Hãng không có shard -> caller dùng model tổng (fallback).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SHARD_DIR = BASE_DIR / "models" / "shards"
+SHARD_INDEX_NAME = "index.json"
+
+
+def shard_file_name(make: str) -> str:
+    """Tên file an toàn cho 1 hãng (Mercedes-Benz -> mercedes-benz.pkl)"""
+    slug = "".join(ch if ch.isalnum() or ch == '-' else '_' for ch in make.strip().lower())
+    return f"{slug}.pkl"
+
+
+class ShardRouter:
+    def __init__(self, index: Dict[str, dict], shard_dir: Path = SHARD_DIR,
+                 max_loaded: int = 3, idle_seconds: Optional[float] = None):
+        self.index = index
+        self.shard_dir = Path(shard_dir)
+        self.max_loaded = max(1, max_loaded)
+        self.idle_seconds = idle_seconds
+        self._loaded: "OrderedDict[str, tuple]" = OrderedDict()   # make -> (pipeline, last_used)
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    @classmethod
+    def load(cls, shard_dir: Path = SHARD_DIR, **kwargs) -> Optional["ShardRouter"]:
+        """Đọc index của các shard. Trả về None nếu chưa train shard nào."""
+        index_path = Path(shard_dir) / SHARD_INDEX_NAME
+        if not index_path.exists():
+            return None
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if not index.get('shards'):
+            return None
+        return cls(index['shards'], shard_dir=shard_dir, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, make: str) -> bool:
+        return make in self.index
+
+    @property
+    def loaded_makes(self):
+        return list(self._loaded)
+
+    def get(self, make: str):
+        """Pipeline của hãng (load nếu chưa có), None nếu hãng không có shard"""
+        entry = self.index.get(make)
+        if entry is None:
+            return None
+
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+            if make in self._loaded:
+                pipeline, _ = self._loaded.pop(make)
+            else:
+                pipeline = joblib.load(self.shard_dir / entry['file'])
+                self.loads += 1
+            self._loaded[make] = (pipeline, now)
+
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+                self.evictions += 1
+            return pipeline
+
+    def _evict_idle(self, now: float) -> None:
+        if self.idle_seconds is None:
+            return
+        for make in [m for m, (_, used) in self._loaded.items() if now - used > self.idle_seconds]:
+            del self._loaded[make]
+            self.evictions += 1
+
+    def evict(self, make: Optional[str] = None) -> int:
+        """Giải phóng 1 shard (hoặc tất cả nếu make=None). Trả về số shard đã giải phóng."""
+        with self._lock:
+            makes = [make] if make is not None else list(self._loaded)
+            evicted = sum(self._loaded.pop(m, None) is not None for m in makes)
+            self.evictions += evicted
+            return evicted
+
+    def predict(self, input_data: pd.DataFrame, fallback: Callable[[pd.DataFrame], np.ndarray]) -> np.ndarray:
+        """Gom dòng theo hãng, mỗi hãng predict 1 lần bằng shard; hãng không có shard -> fallback"""
+        prices = np.full(len(input_data), np.nan)
+        makes = input_data['make'].to_numpy()
+        for make in pd.unique(makes):
+            rows = makes == make
+            pipeline = self.get(make)
+            if pipeline is None:
+                prices[rows] = fallback(input_data[rows])
+            else:
+                prices[rows] = pipeline.predict(input_data[rows])
+        return prices
@@ -0,0 +1,356 @@
+"""
+Parser dùng chung cho tiêu đề tin đăng (scrapers + valuation service).
+
+- Các hàm extract_* / parse_* giữ nguyên hành vi của bản copy trong scraping/ nhưng dùng regex biên dịch sẵn.
+- TitleParser: chuẩn hoá tiêu đề về vocabulary đã biết (metadata.json) để tạo request định giá.
+  Ví dụ: "Toyota Vios 1.5G 2019 - 45000 km" -> Toyota / Vios / 2019 / 1.5G / 45000 km
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from service.aliases import AliasTable, load_alias_table
+
+# ----------------- REGEX BIÊN DỊCH SẴN -----------------
+_PRICE_TY_TRIEU_RE = re.compile(r'(\d+(?:\.\d+)?)\s*tỷ\s*(\d+)?\s*triệu?')
+_PRICE_TY_RE = re.compile(r'(\d+(?:\.\d+)?)\s*tỷ')
+_PRICE_TRIEU_RE = re.compile(r'(\d+)\s*triệu')
+_DIGITS_RE = re.compile(r'(\d+)')
+_PRICE_UNIT_RE = re.compile(r'tỷ|triệu|đ')
+
+_MILEAGE_VAN_RE = re.compile(r'([\d,\.]+)\s*vạn\s*km')
+_MILEAGE_KM_RE = re.compile(r'([\d,\.]+)\s*km')
+_MILEAGE_NUM_RE = re.compile(r'(\d{4,})')
+
+_YEAR_RE = re.compile(r'(?<![\d.,])((?:19|20)\d{2})(?![\d.,]|\s*km)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_TRAILING_DASH_RE = re.compile(r'\s*-\s*$')
+_NOISE_AFTER_VERSION_RE = re.compile(
+    r'\s+(Japan|chính chủ|cavet|chủ|màu|xe|chỗ|số|tự động|chạy|xăng|km).*$', re.IGNORECASE)
+_NOISE_AFTER_VERSION_WITH_BAN_RE = re.compile(
+    r'\s+(màu|xe|chỗ|số|tự động|chạy|xăng|km|Japan|chính chủ|cavet|chủ|Bán).*$', re.IGNORECASE)
+_LEADING_TWO_NUMBERS_RE = re.compile(r'^\d+\s+\d+\s+')
+_LEADING_NUMBER_RE = re.compile(r'^\d+\s+')
+_VERSION_BEFORE_YEAR_DASH_RE = re.compile(r'(.+?)\s+(20\d{2})\s*-')
+_VERSION_BEFORE_YEAR_RE = re.compile(r'([\d\.]+\s*[A-Z]+(?:\s+[A-Z]+)?)\s+(20\d{2})', re.IGNORECASE)
+_VERSION_TOKEN_RE = re.compile(r'([\d\.]+\s*[A-Z]+(?:\s+[A-Z]+)?)')
+_HAS_DIGIT_RE = re.compile(r'\d')
+
+COLOR_MAP = {
+    'trắng': 'Trắng',
+    'đen': 'Đen',
+    'bạc': 'Bạc',
+    'xám': 'Xám',
+    'ghi': 'Ghi',
+    'đỏ': 'Đỏ',
+    'xanh': 'Xanh',
+    'vàng': 'Vàng',
+    'cát': 'Cát',
+    'nâu': 'Nâu',
+    'bạch kim': 'Bạch kim',
+    'xanh dương': 'Xanh dương',
+    'xanh lá': 'Xanh lá',
+}
+
+
+@lru_cache(maxsize=4096)
+def _make_model_patterns(make_str: str, model_str: str):
+    """Regex phụ thuộc make/model - biên dịch 1 lần cho mỗi cặp"""
+    make_model = rf"{re.escape(make_str)}\s+{re.escape(model_str)}\s+"
+    return (
+        re.compile(rf"(?:Bán\s+)?{make_model}(.+?)\s+(20\d{{2}})", re.IGNORECASE),
+        re.compile(rf"{make_model}([\d\.]+\s*[A-Z]+(?:\s+[A-Z]+)?)", re.IGNORECASE),
+        re.compile(make_model, re.IGNORECASE),
+    )
+
+
+# ----------------- HÀM EXTRACT (dùng chung với scrapers) -----------------
+def extract_price_vnd(text):
+    """Trích xuất giá theo triệu VND từ text (ví dụ: "435.000.000 đ" -> 435)"""
+    if not text:
+        return None
+
+    text = str(text).lower()
+
+    # Pattern 1: "1 tỷ 200 triệu" hoặc "1 tỷ 420 triệu"
+    match = _PRICE_TY_TRIEU_RE.search(text)
+    if match:
+        ty = float(match.group(1))
+        tr = int(match.group(2)) if match.group(2) else 0
+        return int(ty * 1000 + tr)
+
+    # Pattern 2: "1.42 tỷ" hoặc "1 tỷ"
+    match = _PRICE_TY_RE.search(text)
+    if match:
+        return int(float(match.group(1)) * 1000)
+
+    # Pattern 3: "250 triệu" hoặc "420 triệu"
+    match = _PRICE_TRIEU_RE.search(text)
+    if match:
+        return int(match.group(1))
+
+    # Pattern 4: "435.000.000 đ" hoặc "500.000.000"
+    text_clean = text.replace('.', '').replace(',', '').replace(' ', '').replace('đ', '')
+    match = _DIGITS_RE.search(text_clean)
+    if match:
+        # Chuyển từ VND sang triệu VND
+        price_million = int(match.group(1)) // 1000000
+        return price_million if price_million > 0 else None
+
+    return None
+
+
+def parse_mileage_km(text) -> Optional[int]:
+    """Số km (int) từ text có đơn vị rõ ràng: "5 vạn km", "50.000 km", "50000 km" """
+    if not text:
+        return None
+
+    text = str(text).lower()
+
+    # Pattern 1: "5 vạn km" hoặc "5.5 vạn km" -> 50000 km
+    match_van = _MILEAGE_VAN_RE.search(text)
+    if match_van:
+        num_str = match_van.group(1).replace(',', '.').replace(' ', '')
+        try:
+            return int(float(num_str) * 10000)
+        except ValueError:
+            pass
+
+    # Pattern 2: "50,000 km" hoặc "50.000 km" hoặc "50000 km"
+    match_km = _MILEAGE_KM_RE.search(text)
+    if match_km:
+        num_str = match_km.group(1).replace(',', '').replace('.', '')
+        try:
+            return int(num_str)
+        except ValueError:
+            pass
+
+    return None
+
+
+def extract_mileage_from_text(text):
+    """Trích xuất số km từ text, trả về format "XXXXX km" """
+    if not text:
+        return None
+
+    km = parse_mileage_km(text)
+    if km is not None:
+        return f"{km} km"
+
+    # Pattern 3: Chỉ có số (không có "km") - giả định là km nếu số lớn hơn 1000
+    match_num = _MILEAGE_NUM_RE.search(str(text).lower())
+    if match_num:
+        num = int(match_num.group(1))
+        if num >= 1000:
+            return f"{num} km"
+
+    return None
+
+
+def parse_color_from_text(text):
+    """Parse màu sắc từ text"""
+    if not text:
+        return None
+
+    text_lower = str(text).lower()
+    for key, value in COLOR_MAP.items():
+        if key in text_lower:
+            return value
+
+    return None
+
+
+def extract_version_from_title(title, make, model):
+    """
+    Extract version từ title
+    Format thường gặp: "{Make} {Model} {Version} {Year} - {Mileage}" hoặc "{Version} {Year} - {Mileage}"
+
+    Examples:
+    - "2 54 2013 2.5G - 127000 km" -> "2.5G"
+    - "Toyota Camry 2.5G 2013 - 127000 km" -> "2.5G"
+    - "Toyota Vios 2023 1.5G 5390 km" -> "1.5G"
+    - "Bán Toyota Corolla 2009 Japan chính chủ cavet" -> None (không có version rõ ràng)
+    """
+    if not title:
+        return None
+
+    title = str(title).strip()
+    patterns = None
+
+    # Pattern 1: "Toyota Model Version Year" hoặc "Model Version Year"
+    if make and model:
+        patterns = _make_model_patterns(str(make).strip(), str(model).strip())
+
+        match = patterns[0].search(title)
+        if match:
+            version = _TRAILING_DASH_RE.sub('', match.group(1).strip())
+            version = _NOISE_AFTER_VERSION_RE.sub('', version).strip()
+            if version and (_HAS_DIGIT_RE.search(version) or len(version) <= 10):
+                return version
+
+        # Pattern 1b: "Toyota Model Version" (không có năm)
+        match = patterns[1].search(title)
+        if match:
+            version = _NOISE_AFTER_VERSION_WITH_BAN_RE.sub('', match.group(1).strip()).strip()
+            if version and (_HAS_DIGIT_RE.search(version) or len(version) <= 15):
+                return version
+
+    # Pattern 2: Format "2 54 2013 2.5G - 127000 km" (có số ở đầu)
+    title_clean = _LEADING_TWO_NUMBERS_RE.sub('', title)
+    title_clean = _LEADING_NUMBER_RE.sub('', title_clean)
+
+    match = _VERSION_BEFORE_YEAR_DASH_RE.search(title_clean)
+    if match:
+        before_year = match.group(1).strip()
+        if patterns is not None:
+            before_year = patterns[2].sub('', before_year)
+
+        version = _NOISE_AFTER_VERSION_WITH_BAN_RE.sub('', before_year.strip()).strip()
+        if version and (_HAS_DIGIT_RE.search(version) or len(version) <= 10):
+            return version
+
+    # Pattern 3: số + chữ cái ngay trước năm (như "1.5G 2023")
+    match = _VERSION_BEFORE_YEAR_RE.search(title)
+    if match:
+        return match.group(1).strip()
+
+    # Pattern 4: số + chữ cái đơn giản (như "1.5G", "2.5G") trong text
+    if make and model:
+        for candidate in _VERSION_TOKEN_RE.findall(title):
+            candidate = candidate.strip()
+            if _HAS_DIGIT_RE.search(candidate) and len(candidate) <= 15:
+                candidate = _NOISE_AFTER_VERSION_WITH_BAN_RE.sub('', candidate).strip()
+                if candidate:
+                    return candidate
+
+    return None
+
+
+# ----------------- PARSER THEO VOCABULARY -----------------
+def _fold(text: str) -> str:
+    """Key so khớp: bỏ khoảng trắng, không phân biệt hoa thường ("1.5 G" == "1.5g")"""
+    return _WHITESPACE_RE.sub('', text).lower()
+
+
+def _alternation(names) -> str:
+    """Regex OR các tên (dài trước để ưu tiên "Corolla Cross" hơn "Corolla"), cho phép khoảng trắng linh hoạt"""
+    parts = []
+    for name in sorted(set(names), key=len, reverse=True):
+        tokens = [re.escape(t) for t in name.split()]
+        parts.append(r'\s+'.join(tokens))
+    return r'(?<![\w])(' + '|'.join(parts) + r')(?![\w])'
+
+
+def _version_alternation(versions) -> str:
+    """Như _alternation nhưng cho phép có/không có khoảng trắng giữa mọi ký tự ("1.5G" khớp "1.5 G")"""
+    parts = []
+    for key in sorted({_fold(v) for v in versions}, key=len, reverse=True):
+        parts.append(r'\s*'.join(re.escape(ch) for ch in key))
+    return r'(?<![\w.])(' + '|'.join(parts) + r')(?![\w.])'
+
+
+class TitleParser:
+    """
+    Parser tiêu đề -> request định giá, chuẩn hoá theo vocabulary của metadata.json.
+    Mọi regex được biên dịch 1 lần khi khởi tạo, parse() chỉ chạy vài lần search trên 1 tiêu đề.
+    """
+
+    def __init__(self, metadata: dict, aliases: Optional[AliasTable] = None):
+        self.year_versions = metadata.get('year_versions', {})
+        make_models: Dict[str, List[str]] = metadata.get('make_models', {})
+        aliases = aliases if aliases is not None else load_alias_table()
+
+        # Tên trong metadata + alias của các tên đó (service/aliases.json): "Toyota Altis 1.8G" -> Corolla Altis
+        make_names = {make: make for make in metadata.get('makes', [])}
+        make_names.update({alias: make for alias, make in aliases.brand_aliases() if make in make_names})
+        self._make_by_key = {_fold(name): make for name, make in make_names.items()}
+        self._make_re = re.compile(_alternation(make_names), re.IGNORECASE)
+
+        self._model_re = {}
+        self._model_by_key = {}
+        for make, models in make_models.items():
+            if models:
+                model_names = {m: m for m in models}
+                model_names.update({alias: m for alias, m in aliases.model_aliases(make) if m in model_names})
+                self._model_re[make] = re.compile(_alternation(model_names), re.IGNORECASE)
+                self._model_by_key[make] = {_fold(name): m for name, m in model_names.items()}
+
+        self._version_re = {}
+        self._version_by_key = {}
+        for make, models in self.year_versions.items():
+            for model, years in models.items():
+                versions = {v for vs in years.values() for v in vs}
+                if not versions:
+                    continue
+                self._version_re[(make, model)] = re.compile(_version_alternation(versions), re.IGNORECASE)
+                by_key: Dict[str, List[str]] = {}
+                for v in sorted(versions):
+                    by_key.setdefault(_fold(v), []).append(v)
+                self._version_by_key[(make, model)] = by_key
+
+        self._colors = {c for models in metadata.get('version_colors', {}).values()
+                        for years in models.values() for versions in years.values()
+                        for colors in versions.values() for c in colors}
+
+    def _find_model(self, title: str, make: Optional[str]):
+        if make is not None:
+            match = self._model_re[make].search(title) if make in self._model_re else None
+            return make, (self._model_by_key[make][_fold(match.group(1))] if match else None), match
+
+        # Tiêu đề không ghi hãng ("Vios 1.5G 2019") -> thử model của từng hãng
+        for candidate_make, model_re in self._model_re.items():
+            match = model_re.search(title)
+            if match:
+                return candidate_make, self._model_by_key[candidate_make][_fold(match.group(1))], match
+        return None, None, None
+
+    def _canonical_version(self, make, model, year, title_rest: str) -> Optional[str]:
+        version_re = self._version_re.get((make, model))
+        if version_re is not None:
+            match = version_re.search(title_rest)
+            if match:
+                candidates = self._version_by_key[(make, model)][_fold(match.group(1))]
+                known_this_year = self.year_versions[make][model].get(str(year), []) if year else []
+                for v in candidates:
+                    if v in known_this_year:
+                        return v
+                return candidates[0]
+
+        # Version chưa có trong vocabulary -> giữ kết quả heuristic (model sẽ coi là category lạ)
+        return extract_version_from_title(title_rest, make, model) if make and model else None
+
+    def parse(self, title: str) -> dict:
+        text = _WHITESPACE_RE.sub(' ', str(title or '')).strip()
+
+        match = self._make_re.search(text)
+        make = self._make_by_key[_fold(match.group(1))] if match else None
+        make, model, model_match = self._find_model(text, make)
+
+        # Phần sau tên model chứa version/year/km
+        rest = text[model_match.end():] if model_match else text
+        mileage_km = parse_mileage_km(rest)
+
+        year_match = _YEAR_RE.search(rest)
+        year = int(year_match.group(1)) if year_match else None
+
+        version = self._canonical_version(make, model, year, rest) if model else None
+
+        color = parse_color_from_text(text)
+        if color is not None and self._colors and color not in self._colors:
+            color = None
+
+        price = extract_price_vnd(text) if _PRICE_UNIT_RE.search(text.lower()) else None
+
+        return {
+            'brand': make,
+            'model': model,
+            'year': year,
+            'version': version,
+            'color': color,
+            'mileage_km': mileage_km,
+            'listed_price': price,
+        }
+
+    def parse_many(self, titles: List[str]) -> List[dict]:
+        return [self.parse(t) for t in titles]
@@ -0,0 +1,246 @@
+"""
+Chạy grid search của TẤT CẢ model trên 1 pool process chung với giới hạn số core.
+
+Trước đây mỗi model chạy GridSearchCV(n_jobs=-1) lần lượt: Linear/Ridge chỉ có vài task nên phần lớn core
+ngồi chơi, còn RandomForest/XGBoost thì tranh core với nhau. Ở đây:
+- Mỗi (model, bộ tham số, fold) là 1 task; mọi task vào chung 1 hàng đợi, tối đa `cores` task chạy cùng lúc,
+  mỗi task dùng đúng 1 luồng (threadpoolctl giới hạn BLAS/OpenMP).
+- Task nặng (cost cao) được đưa vào trước, task nhẹ lấp chỗ trống ở cuối (longest-processing-time first).
+- Dữ liệu ghi 1 lần ra .npy (category -> mã int32, numeric float64) và mỗi worker mở bằng memory-map,
+  không pickle DataFrame cho từng task.
+- Ghi lại thời gian từng task (fit/score, pid, thời điểm bắt đầu/kết thúc) để xem tải của pool. Mức tận dụng
+  core tính bằng CPU time của worker (time.process_time), không phải wall time: worker nhiều hơn số core
+  thật thì wall time của các task chồng lên nhau (chờ CPU) chứ không phải core bận thêm.
+"""
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import KFold, ParameterGrid
+
+from model_search import SearchResult, fit_stats, summarize_scores
+from search_cache import pipeline_fingerprint
+from training_profiler import measure
+
+
+@dataclass
+class ModelSpec:
+    pipeline: object
+    param_grid: dict
+    cost: float = 1.0        # ước lượng độ nặng tương đối của 1 task, dùng để xếp thứ tự
+
+
+class SharedDataset:
+    """DataFrame (category + numeric) + target lưu dạng .npy để các worker mở bằng memory-map"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "schema.json", 'r', encoding='utf-8') as f:
+            self.schema = json.load(f)
+
+    @classmethod
+    def write(cls, X: pd.DataFrame, y, directory: Path) -> "SharedDataset":
+        directory = Path(directory)
+        schema = {'columns': list(X.columns), 'categories': {}}
+        for col in X.columns:
+            if pd.api.types.is_numeric_dtype(X[col]):
+                np.save(directory / f"{col}.npy", X[col].to_numpy(dtype=np.float64))
+            else:
+                codes, categories = pd.factorize(X[col], sort=True)
+                np.save(directory / f"{col}.npy", codes.astype(np.int32))
+                schema['categories'][col] = categories.astype(str).tolist()
+        np.save(directory / "__target__.npy", np.asarray(y, dtype=np.float64))
+        with open(directory / "schema.json", 'w', encoding='utf-8') as f:
+            json.dump(schema, f, ensure_ascii=False)
+        return cls(directory)
+
+    def load(self):
+        """(X, y) với cột numeric/target là memmap; cột category dựng lại thành object (NaN giữ nguyên)"""
+        columns = {}
+        for col in self.schema['columns']:
+            values = np.load(self.directory / f"{col}.npy", mmap_mode='r')
+            categories = self.schema['categories'].get(col)
+            if categories is None:
+                columns[col] = values
+            else:
+                lookup = np.asarray(categories + [np.nan], dtype=object)
+                columns[col] = lookup[values]          # mã -1 (thiếu) -> phần tử cuối = NaN
+        # copy=False: cột numeric vẫn trỏ vào memmap, không nhân bản trong mỗi worker
+        X = pd.DataFrame(columns, columns=self.schema['columns'], copy=False)
+        y = np.load(self.directory / "__target__.npy", mmap_mode='r')
+        return X, y
+
+
+# --- Worker ---
+_worker_data = None
+_worker_folds = None
+
+
+def _init_worker(dataset_dir: str, cv: int):
+    """Chạy 1 lần trong mỗi process: mở dataset (memmap), tự tính fold, giới hạn 1 luồng/process"""
+    global _worker_data, _worker_folds
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+    _worker_data = SharedDataset(Path(dataset_dir)).load()
+    _worker_folds = list(KFold(n_splits=cv).split(np.arange(len(_worker_data[1]))))
+
+
+def _run_task(task: dict) -> dict:
+    X, y = _worker_data
+    started = time.time()
+    estimator = clone(task['pipeline']).set_params(**task['params'])
+
+    if task['fold'] is None:
+        # Refit bộ tham số tốt nhất trên toàn bộ dữ liệu
+        with measure() as stats:
+            estimator.fit(X, y)
+        return {**_task_info(task), **fit_stats(stats), 'n_train': int(len(y)), 'score_s': 0.0, 'score_cpu_s': 0.0,
+                'started': started, 'finished': time.time(), 'pid': os.getpid(), 'estimator': estimator}
+
+    train_idx, test_idx = _worker_folds[task['fold']]
+    with measure() as stats:
+        estimator.fit(X.iloc[train_idx], y[train_idx])
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    score = -mean_absolute_error(y[test_idx], estimator.predict(X.iloc[test_idx]))
+    return {**_task_info(task), 'score': float(score), **fit_stats(stats), 'n_train': int(len(train_idx)),
+            'score_s': time.perf_counter() - start, 'score_cpu_s': time.process_time() - cpu_start,
+            'started': started, 'finished': time.time(), 'pid': os.getpid()}
+
+
+def _task_info(task: dict) -> dict:
+    return {'model': task['model'], 'params': task['params'], 'fold': task['fold']}
+
+
+# --- Orchestrator ---
+def _run_pool(tasks: List[dict], dataset_dir: Path, cores: int, cv: int, on_error) -> List[dict]:
+    results = []
+    if not tasks:
+        return results
+    with ProcessPoolExecutor(max_workers=cores, initializer=_init_worker,
+                             initargs=(str(dataset_dir), cv)) as pool:
+        futures = {pool.submit(_run_task, task): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                on_error(task['model'], e)
+    return results
+
+
+def orchestrated_grid_search(specs: Dict[str, ModelSpec], X: pd.DataFrame, y, *, cores: Optional[int] = None,
+                             cv: int = 3, cache=None, verbose: bool = True):
+    """
+    Grid search mọi model trên 1 pool chung. Trả về (dict tên model -> SearchResult hoặc Exception, báo cáo).
+    Fold giống grid_search (KFold không xáo trộn) nên dùng chung cache với model_search.
+    """
+    cores = max(1, cores or os.cpu_count() or 1)
+    splitter = KFold(n_splits=cv)
+    errors: Dict[str, Exception] = {}
+    evaluations: Dict[str, List[dict]] = {name: [] for name in specs}
+
+    def on_error(model_name, error):
+        errors.setdefault(model_name, error)
+
+    # 1. Tách task: bộ tham số có trong cache thì không cần chạy
+    tasks = []
+    for name, spec in specs.items():
+        fingerprint = pipeline_fingerprint(spec.pipeline) if cache is not None else None
+        for params in ParameterGrid(spec.param_grid):
+            hit = cache.get(name, fingerprint, params, splitter, len(y)) if cache is not None else None
+            if hit is not None:
+                evaluations[name].append(summarize_scores(params, hit['fold_scores'], hit['fit_times'], cached=True))
+                continue
+            for fold in range(cv):
+                tasks.append({'model': name, 'params': params, 'fold': fold, 'pipeline': spec.pipeline,
+                              'cost': spec.cost})
+    tasks.sort(key=lambda t: t['cost'], reverse=True)
+
+    run_start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="car_valuation_dataset_") as tmp:
+        SharedDataset.write(X, y, Path(tmp))
+        if verbose:
+            print(f"\n      {len(tasks)} task CV trên {cores} core", end="", flush=True)
+        cv_results = _run_pool(tasks, Path(tmp), cores, cv, on_error)
+
+        # 2. Gom điểm theo (model, params), ghi cache, chọn bộ tốt nhất mỗi model
+        grouped: Dict[tuple, List[dict]] = {}
+        for r in cv_results:
+            grouped.setdefault((r['model'], json.dumps(r['params'], sort_keys=True, default=str)), []).append(r)
+        for (name, _), runs in grouped.items():
+            if name in errors or len(runs) != cv:
+                continue
+            runs.sort(key=lambda r: r['fold'])
+            folds = [{k: r[k] for k in ('fold', 'n_train', 'score', 'fit_s', 'cpu_s', 'peak_rss_mb', 'peak_scope',
+                                         'score_s', 'pid')} for r in runs]
+            evaluation = summarize_scores(runs[0]['params'], [r['score'] for r in runs], [r['fit_s'] for r in runs],
+                                          cached=False, folds=folds)
+            evaluations[name].append(evaluation)
+            if cache is not None:
+                cache.put(name, pipeline_fingerprint(specs[name].pipeline), evaluation['params'], splitter,
+                          len(y), evaluation['fold_scores'], evaluation['fit_times'])
+
+        best = {name: max(evals, key=lambda r: r['mean_score'])
+                for name, evals in evaluations.items() if evals and name not in errors}
+
+        # 3. Refit bộ tốt nhất của mọi model, cũng song song trên cùng pool
+        refit_tasks = sorted(({'model': name, 'params': b['params'], 'fold': None,
+                               'pipeline': specs[name].pipeline, 'cost': specs[name].cost}
+                              for name, b in best.items()), key=lambda t: t['cost'], reverse=True)
+        if verbose:
+            print(f" + {len(refit_tasks)} refit", end="", flush=True)
+        refit_results = _run_pool(refit_tasks, Path(tmp), cores, cv, on_error)
+    wall_s = time.perf_counter() - run_start
+
+    searches = {name: error for name, error in errors.items()}
+    for r in refit_results:
+        name = r['model']
+        if name in errors:
+            continue
+        refit_stats = {k: r[k] for k in ('fit_s', 'cpu_s', 'peak_rss_mb', 'peak_scope', 'n_train', 'pid')}
+        searches[name] = SearchResult(r.pop('estimator'), best[name]['params'], best[name]['mean_score'],
+                                      evaluations[name], cache_hits=sum(e['cached'] for e in evaluations[name]),
+                                      refit_stats=refit_stats)
+
+    task_log = [{k: v for k, v in r.items() if k != 'estimator'} for r in cv_results + refit_results]
+    t0 = min((r['started'] for r in task_log), default=0.0)
+    for r in task_log:
+        r['started'], r['finished'] = round(r['started'] - t0, 3), round(r['finished'] - t0, 3)
+    # CPU time, không phải wall: task chờ CPU (nhiều worker hơn core thật) không tính là core bận
+    busy_s = sum(r['cpu_s'] + r['score_cpu_s'] for r in task_log)
+    report = {
+        'cores': cores,
+        'wall_s': wall_s,
+        'busy_s': busy_s,
+        'utilization': busy_s / (wall_s * cores) if wall_s > 0 else None,
+        'tasks': sorted(task_log, key=lambda r: r['started']),
+    }
+    return searches, report
+
+
+def print_task_summary(report: dict) -> None:
+    """Tổng thời gian theo model + mức tận dụng core của pool"""
+    per_model = {}
+    for task in report['tasks']:
+        stats = per_model.setdefault(task['model'], {'tasks': 0, 'wall': 0.0, 'cpu': 0.0, 'longest': 0.0})
+        stats['tasks'] += 1
+        stats['wall'] += task['fit_s'] + task['score_s']
+        stats['cpu'] += task['cpu_s'] + task['score_cpu_s']
+        stats['longest'] = max(stats['longest'], task['fit_s'] + task['score_s'])
+
+    print(f"\n⏱️  POOL {report['cores']} core: wall {report['wall_s']:,.1f}s, "
+          f"CPU bận {report['busy_s']:,.1f}s (tận dụng {report['utilization'] or 0:.0%})")
+    print(f"   {'Model':<30} {'Task':>5} {'Wall (s)':>9} {'CPU (s)':>9} {'Dài nhất (s)':>13}")
+    for name, stats in sorted(per_model.items(), key=lambda kv: -kv[1]['cpu']):
+        print(f"   {name:<30} {stats['tasks']:>5} {stats['wall']:>9.1f} {stats['cpu']:>9.1f} "
+              f"{stats['longest']:>13.1f}")
@@ -0,0 +1,138 @@
+"""
+Train 1 model nhỏ cho mỗi hãng xe (shard), song song nhiều process.
+
+- Mỗi hãng chỉ phải học vocabulary model/version/color của chính nó -> one-hot nhỏ, fit nhanh.
+- Hãng có ít hơn --min-rows dòng không có shard; service dùng model tổng cho các hãng đó.
+- Kết quả: models/shards/<hãng>.pkl + models/shards/index.json (metrics từng shard),
+  service/shard_router.py đọc index này.
+
+Chạy: python train_shards.py --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from retrain_model import TEST_SIZE, SPLIT_SEED, build_preprocessor, load_training_data
+from service.estimators import EarlyStoppingXGBRegressor
+from service.shard_router import SHARD_DIR, SHARD_INDEX_NAME, shard_file_name
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_PATH = BASE_DIR / "data" / "toyota_cleaned.csv"
+
+
+def build_shard_pipeline(n_jobs: int = 1) -> Pipeline:
+    return Pipeline(steps=[
+        ('preprocessor', build_preprocessor(sparse=True)),
+        ('regressor', EarlyStoppingXGBRegressor(n_estimators=2000, learning_rate=0.05, max_depth=8,
+                                                early_stopping_rounds=50, random_state=42, n_jobs=n_jobs)),
+    ])
+
+
+def train_shard(make: str, X, y, shard_dir: Path, n_jobs: int = 1) -> dict:
+    """Train + đánh giá + lưu shard của 1 hãng (chạy trong process con)"""
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+
+    start = time.perf_counter()
+    pipeline = build_shard_pipeline(n_jobs).fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    y_pred = pipeline.predict(X_test)
+    file_name = shard_file_name(make)
+    # Ghi file tạm rồi replace (atomic): service đang chạy có thể load lại shard bất kỳ lúc nào (sau khi bị
+    # giải phóng theo LRU/idle) -> luôn đọc được bản cũ hoặc bản mới hoàn chỉnh, không bao giờ đọc file ghi dở
+    tmp_path = shard_dir / f".{file_name}.{os.getpid()}.tmp"
+    joblib.dump(pipeline, tmp_path)
+    tmp_path.replace(shard_dir / file_name)
+    return {
+        'make': make,
+        'file': file_name,
+        'n_rows': int(len(X)),
+        'n_test': int(len(X_test)),
+        'test_mae': float(mean_absolute_error(y_test, y_pred)),
+        'r2': float(r2_score(y_test, y_pred)),
+        'fit_s': round(fit_s, 2),
+        'size_mb': round((shard_dir / file_name).stat().st_size / 1e6, 2),
+    }
+
+
+def train_all_shards(X, y, shard_dir: Path = SHARD_DIR, workers: int = None, min_rows: int = 200,
+                     verbose: bool = True) -> dict:
+    """Train mọi hãng đủ dữ liệu song song; trả về index (cũng được ghi ra shard_dir/index.json)"""
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    counts = X['make'].value_counts()
+    makes = [make for make, n in counts.items() if n >= min_rows]
+    skipped = [make for make, n in counts.items() if n < min_rows]
+
+    workers = workers or min(len(makes), os.cpu_count() or 1)
+    # Chia đều core cho các process, tránh mỗi XGBoost tự lấy hết core
+    n_jobs = max(1, (os.cpu_count() or 1) // max(1, workers))
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = []
+        # Hãng nhiều dòng chạy trước để process không phải chờ shard lớn nhất ở cuối
+        for make in makes:
+            rows = (X['make'] == make).to_numpy()
+            futures.append(pool.submit(train_shard, make, X[rows], y[rows], shard_dir, n_jobs))
+        for future in futures:
+            result = future.result()
+            results[result['make']] = result
+            if verbose:
+                print(f"   🔹 {result['make']:<15} {result['n_rows']:>8,} dòng | MAE {result['test_mae']:,.1f} "
+                      f"| R2 {result['r2']:.4f} | {result['fit_s']:.1f}s | {result['size_mb']:.1f} MB")
+
+    total_test = sum(r['n_test'] for r in results.values())
+    index = {
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'min_rows': min_rows,
+        'skipped_makes': skipped,
+        'weighted_test_mae': (sum(r['test_mae'] * r['n_test'] for r in results.values()) / total_test
+                              if total_test else None),
+        'shards': results,
+    }
+    # Ghi index sau cùng và cũng qua file tạm + replace -> service không đọc được index ghi dở,
+    # và index mới chỉ xuất hiện khi mọi shard nó trỏ tới đã nằm đúng chỗ
+    index_path = shard_dir / SHARD_INDEX_NAME
+    tmp_path = index_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(index_path)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train model theo từng hãng (shard)")
+    parser.add_argument('--data', type=Path, default=DATA_PATH)
+    parser.add_argument('--workers', type=int, default=None, help="Số process song song (mặc định = số core)")
+    parser.add_argument('--min-rows', type=int, default=200, help="Số dòng tối thiểu để 1 hãng có shard riêng")
+    args = parser.parse_args(argv)
+
+    print("🚀 TRAIN MODEL THEO HÃNG (SHARD)")
+    print("="*70)
+    print(f"📁 Đang đọc dữ liệu từ: {args.data.name}")
+    X, y = load_training_data(args.data)
+
+    start = time.perf_counter()
+    index = train_all_shards(X, y, workers=args.workers, min_rows=args.min_rows)
+    mae = index['weighted_test_mae']
+    mae_text = f"{mae:,.1f}" if mae is not None else "n/a (không hãng nào đủ --min-rows)"
+    print(f"\n✅ {len(index['shards'])} shard, MAE trung bình (theo số dòng test): "
+          f"{mae_text} | {time.perf_counter() - start:,.0f}s")
+    if index['skipped_makes']:
+        print(f"⚠️  Dùng model tổng cho: {', '.join(index['skipped_makes'])} (ít hơn {args.min_rows} dòng)")
+    print(f"💾 Đã lưu tại: {SHARD_DIR}")
+
+
+if __name__ == '__main__':
+    main()
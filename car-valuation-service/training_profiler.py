@@ -0,0 +1,177 @@
+"""
+Đo thời gian và bộ nhớ của quá trình train (retrain_model.py) để biết chậm ở đâu.
+
+- measure(): context manager đo 1 đoạn code: wall time, CPU time (mọi luồng của process) và
+  đỉnh RSS *trong riêng đoạn đó*. Trên Linux đỉnh RSS được reset qua /proc/self/clear_refs trước khi đo
+  (peak_scope = 'stage'); nơi khác chỉ có đỉnh từ lúc process khởi động (peak_scope = 'process').
+- TrainingProfiler: gom các stage (load, clean, preprocess, search từng model, lưu model),
+  thời gian từng (model, bộ tham số, fold) từ kết quả search, rồi ghi ra models/training_profile.json.
+- profile_fit(): chạy lại 1 lần fit dưới cProfile, ghi file .prof (xem bằng snakeviz, hoặc
+  `flameprof slowest_fit.prof > slowest_fit.svg` để có flamegraph).
+
+Fold chạy trong process con (joblib/pool) được đo ngay trong process con (model_search, train_orchestrator);
+RSS của stage search vì vậy chỉ là của process chính, RSS của từng fit nằm trong phần 'fits'.
+"""
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import resource
+except ImportError:          # Windows
+    resource = None
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+# Các measure() đang mở (lồng nhau) trong process này: reset đỉnh RSS ở stage con không được làm mất
+# đỉnh đã đạt của stage cha
+_open_measurements: List[dict] = []
+
+
+def _proc_status_mb(key: str) -> Optional[float]:
+    try:
+        with open(_PROC_STATUS, 'r') as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> Optional[float]:
+    """RSS hiện tại của process (MB), None nếu không đọc được"""
+    return _proc_status_mb('VmRSS:')
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Đỉnh RSS (MB) từ lần reset gần nhất (Linux) hoặc từ lúc process khởi động"""
+    peak = _proc_status_mb('VmHWM:')
+    if peak is None and resource is not None:
+        # ru_maxrss: KB trên Linux, byte trên macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return peak
+
+
+def reset_peak_rss() -> bool:
+    """Reset VmHWM về RSS hiện tại (Linux >= 4.0). False nếu hệ thống không hỗ trợ."""
+    try:
+        with open(_PROC_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def measure():
+    """
+    Đo đoạn code bên trong `with`; dict trả về được điền khi ra khỏi khối:
+    wall_s, cpu_s, rss_start_mb, rss_end_mb, peak_rss_mb, peak_scope.
+    """
+    for outer in _open_measurements:
+        outer['_peak'] = max(filter(None, [outer['_peak'], peak_rss_mb()]), default=None)
+    stats = {'rss_start_mb': rss_mb(), '_peak': None}
+    stats['peak_scope'] = 'stage' if reset_peak_rss() else 'process'
+    _open_measurements.append(stats)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield stats
+    finally:
+        stats['wall_s'] = time.perf_counter() - wall_start
+        stats['cpu_s'] = time.process_time() - cpu_start
+        _open_measurements.remove(stats)
+        stats['peak_rss_mb'] = max(filter(None, [stats.pop('_peak'), peak_rss_mb()]), default=None)
+        stats['rss_end_mb'] = rss_mb()
+        for outer in _open_measurements:
+            outer['_peak'] = max(filter(None, [outer['_peak'], stats['peak_rss_mb']]), default=None)
+
+
+class TrainingProfiler:
+    """Báo cáo thời gian/bộ nhớ của 1 lần retrain"""
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages: List[dict] = []
+        self.fits: List[dict] = []
+        self.slowest_profile: Optional[dict] = None
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        """Đo 1 stage; info (số dòng, số cột, ...) được ghi kèm, có thể bổ sung qua dict trả về"""
+        with measure() as stats:
+            yield info
+        self.stages.append({'stage': name, **_rounded(stats), **info})
+
+    def record_search(self, model_name: str, search) -> None:
+        """Lấy thời gian từng fold (đo trong process con) + lần refit từ SearchResult"""
+        for evaluation in search.evaluations:
+            if evaluation['cached']:
+                continue
+            for fold in evaluation.get('folds', []):
+                self.fits.append({'model': model_name, 'params': evaluation['params'],
+                                  'rung': evaluation.get('rung'), **fold})
+        if search.refit_stats:
+            self.fits.append({'model': model_name, 'params': search.best_params, 'fold': 'refit',
+                              **search.refit_stats})
+
+    def slowest_fit(self) -> Optional[dict]:
+        return max(self.fits, key=lambda f: f['fit_s'], default=None)
+
+    def profile_fit(self, pipeline, fit: dict, X, y, path: Path) -> None:
+        """
+        Chạy lại fit chậm nhất trong process chính dưới cProfile (cùng tham số, cùng số dòng train,
+        lấy các dòng đầu của X) và ghi file .prof.
+        """
+        from sklearn.base import clone
+
+        n_rows = fit.get('n_train') or len(y)
+        X_fit = X.iloc[:n_rows] if hasattr(X, 'iloc') else X[:n_rows]
+        y_fit = y.iloc[:n_rows] if hasattr(y, 'iloc') else y[:n_rows]
+        estimator = clone(pipeline).set_params(**fit['params'])
+
+        profiler = cProfile.Profile()
+        with measure() as stats:
+            profiler.runcall(estimator.fit, X_fit, y_fit)
+        profiler.dump_stats(str(path))
+        self.slowest_profile = {'model': fit['model'], 'params': fit['params'], 'fold': fit.get('fold'),
+                                'n_train': int(n_rows), 'path': str(path), **_rounded(stats)}
+
+    def to_dict(self) -> dict:
+        return {
+            'started_at': self.started_at,
+            'total_wall_s': round(time.perf_counter() - self._start, 3),
+            'cpu_count': os.cpu_count(),
+            'stages': self.stages,
+            'fits': sorted(self.fits, key=lambda f: f['fit_s'], reverse=True),
+            'slowest_fit_profile': self.slowest_profile,
+        }
+
+    def write(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2, default=str)
+
+    def print_summary(self, top: int = 5) -> None:
+        print(f"\n⏱️  THỜI GIAN / BỘ NHỚ THEO STAGE:")
+        print(f"   {'Stage':<38} {'Wall (s)':>9} {'CPU (s)':>9} {'Đỉnh RSS (MB)':>14}")
+        for s in self.stages:
+            peak = f"{s['peak_rss_mb']:,.0f}" if s['peak_rss_mb'] is not None else "-"
+            print(f"   {s['stage']:<38} {s['wall_s']:>9.2f} {s['cpu_s']:>9.2f} {peak:>14}")
+        if self.fits:
+            print(f"   {top} lần fit chậm nhất:")
+            for f in sorted(self.fits, key=lambda f: f['fit_s'], reverse=True)[:top]:
+                peak = f"{f['peak_rss_mb']:,.0f} MB" if f.get('peak_rss_mb') is not None else "-"
+                print(f"   - {f['model']} fold {f['fold']}: {f['fit_s']:.2f}s (CPU {f['cpu_s']:.2f}s, {peak}) "
+                      f"{json.dumps(f['params'], default=float)}")
+
+
+def _rounded(stats: dict) -> dict:
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in stats.items()}